@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,11 +38,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'ndanan',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'ndanan.instrumentation.QueryInstrumentationMiddleware',
+    'ndanan.middleware.PrimaryStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -73,20 +76,69 @@ WSGI_APPLICATION = 'capstone_project.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# DB_ENGINE=django.db.backends.sqlite3 with file paths in DB_NAME/DB_REPLICA_NAME
+# gives a local primary + replica pair.
+#
+# Connection reuse: by default each thread keeps its connection for
+# DB_CONN_MAX_AGE seconds and pings it before reuse. DB_POOL_SIZE > 0 switches
+# MySQL to ndanan's bounded per-process pool (ndanan.db.backends.mysql), which
+# also suits ASGI, where per-thread persistent connections should stay off.
 
-
+DB_POOL_SIZE = config('DB_POOL_SIZE', default=0, cast=int)
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': config('DB_ENGINE', default='ndanan.db.backends.mysql' if DB_POOL_SIZE else 'django.db.backends.mysql'),
         'NAME': config('DB_NAME', default='ndanan_db'),
         'USER': config('DB_USER', default='root'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='3306'),
+        # The pool does the reusing, so pooled connections go back after every request
+        'CONN_MAX_AGE': 0 if DB_POOL_SIZE else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'POOL': {
+            'MAX_SIZE': DB_POOL_SIZE,
+            # Seconds a request waits for a free connection before failing
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=5.0, cast=float),
+            # Replace pooled connections older than this (below MySQL's wait_timeout)
+            'RECYCLE': config('DB_POOL_RECYCLE', default=1800, cast=int),
+        },
     }
 }
 
+# Optional read replica; views marked read_replica = True read from it (ndanan.replicas)
+if config('DB_REPLICA_HOST', default='') or config('DB_REPLICA_NAME', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'HOST': config('DB_REPLICA_HOST', default=DATABASES['default']['HOST']),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+    }
+READ_REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else ''
+DATABASE_ROUTERS = ['ndanan.replicas.PrimaryReplicaRouter']
+# Seconds a browser keeps reading from the primary after it writes (covers replication lag)
+PRIMARY_STICKY_SECONDS = config('PRIMARY_STICKY_SECONDS', default=5, cast=int)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='ndanan'),
+    }
+}
+
+# Seconds a user's enrolled course ids stay cached (invalidated on enrollment changes)
+ENROLLMENT_CACHE_TIMEOUT = config('ENROLLMENT_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a course/material detail payload stays cached (invalidated on related writes)
+DETAIL_CACHE_TIMEOUT = config('DETAIL_CACHE_TIMEOUT', default=600, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,6 +176,77 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# User-uploaded files (profiles, materials, submissions)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+
+# Thumbnails and previews rendered by the task worker after upload
+PROFILE_THUMBNAIL_SIZE = config('PROFILE_THUMBNAIL_SIZE', default=128, cast=int)
+MATERIAL_PREVIEW_WIDTH = config('MATERIAL_PREVIEW_WIDTH', default=480, cast=int)
+
+# Hand protected downloads to the front-end server: '' (Django streams), 'xsendfile' or 'xaccel'
+SENDFILE_BACKEND = config('SENDFILE_BACKEND', default='')
+# Internal nginx location aliased to MEDIA_ROOT, used with 'xaccel'
+SENDFILE_URL_PREFIX = config('SENDFILE_URL_PREFIX', default='/protected-media/')
+
+# Upload limits and chunked (resumable) uploads
+SUBMISSION_MAX_UPLOAD_SIZE = config('SUBMISSION_MAX_UPLOAD_SIZE', default=5 * 1024 * 1024, cast=int)
+MATERIAL_MAX_UPLOAD_SIZE = config('MATERIAL_MAX_UPLOAD_SIZE', default=2 * 1024 * 1024 * 1024, cast=int)
+CHUNKED_UPLOAD_CHUNK_SIZE = config('CHUNKED_UPLOAD_CHUNK_SIZE', default=1024 * 1024, cast=int)
+CHUNKED_UPLOAD_TEMP_DIR = config('CHUNKED_UPLOAD_TEMP_DIR', default=str(BASE_DIR / 'chunked_uploads'))
+
+# Route the course and material read views to their async versions (set when serving via asgi.py)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Per-request query count / DB time / duplicate detection (Server-Timing header + logs)
+QUERY_INSTRUMENTATION = config('QUERY_INSTRUMENTATION', default=True, cast=bool)
+# A query shape repeated this many times in one request is logged as a likely N+1
+QUERY_DUPLICATE_THRESHOLD = config('QUERY_DUPLICATE_THRESHOLD', default=5, cast=int)
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+# LOG_LEVEL=INFO also logs one JSON line of query metrics per request
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'ndanan': {'handlers': ['console'], 'level': config('LOG_LEVEL', default='WARNING')},
+    },
+}
+
+# Background task worker (manage.py run_task_worker)
+TASK_WORKER_CONCURRENCY = config('TASK_WORKER_CONCURRENCY', default=4, cast=int)
+TASK_WORKER_POLL_INTERVAL = config('TASK_WORKER_POLL_INTERVAL', default=1.0, cast=float)
+# Running tasks older than this are assumed orphaned by a dead worker and requeued
+TASK_STALE_AFTER = config('TASK_STALE_AFTER', default=600, cast=int)
+
+# Grade analytics summaries: changes within this many seconds share one refresh task (0 refreshes each change)
+ANALYTICS_REFRESH_WINDOW = config('ANALYTICS_REFRESH_WINDOW', default=30, cast=int)
+
+# Due-date reminders (manage.py schedule_deadline_reminders, run from cron): one reminder per
+# window, e.g. 24 and 2 hours before the deadline, to students who have not submitted
+DEADLINE_REMINDER_HOURS = config('DEADLINE_REMINDER_HOURS', default='24,2', cast=Csv(int))
+# Students per queued reminder task
+DEADLINE_REMINDER_BATCH_SIZE = config('DEADLINE_REMINDER_BATCH_SIZE', default=200, cast=int)
+
+# Course and material search: 'auto' uses MySQL FULLTEXT on MySQL and the portable
+# inverted index (SearchPosting) elsewhere; or force 'fulltext' / 'index'
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='auto')
+# Characters of an uploaded PDF's text that are indexed
+SEARCH_MAX_ATTACHMENT_CHARS = config('SEARCH_MAX_ATTACHMENT_CHARS', default=100000, cast=int)
+
+# Worker processes hashing passwords for manage.py provision_users and the bulk user API;
+# 0 uses one per CPU
+PROVISIONING_HASH_WORKERS = config('PROVISIONING_HASH_WORKERS', default=0, cast=int)
+
+# Outgoing mail (grade, welcome and deadline notifications)
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='no-reply@ndanan.edu')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
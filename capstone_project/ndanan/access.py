@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.contrib.auth.mixins import AccessMixin
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from rest_framework.permissions import BasePermission
+
+from .models import CourseEnrollment
+from .replicas import primary_reads
+
+ENROLLMENT_CACHE_KEY = "ndanan:enrolled-courses:{}"
+
+
+def enrolled_course_ids(user):
+    """
+    Ids of the courses ``user`` is actively enrolled in.
+    Memoized on the user object for the rest of the request and kept in the
+    cache across requests until an enrollment change invalidates it.
+    """
+    ids = getattr(user, "_enrolled_course_ids", None)
+    if ids is not None:
+        return ids
+
+    key = ENROLLMENT_CACHE_KEY.format(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        # From the primary: a stale set would be cached past the replica's lag
+        with primary_reads():
+            ids = frozenset(
+                CourseEnrollment.objects.filter(student=user, is_active=True).values_list("course_id", flat=True)
+            )
+        cache.set(key, ids, settings.ENROLLMENT_CACHE_TIMEOUT)
+    user._enrolled_course_ids = ids
+    return ids
+
+
+async def aenrolled_course_ids(user):
+    """Async counterpart of enrolled_course_ids for the ASGI views"""
+    ids = getattr(user, "_enrolled_course_ids", None)
+    if ids is not None:
+        return ids
+
+    key = ENROLLMENT_CACHE_KEY.format(user.pk)
+    ids = await cache.aget(key)
+    if ids is None:
+        queryset = CourseEnrollment.objects.filter(student=user, is_active=True).values_list("course_id", flat=True)
+        with primary_reads():
+            ids = frozenset([course_id async for course_id in queryset])
+        await cache.aset(key, ids, settings.ENROLLMENT_CACHE_TIMEOUT)
+    user._enrolled_course_ids = ids
+    return ids
+
+
+def invalidate_enrolled_course_ids(*user_ids):
+    cache.delete_many([ENROLLMENT_CACHE_KEY.format(user_id) for user_id in user_ids])
+
+
+def check_course_access(user, course_id, owner_id, not_owner_message, denied_message, enrolled=None):
+    """
+    Raise PermissionDenied unless ``user`` may read content belonging to ``course_id``.
+    Callers that already know whether a student is enrolled pass ``enrolled``.
+    """
+    role = getattr(user, "role", None)
+
+    if role == "admin":
+        return
+
+    if role == "teacher":
+        if owner_id == user.pk:
+            return
+        raise PermissionDenied(not_owner_message)
+
+    if role == "student":
+        if enrolled is None:
+            enrolled = course_id in enrolled_course_ids(user)
+        if enrolled:
+            return
+        raise PermissionDenied("You are not enrolled in this course.")
+
+    raise PermissionDenied(denied_message)
+
+
+class TeacherOrAdminRequiredMixin(AccessMixin):
+    permission_denied_message = "Only Teachers or Admins can do this."
+
+    def dispatch(self, request, *args, **kwargs):
+        user_role = getattr(request.user, 'role', None)
+        if user_role not in ["teacher", "admin"]:
+            raise PermissionDenied(self.get_permission_denied_message())
+        
+        return super().dispatch(request, *args, **kwargs)
+
+
+class CourseAccessMixin:
+    """
+    Restrict a DetailView to admins, the teacher who owns the object and
+    students enrolled in the object's course.
+    """
+    course_field = "id"
+    owner_field = "teacher_id"
+    not_owner_message = "You are not the teacher of this course."
+    denied_message = "You do not have permission to view this course."
+
+    def get_object(self, queryset=None):
+        obj = super().get_object(queryset)
+        check_course_access(
+            self.request.user,
+            getattr(obj, self.course_field),
+            getattr(obj, self.owner_field),
+            self.not_owner_message,
+            self.denied_message,
+        )
+        return obj
+
+
+class IsTeacherOrAdmin(BasePermission):
+    """DRF counterpart of TeacherOrAdminRequiredMixin"""
+    message = "Only Teachers or Admins can do this."
+
+    def has_permission(self, request, view):
+        return getattr(request.user, "role", None) in ["teacher", "admin"]
+
+
+class IsAdmin(BasePermission):
+    """Only users with the admin role"""
+    message = "Only Admins can do this."
+
+    def has_permission(self, request, view):
+        return getattr(request.user, "role", None) == "admin"
@@ -0,0 +1,193 @@
+import bisect
+import math
+import statistics
+import time
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from .models import Assignment, AssignmentStats, Course, CourseEnrollment, Grade, StudentCourseStats, Submission
+from .tasks import enqueue_on_commit, task
+
+HISTOGRAM_BUCKETS = 10
+
+STUDENT_FIELDS = [
+    "assignments", "submitted", "graded", "late", "mean", "median", "stddev",
+    "completion_rate", "late_rate", "rank", "percentile",
+]
+ASSIGNMENT_FIELDS = [
+    "enrolled", "submitted", "graded", "late", "mean", "median", "stddev",
+    "histogram", "completion_rate", "late_rate",
+]
+
+
+def _percent(score_field, max_score_field):
+    """Score as a percent of the assignment's max_score, computed in SQL"""
+    return Cast(score_field, FloatField()) * 100.0 / F(max_score_field)
+
+
+def _submission_aggregates(counted, percent):
+    """
+    Per-group submission counts and score moments. Counts are of distinct
+    ``counted`` (assignments per student, students per assignment), so a
+    resubmission is not counted twice.
+    """
+    return {
+        "submitted": Count(counted, distinct=True),
+        "graded": Count(counted, distinct=True, filter=Q(grade__isnull=False)),
+        "late": Count(counted, distinct=True, filter=Q(submitted_at__gt=F("assignment__due_date"))),
+        "mean": Avg(percent),
+        "mean_square": Avg(percent * percent),
+    }
+
+
+def _medians(keys, values):
+    """{key: median of its values}, one sort for every group"""
+    pairs = sorted(zip(keys, values))
+    return {
+        key: statistics.median(value for _, value in group)
+        for key, group in groupby(pairs, key=lambda pair: pair[0])
+    }
+
+
+def _stddev(row):
+    """
+    Population standard deviation from AVG(x) and AVG(x * x). SQLite's
+    STDDEV_POP fails on groups without grades, so it is not used.
+    """
+    if row.get("mean") is None:
+        return None
+    return math.sqrt(max(row["mean_square"] - row["mean"] ** 2, 0.0))
+
+
+def _rate(part, whole):
+    return part / whole if whole else 0.0
+
+
+def _rank(means):
+    """{student_id: (rank, percentile)} from {student_id: mean}; ties share the better rank"""
+    ordered = sorted(means.values())
+    total = len(ordered)
+    ranks = {}
+    for student_id, mean in means.items():
+        below = bisect.bisect_left(ordered, mean)
+        above = total - bisect.bisect_right(ordered, mean)
+        ranks[student_id] = (above + 1, round(100.0 * below / total, 1))
+    return ranks
+
+
+def refresh_course(course_id):
+    """
+    Recompute the AssignmentStats of every assignment in the course and the
+    StudentCourseStats of every actively enrolled student. Counts, means,
+    squared means (for the standard deviation) and histograms are grouped SQL aggregates; medians
+    come from one query returning the course's scores. Returns rows written.
+    """
+    enrolled = CourseEnrollment.objects.filter(course_id=course_id, is_active=True).values("student_id")
+    students = [row["student_id"] for row in enrolled]
+    assignment_ids = list(Assignment.objects.filter(course_id=course_id).values_list("id", flat=True))
+
+    submissions = Submission.objects.filter(assignment__course_id=course_id, student_id__in=enrolled).order_by()
+    percent = _percent("grade__score", "assignment__max_score")
+    by_student = {
+        row["student_id"]: row
+        for row in submissions.values("student_id").annotate(**_submission_aggregates("assignment", percent))
+    }
+
+    width = 100 / HISTOGRAM_BUCKETS
+    buckets = {
+        f"bucket{i}": Count("pk", filter=Q(pct__gte=i * width, pct__lt=(i + 1) * width))
+        for i in range(HISTOGRAM_BUCKETS - 1)
+    }
+    # The top bucket is closed so full marks (and bonus points) land in it
+    buckets[f"bucket{HISTOGRAM_BUCKETS - 1}"] = Count("pk", filter=Q(pct__gte=(HISTOGRAM_BUCKETS - 1) * width))
+    grades = Grade.objects.filter(
+        submission__assignment__course_id=course_id, submission__student_id__in=enrolled
+    ).annotate(pct=_percent("score", "submission__assignment__max_score")).order_by()
+    histograms = {
+        row.pop("submission__assignment_id"): row
+        for row in grades.values("submission__assignment_id").annotate(**buckets)
+    }
+    by_assignment = {
+        row["assignment_id"]: row
+        for row in submissions.values("assignment_id").annotate(**_submission_aggregates("student", percent))
+    }
+
+    scores = list(grades.values_list("submission__student_id", "submission__assignment_id", "pct"))
+    student_medians = _medians([s for s, _, _ in scores], [p for _, _, p in scores])
+    assignment_medians = _medians([a for _, a, _ in scores], [p for _, _, p in scores])
+    ranks = _rank({s: row["mean"] for s, row in by_student.items() if row["mean"] is not None})
+
+    student_rows = []
+    for student_id in students:
+        row = by_student.get(student_id, {})
+        submitted = row.get("submitted", 0)
+        rank, percentile = ranks.get(student_id, (None, None))
+        student_rows.append(StudentCourseStats(
+            course_id=course_id, student_id=student_id, assignments=len(assignment_ids),
+            submitted=submitted, graded=row.get("graded", 0), late=row.get("late", 0),
+            mean=row.get("mean"), median=student_medians.get(student_id), stddev=_stddev(row),
+            completion_rate=_rate(submitted, len(assignment_ids)), late_rate=_rate(row.get("late", 0), submitted),
+            rank=rank, percentile=percentile,
+        ))
+
+    assignment_rows = []
+    for assignment_id in assignment_ids:
+        row = by_assignment.get(assignment_id, {})
+        submitted = row.get("submitted", 0)
+        histogram = histograms.get(assignment_id, {})
+        assignment_rows.append(AssignmentStats(
+            assignment_id=assignment_id, enrolled=len(students),
+            submitted=submitted, graded=row.get("graded", 0), late=row.get("late", 0),
+            mean=row.get("mean"), median=assignment_medians.get(assignment_id), stddev=_stddev(row),
+            histogram=[histogram.get(f"bucket{i}", 0) for i in range(HISTOGRAM_BUCKETS)],
+            completion_rate=_rate(submitted, len(students)), late_rate=_rate(row.get("late", 0), submitted),
+        ))
+
+    with transaction.atomic():
+        # Students who left the course drop off the leaderboard
+        StudentCourseStats.objects.filter(course_id=course_id).exclude(student_id__in=students).delete()
+        StudentCourseStats.objects.bulk_create(
+            student_rows, update_conflicts=True, unique_fields=["course", "student"],
+            update_fields=STUDENT_FIELDS + ["refreshed_at"],
+        )
+        AssignmentStats.objects.bulk_create(
+            assignment_rows, update_conflicts=True, unique_fields=["assignment"],
+            update_fields=ASSIGNMENT_FIELDS + ["refreshed_at"],
+        )
+    return len(student_rows) + len(assignment_rows)
+
+
+@task("analytics.refresh_course")
+def refresh_course_task(course_id):
+    if Course.objects.filter(pk=course_id).exists():
+        refresh_course(course_id)
+
+
+@task("analytics.refresh_all", max_attempts=1)
+def refresh_all():
+    for course_id in Course.objects.values_list("id", flat=True).iterator():
+        refresh_course(course_id)
+
+
+def schedule_course_refresh(course_id):
+    """
+    Queue a refresh of the course's summaries once the current transaction commits.
+    Changes within one ANALYTICS_REFRESH_WINDOW share a single task that runs
+    when the window closes, so a burst of grading costs one refresh.
+    """
+    window = settings.ANALYTICS_REFRESH_WINDOW
+    if window <= 0:
+        enqueue_on_commit("analytics.refresh_course", {"course_id": course_id}, priority=-5)
+        return
+
+    now = time.time()
+    closes = (int(now // window) + 1) * window
+    enqueue_on_commit(
+        "analytics.refresh_course", {"course_id": course_id}, priority=-5,
+        idempotency_key=f"analytics:{course_id}:{closes}", delay=timedelta(seconds=closes - now),
+    )
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class NdananConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ndanan'
+
+    def ready(self):
+        # Importing these registers their background tasks too
+        from . import signals, notifications, deadlines  # noqa: F401
@@ -0,0 +1,300 @@
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .counters import rebuild_assignment_counters, rebuild_course_counters
+from .instrumentation import record_queries
+from .models import Assignment, Course, CourseEnrollment, Grade, Material, Submission, User
+from .serializers import (
+    AssignmentDetailSerializer,
+    AssignmentListSerializer,
+    CourseDetailSerializer,
+    CourseListSerializer,
+    GradeSerializer,
+    MaterialSerializer,
+    SubmissionListSerializer,
+    SubmissionSerializer,
+    UserSerializer,
+)
+
+# Dataset sizes; "large" gives ~10k users, 600 courses and ~300k submissions
+SCALES = {
+    "tiny": {"students": 40, "teachers": 4, "courses": 6},
+    "small": {"students": 500, "teachers": 20, "courses": 50},
+    "medium": {"students": 3000, "teachers": 100, "courses": 200},
+    "large": {"students": 10000, "teachers": 300, "courses": 600},
+}
+
+EMAIL_DOMAIN = "bench.ndanan.edu"
+COURSE_PREFIX = "BENCH"
+
+
+def _flush(model, rows, batch_size):
+    model.objects.bulk_create(rows, batch_size=batch_size)
+    rows.clear()
+
+
+def generate_dataset(students, teachers, courses, courses_per_student=5, materials_per_course=8,
+                     assignments_per_course=8, submission_rate=0.8, graded_rate=0.7,
+                     batch_size=5000, seed=42, log=None):
+    """
+    Fill the database with a synthetic school using bulk inserts only.
+    The same arguments and seed always produce the same rows, so benchmark
+    runs on separate databases stay comparable. Returns row counts per model.
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    now = timezone.now()
+    # Hashing is deliberately slow; every generated account shares one hash
+    password = make_password("bench-password")
+
+    log(f"users: {teachers} teachers, {students} students")
+    User.objects.bulk_create([
+        User(email=f"teacher{i}@{EMAIL_DOMAIN}", first_name="Teacher", last_name=str(i),
+             role="teacher", password=password)
+        for i in range(teachers)
+    ] + [
+        User(email=f"student{i}@{EMAIL_DOMAIN}", first_name="Student", last_name=str(i),
+             role="student", password=password)
+        for i in range(students)
+    ], batch_size=batch_size)
+    # bulk_create only returns primary keys on some backends, so read them back
+    bench_users = User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").order_by("id")
+    teacher_ids = list(bench_users.filter(role="teacher").values_list("id", flat=True))
+    student_ids = list(bench_users.filter(role="student").values_list("id", flat=True))
+
+    log(f"courses: {courses}")
+    Course.objects.bulk_create([
+        Course(name=f"Course {i}", course_code=f"{COURSE_PREFIX}{i:05d}",
+               description="Benchmark course", teacher_id=rng.choice(teacher_ids))
+        for i in range(courses)
+    ], batch_size=batch_size)
+    course_teacher = dict(
+        Course.objects.filter(course_code__startswith=COURSE_PREFIX).order_by("id").values_list("id", "teacher_id")
+    )
+    course_ids = list(course_teacher)
+
+    log(f"materials and assignments: {materials_per_course} and {assignments_per_course} per course")
+    Material.objects.bulk_create([
+        Material(course_id=course_id, title=f"Material {i}", description="Benchmark material",
+                 file=f"materials/bench-{course_id}-{i}.pdf", uploaded_by_id=teacher_id)
+        for course_id, teacher_id in course_teacher.items() for i in range(materials_per_course)
+    ], batch_size=batch_size)
+    Assignment.objects.bulk_create([
+        Assignment(course_id=course_id, title=f"Assignment {i}", description="Benchmark assignment",
+                   due_date=now + timedelta(days=rng.randint(-30, 30)), created_by_id=teacher_id)
+        for course_id, teacher_id in course_teacher.items() for i in range(assignments_per_course)
+    ], batch_size=batch_size)
+    assignments_by_course = {}
+    for assignment_id, course_id in Assignment.objects.filter(
+        course_id__in=course_ids
+    ).order_by("id").values_list("id", "course_id"):
+        assignments_by_course.setdefault(course_id, []).append(assignment_id)
+
+    log("enrollments")
+    per_student = min(courses_per_student, len(course_ids))
+    enrollments = [(rng.sample(course_ids, per_student), student_id) for student_id in student_ids]
+    CourseEnrollment.objects.bulk_create([
+        CourseEnrollment(course_id=course_id, student_id=student_id)
+        for enrolled, student_id in enrollments for course_id in enrolled
+    ], batch_size=batch_size)
+
+    log("submissions")
+    rows = []
+    for enrolled, student_id in enrollments:
+        for course_id in enrolled:
+            for assignment_id in assignments_by_course.get(course_id, ()):
+                if rng.random() < submission_rate:
+                    rows.append(Submission(
+                        assignment_id=assignment_id, student_id=student_id, status="submitted",
+                        submission_file=f"submissions/bench-{assignment_id}-{student_id}.pdf",
+                    ))
+                    if len(rows) >= batch_size:
+                        _flush(Submission, rows, batch_size)
+    _flush(Submission, rows, batch_size)
+
+    log("grades")
+    assignment_teacher = dict(
+        Assignment.objects.filter(course_id__in=course_ids).values_list("id", "created_by_id")
+    )
+    graded = []
+    for submission_id, assignment_id in Submission.objects.filter(
+        assignment_id__in=assignment_teacher
+    ).order_by("id").values_list("id", "assignment_id").iterator(chunk_size=batch_size):
+        if rng.random() < graded_rate:
+            graded.append(submission_id)
+            rows.append(Grade(submission_id=submission_id, score=round(rng.uniform(40, 100), 1),
+                              feedback="", graded_by_id=assignment_teacher[assignment_id]))
+            if len(rows) >= batch_size:
+                _flush(Grade, rows, batch_size)
+    _flush(Grade, rows, batch_size)
+    for start in range(0, len(graded), batch_size):
+        Submission.objects.filter(pk__in=graded[start:start + batch_size]).update(status="graded")
+
+    # bulk_create sends no signals, so the denormalized counters are rebuilt once at the end
+    log("counters")
+    rebuild_course_counters()
+    rebuild_assignment_counters()
+
+    return {
+        "users": len(teacher_ids) + len(student_ids),
+        "courses": len(course_ids),
+        "enrollments": sum(len(enrolled) for enrolled, _ in enrollments),
+        "materials": Material.objects.filter(course_id__in=course_ids).count(),
+        "assignments": len(assignment_teacher),
+        "submissions": Submission.objects.filter(assignment_id__in=assignment_teacher).count(),
+        "grades": len(graded),
+    }
+
+
+class Fixtures:
+    """The rows the benchmarks read: the busiest course and one of its students"""
+
+    def __init__(self):
+        self.course = Course.objects.order_by("-student_count", "id").first()
+        self.teacher = self.course.teacher
+        self.student = User.objects.filter(
+            enrolled_courses__course=self.course, enrolled_courses__is_active=True
+        ).order_by("id").first()
+        self.material = self.course.materials.order_by("id").first()
+        self.assignment = self.course.assignments.order_by("-submission_count", "id").first()
+
+
+def serializer_benchmarks(fx):
+    """name -> callable serializing the queryset each API view would serialize"""
+    return {
+        "serializer.user": lambda: UserSerializer(
+            User.objects.filter(role="student").order_by("id")[:100], many=True).data,
+        "serializer.course_list": lambda: CourseListSerializer(
+            Course.objects.with_teacher().order_by("-created_at", "-id")[:50], many=True).data,
+        "serializer.course_detail": lambda: CourseDetailSerializer(
+            Course.objects.with_teacher().with_enrolled_students().get(pk=fx.course.pk)).data,
+        "serializer.material": lambda: MaterialSerializer(
+            Material.objects.select_related("course", "uploaded_by").order_by("-created_at", "-id")[:50],
+            many=True).data,
+        "serializer.assignment_list": lambda: AssignmentListSerializer(
+            Assignment.objects.select_related("course").filter(course=fx.course), many=True).data,
+        "serializer.assignment_detail": lambda: AssignmentDetailSerializer(
+            Assignment.objects.select_related("course__teacher", "created_by").get(pk=fx.assignment.pk)).data,
+        "serializer.submission": lambda: SubmissionSerializer(
+            Submission.objects.with_related().filter(assignment=fx.assignment), many=True).data,
+        "serializer.submission_list": lambda: SubmissionListSerializer(
+            Submission.objects.for_assignment(fx.assignment), many=True).data,
+        "serializer.grade": lambda: GradeSerializer(
+            Grade.objects.with_related().filter(submission__assignment=fx.assignment), many=True).data,
+    }
+
+
+def view_benchmarks(fx):
+    """name -> callable making one GET through the full middleware stack"""
+    clients = {}
+    for role, user in (("student", fx.student), ("teacher", fx.teacher)):
+        clients[role] = Client()
+        clients[role].force_login(user)
+
+    def get(role, name, *args):
+        url = reverse(name, args=args)
+
+        def run():
+            response = clients[role].get(url)
+            if response.status_code != 200:
+                raise AssertionError(f"GET {url} as {role} returned {response.status_code}")
+            if response.streaming:
+                b"".join(response.streaming_content)
+            response.close()
+        return run
+
+    return {
+        "view.home": get("student", "home"),
+        "view.course_list": get("student", "course_list"),
+        "view.course_detail": get("student", "course_details", fx.course.pk),
+        "view.material_list": get("student", "material_list"),
+        "view.material_detail": get("student", "material_details", fx.material.pk),
+        "view.gradebook_export": get("teacher", "gradebook_export", fx.course.pk),
+    }
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[max(0, int(round(len(sorted_values) * fraction)) - 1)]
+
+
+def measure(func, iterations):
+    """Queries, latency percentiles and peak Python memory of ``func``"""
+    # Warm up lazy imports, URL resolvers and the detail caches
+    func()
+    with record_queries() as recorder:
+        func()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "queries": recorder.count,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(_percentile(timings, 0.95), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(iterations=20, only=None, log=None):
+    """Run every serializer and view benchmark against the current database"""
+    log = log or (lambda message: None)
+    fx = Fixtures()
+    cache.clear()
+    benchmarks = {**serializer_benchmarks(fx), **view_benchmarks(fx)}
+    results = {}
+    for name, func in benchmarks.items():
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = measure(func, iterations)
+        log(name)
+    return {
+        "meta": {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "iterations": iterations,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(results, baseline, tolerance=0.25, min_ms=1.0, min_kb=64.0):
+    """
+    Regressions of ``results`` against ``baseline``: any extra query, or p95
+    latency / peak memory above the baseline by more than ``tolerance`` (a
+    fraction) and by more than min_ms / min_kb, which filters timer noise.
+    """
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if base is None:
+            continue
+        if current["queries"] > base["queries"]:
+            regressions.append(f"{name}: queries {base['queries']} -> {current['queries']}")
+        for key, floor, unit in (("p95_ms", min_ms, "ms"), ("peak_kb", min_kb, "KB")):
+            limit = base[key] * (1 + tolerance)
+            if current[key] > limit and current[key] - base[key] > floor:
+                regressions.append(f"{name}: {key} {base[key]}{unit} -> {current[key]}{unit}")
+    return regressions
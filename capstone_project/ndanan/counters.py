@@ -0,0 +1,64 @@
+from django.db.models import F, Subquery
+
+from .models import Course, Assignment, Submission
+from .tasks import task
+
+
+def adjust(model, pk, field, delta):
+    """Atomically add ``delta`` to a counter column, never going below zero"""
+    if not delta:
+        return
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def adjust_graded(submission_id, delta):
+    """Adjust graded_count on the assignment owning ``submission_id`` in one UPDATE"""
+    assignment_id = Submission.objects.filter(pk=submission_id).values("assignment_id")
+    queryset = Assignment.objects.filter(pk=Subquery(assignment_id))
+    if delta < 0:
+        queryset = queryset.filter(graded_count__gte=-delta)
+    queryset.update(graded_count=F("graded_count") + delta)
+
+
+def rebuild_course_counters(batch_size=500):
+    """Recompute every Course counter from the source tables; returns rows changed"""
+    changed = []
+    for course in Course.objects.with_counts().only(
+        "id", "student_count", "material_count", "assignment_count"
+    ).iterator(chunk_size=batch_size):
+        if (course.student_count, course.material_count, course.assignment_count) != (
+            course.num_students, course.num_materials, course.num_assignments
+        ):
+            course.student_count = course.num_students
+            course.material_count = course.num_materials
+            course.assignment_count = course.num_assignments
+            changed.append(course)
+    Course.objects.bulk_update(
+        changed, ["student_count", "material_count", "assignment_count"], batch_size=batch_size
+    )
+    return len(changed)
+
+
+def rebuild_assignment_counters(batch_size=500):
+    """Recompute every Assignment counter from the source tables; returns rows changed"""
+    changed = []
+    for assignment in Assignment.objects.with_counts().only(
+        "id", "submission_count", "graded_count"
+    ).iterator(chunk_size=batch_size):
+        if (assignment.submission_count, assignment.graded_count) != (
+            assignment.num_submissions, assignment.num_graded
+        ):
+            assignment.submission_count = assignment.num_submissions
+            assignment.graded_count = assignment.num_graded
+            changed.append(assignment)
+    Assignment.objects.bulk_update(changed, ["submission_count", "graded_count"], batch_size=batch_size)
+    return len(changed)
+
+
+@task("counters.rebuild", max_attempts=1)
+def rebuild_all_counters(batch_size=500):
+    rebuild_course_counters(batch_size=batch_size)
+    rebuild_assignment_counters(batch_size=batch_size)
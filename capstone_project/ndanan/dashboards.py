@@ -0,0 +1,161 @@
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Assignment, CourseEnrollment, Grade, StudentDashboard, Submission, User
+from .tasks import enqueue_on_commit, task
+
+SECTIONS = ["courses", "upcoming", "pending", "recent_grades"]
+# Rows kept per section; upcoming keeps spares so it survives a few due dates
+SECTION_SIZES = {"upcoming": 20, "pending": 10, "recent_grades": 5}
+DATE_FIELDS = {"due_date", "submitted_at", "graded_at"}
+BATCH_SIZE = 500
+
+
+def _by_student(rows, size=None):
+    """Group value rows ordered by student_id into {student_id: [row, ...]}, at most ``size`` each"""
+    grouped = {}
+    for student_id, group in groupby(rows, key=lambda row: row.pop("student_id")):
+        grouped[student_id] = list(group)[:size]
+    return grouped
+
+
+def _courses(student_ids, now):
+    return _by_student(
+        CourseEnrollment.objects.filter(student_id__in=student_ids, is_active=True)
+        .order_by("student_id", "course__name", "course_id")
+        .values("student_id", "course_id", name=F("course__name"), course_code=F("course__course_code"),
+                teacher_name=Concat("course__teacher__first_name", Value(" "), "course__teacher__last_name"))
+    )
+
+
+def _upcoming(student_ids, now):
+    submitted = Submission.objects.filter(assignment=OuterRef("pk"), student_id=OuterRef("student_id"))
+    return _by_student(
+        Assignment.objects.filter(
+            course__enrollments__student_id__in=student_ids, course__enrollments__is_active=True, due_date__gt=now,
+        )
+        .annotate(student_id=F("course__enrollments__student_id"))
+        .filter(~Exists(submitted))
+        .order_by("student_id", "due_date", "id")
+        .values("student_id", "id", "title", "due_date", "max_score", course_code=F("course__course_code")),
+        SECTION_SIZES["upcoming"],
+    )
+
+
+def _pending(student_ids, now):
+    return _by_student(
+        Submission.objects.filter(student_id__in=student_ids, status="submitted")
+        .order_by("student_id", "-submitted_at", "-id")
+        .values("student_id", "id", "submitted_at", assignment_title=F("assignment__title"),
+                course_code=F("assignment__course__course_code")),
+        SECTION_SIZES["pending"],
+    )
+
+
+def _recent_grades(student_ids, now):
+    return _by_student(
+        Grade.objects.filter(submission__student_id__in=student_ids)
+        .order_by("submission__student_id", "-graded_at", "-id")
+        .values("score", "graded_at", student_id=F("submission__student_id"),
+                assignment_title=F("submission__assignment__title"),
+                max_score=F("submission__assignment__max_score"),
+                course_code=F("submission__assignment__course__course_code")),
+        SECTION_SIZES["recent_grades"],
+    )
+
+
+BUILDERS = {"courses": _courses, "upcoming": _upcoming, "pending": _pending, "recent_grades": _recent_grades}
+
+
+def refresh_dashboards(student_ids, sections=SECTIONS):
+    """
+    Rebuild ``sections`` of these students' dashboards with one query per
+    section for the whole batch. Students without a dashboard row yet get
+    every section, so a partial refresh never leaves a half-empty row.
+    """
+    student_ids = list(student_ids)
+    if not student_ids:
+        return
+    now = timezone.now()
+    existing = set(StudentDashboard.objects.filter(student_id__in=student_ids).values_list("student_id", flat=True))
+    missing = [i for i in student_ids if i not in existing]
+    if missing:
+        # The task may run after a student was deleted
+        missing = list(User.objects.filter(pk__in=missing).values_list("id", flat=True))
+    for ids, wanted in ((sorted(existing), sections), (missing, SECTIONS)):
+        if not ids:
+            continue
+        built = {section: BUILDERS[section](ids, now) for section in wanted}
+        rows = []
+        for student_id in ids:
+            row = StudentDashboard(student_id=student_id, **{
+                section: built[section].get(student_id, []) for section in wanted
+            })
+            if "upcoming" in wanted:
+                row.expires_at = row.upcoming[0]["due_date"] if row.upcoming else None
+            rows.append(row)
+        fields = list(wanted) + (["expires_at"] if "upcoming" in wanted else []) + ["updated_at"]
+        StudentDashboard.objects.bulk_create(
+            rows, batch_size=BATCH_SIZE, update_conflicts=True, unique_fields=["student"], update_fields=fields,
+        )
+
+
+def _parse_dates(rows):
+    for row in rows:
+        for field in DATE_FIELDS.intersection(row):
+            row[field] = parse_datetime(row[field])
+    return rows
+
+
+def get_dashboard(student):
+    """
+    The student's dashboard sections with dates parsed, in one lookup.
+    The row is rebuilt first when it is missing or an upcoming assignment has fallen due.
+    """
+    now = timezone.now()
+    dashboard = StudentDashboard.objects.filter(student=student).first()
+    if dashboard is None or (dashboard.expires_at is not None and dashboard.expires_at <= now):
+        refresh_dashboards([student.pk])
+        dashboard = StudentDashboard.objects.get(student=student)
+    sections = {section: _parse_dates(getattr(dashboard, section)) for section in SECTIONS}
+    sections["upcoming"] = [row for row in sections["upcoming"] if row["due_date"] > now][:5]
+    sections["updated_at"] = dashboard.updated_at
+    return sections
+
+
+@task("dashboards.refresh")
+def refresh_dashboards_task(student_ids, sections):
+    refresh_dashboards(student_ids, sections)
+
+
+@task("dashboards.refresh_course")
+def refresh_course_dashboards(course_id, sections):
+    student_ids = list(
+        CourseEnrollment.objects.filter(course_id=course_id, is_active=True).values_list("student_id", flat=True)
+    )
+    for start in range(0, len(student_ids), BATCH_SIZE):
+        refresh_dashboards(student_ids[start:start + BATCH_SIZE], sections)
+
+
+def refresh_on_commit(student_id, sections):
+    """A student's own change: refresh their row right after commit so their next page shows it"""
+    transaction.on_commit(lambda: refresh_dashboards([student_id], sections))
+
+
+def schedule_refresh(student_ids, sections):
+    """Many students at once (bulk enrollment or grading): leave it to the task worker"""
+    student_ids = sorted(set(student_ids))
+    for start in range(0, len(student_ids), BATCH_SIZE):
+        enqueue_on_commit("dashboards.refresh", {
+            "student_ids": student_ids[start:start + BATCH_SIZE], "sections": sections,
+        })
+
+
+def schedule_course_refresh(course_id, sections):
+    """Every student of a course, e.g. after an assignment is added or the course renamed"""
+    enqueue_on_commit("dashboards.refresh_course", {"course_id": course_id, "sections": sections})
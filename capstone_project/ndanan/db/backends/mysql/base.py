@@ -0,0 +1,41 @@
+from django.db.backends.mysql import base
+
+from ndanan.db.pool import ConnectionPool, get_pool
+
+
+def _ping(conn):
+    try:
+        conn.ping()
+    except Exception:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The MySQL backend with connections borrowed from a bounded per-process pool.
+    ``connect()`` checks one out and ``close()`` hands it back instead of
+    closing it, so requests skip the TCP/auth handshake. Configure with the
+    POOL entry of the database settings (MAX_SIZE, TIMEOUT, RECYCLE) and keep
+    CONN_MAX_AGE at 0 so every request returns its connection.
+    """
+
+    def _get_pool(self, conn_params=None):
+        options = self.settings_dict.get("POOL") or {}
+        return get_pool(self.alias, lambda: ConnectionPool(
+            connect=lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            max_size=options.get("MAX_SIZE", 10),
+            timeout=options.get("TIMEOUT", 5.0),
+            recycle=options.get("RECYCLE"),
+            check=_ping,
+        ))
+
+    def get_new_connection(self, conn_params):
+        return self._get_pool(conn_params).acquire()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # A connection left mid-transaction or broken by an error is not handed on
+        reusable = not self.in_atomic_block and not (self.errors_occurred and not self.is_usable())
+        self._get_pool().release(self.connection, reusable=reusable)
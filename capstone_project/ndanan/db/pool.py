@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    """No connection became free within the pool's wait timeout"""
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of DB-API connections for one database.
+    At most ``max_size`` connections are open at once; callers beyond that
+    wait up to ``timeout`` seconds for one to be released. Idle connections
+    older than ``recycle`` seconds, or failing ``check``, are replaced.
+    """
+
+    def __init__(self, connect, max_size, timeout=5.0, recycle=None, check=None, close=None):
+        self._connect = connect
+        self._check = check
+        self._close = close or (lambda conn: conn.close())
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._opened_at = {}
+        self._size = 0
+        self._counters = dict.fromkeys(
+            ["checkouts", "waits", "timeouts", "created", "reconnects", "recycled", "discarded"], 0
+        )
+        self._wait_seconds = 0.0
+
+    def _count(self, name):
+        with self._cond:
+            self._counters[name] += 1
+
+    def _discard(self, conn):
+        try:
+            self._close(conn)
+        except Exception:
+            pass
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn = opened_at = None
+        with self._cond:
+            waited = False
+            while True:
+                if self._idle:
+                    conn, opened_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve a slot; the connection is opened outside the lock
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s (pool size {self.max_size})")
+                waited = True
+                self._cond.wait(remaining)
+            self._counters["checkouts"] += 1
+            if waited:
+                self._counters["waits"] += 1
+                self._wait_seconds += time.monotonic() - started
+
+        if conn is not None:
+            if self.recycle is not None and time.monotonic() - opened_at > self.recycle:
+                self._discard(conn)
+                self._count("recycled")
+                conn = None
+            elif self._check is not None and not self._check(conn):
+                self._discard(conn)
+                self._count("reconnects")
+                conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            opened_at = time.monotonic()
+            self._count("created")
+
+        with self._cond:
+            self._opened_at[id(conn)] = opened_at
+        return conn
+
+    def release(self, conn, reusable=True):
+        """Return ``conn``; unusable connections are closed and their slot freed"""
+        with self._cond:
+            opened_at = self._opened_at.pop(id(conn), None)
+            keep = reusable and opened_at is not None
+            if keep:
+                self._idle.append((conn, opened_at))
+            else:
+                self._size -= 1
+                self._counters["discarded"] += 1
+            self._cond.notify()
+        if not keep:
+            self._discard(conn)
+
+    def close_idle(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "open": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "wait_seconds": round(self._wait_seconds, 3),
+                **self._counters,
+            }
+
+
+def get_pool(alias, factory):
+    """The process-wide pool for database ``alias``, created by ``factory()`` on first use"""
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = factory()
+        return pool
+
+
+def pool_stats():
+    """Metrics of every pool in this process, by database alias"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
@@ -0,0 +1,95 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import Assignment, DeadlineReminder, Submission
+from .notifications import notify_deadline
+from .tasks import task
+
+
+def reminder_buckets(now=None, windows=None):
+    """
+    (window_hours, start, end) per reminder window, tightest first. An
+    assignment due in (start, end] gets that window's reminder; buckets do not
+    overlap, so an assignment created two hours before its deadline gets the
+    2h reminder only, not the 24h one as well.
+    """
+    now = now or timezone.now()
+    windows = sorted(windows or settings.DEADLINE_REMINDER_HOURS)
+    start = now
+    buckets = []
+    for hours in windows:
+        end = now + timedelta(hours=hours)
+        buckets.append((hours, start, end))
+        start = end
+    return buckets
+
+
+def students_to_remind(window_hours, start, end):
+    """
+    (assignment_id, student_id) for every active student of an assignment due
+    in (start, end] who has not submitted it and has not had this window's
+    reminder, or a tighter one. One anti-join: the due_date index bounds the
+    assignments, and each NOT EXISTS is an index lookup, so the cost follows
+    the assignments due in the bucket rather than the size of the tables.
+    """
+    submitted = Submission.objects.filter(assignment=OuterRef("pk"), student=OuterRef("student_id"))
+    reminded = DeadlineReminder.objects.filter(
+        assignment=OuterRef("pk"), student=OuterRef("student_id"), window_hours__lte=window_hours,
+    )
+    return (
+        Assignment.objects.filter(
+            due_date__gt=start, due_date__lte=end, course__is_active=True, course__enrollments__is_active=True,
+        )
+        .annotate(student_id=F("course__enrollments__student_id"))
+        .filter(~Exists(submitted), ~Exists(reminded))
+        .order_by("id", "student_id")
+        .values_list("id", "student_id")
+    )
+
+
+def schedule_reminders(now=None, batch_size=None):
+    """
+    Record and queue every reminder due now; returns how many were queued.
+    Students are batched per assignment into one notification task each. The
+    DeadlineReminder rows are unique per assignment, student and window and
+    carry the id of the run that inserted them; only those rows are mailed,
+    so a rerun, or a second scheduler racing this one, queues nothing twice.
+    """
+    batch_size = batch_size or settings.DEADLINE_REMINDER_BATCH_SIZE
+    run = uuid.uuid4()
+    queued = 0
+    for window_hours, start, end in reminder_buckets(now):
+        pairs = list(students_to_remind(window_hours, start, end))
+        for offset in range(0, len(pairs), batch_size):
+            batch = pairs[offset:offset + batch_size]
+            with transaction.atomic():
+                DeadlineReminder.objects.bulk_create(
+                    [DeadlineReminder(assignment_id=a, student_id=s, window_hours=window_hours, run=run)
+                     for a, s in batch],
+                    ignore_conflicts=True,
+                )
+                # Rows a racing scheduler inserted first were skipped and are its to mail
+                inserted = set(
+                    DeadlineReminder.objects.filter(
+                        run=run, window_hours=window_hours,
+                        assignment_id__in={a for a, _ in batch}, student_id__in={s for _, s in batch},
+                    ).values_list("assignment_id", "student_id")
+                )
+                by_assignment = {}
+                for assignment_id, student_id in batch:
+                    if (assignment_id, student_id) in inserted:
+                        by_assignment.setdefault(assignment_id, []).append(student_id)
+                for assignment_id, student_ids in by_assignment.items():
+                    notify_deadline(assignment_id, student_ids, window_hours)
+            queued += sum(len(student_ids) for student_ids in by_assignment.values())
+    return queued
+
+
+@task("deadlines.schedule_reminders", max_attempts=1)
+def schedule_reminders_task():
+    schedule_reminders()
@@ -0,0 +1,87 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import User, Material
+from .tasks import enqueue_on_commit, task
+
+
+# (suffix, extension) of every derivative kind
+THUMBNAIL = ("thumb", ".jpg")
+PREVIEW = ("preview", ".png")
+
+
+def derivative_name(original_name, suffix, extension):
+    """Derivatives live next to the original: blobs/ab/cd/<hash>.thumb.jpg"""
+    return f"{os.path.splitext(original_name)[0]}.{suffix}{extension}"
+
+
+def delete_derivatives(original_name):
+    """Remove every derivative of a file; gc_blobs calls this when the original goes"""
+    for suffix, extension in (THUMBNAIL, PREVIEW):
+        name = derivative_name(original_name, suffix, extension)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+# Rendering: plain paths in, nothing Django-specific
+
+def render_thumbnail(source_path, dest_path, size):
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        thumbnail = ImageOps.fit(image.convert("RGB"), (size, size))
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        thumbnail.save(dest_path, "JPEG", quality=85, optimize=True)
+    return True
+
+
+def render_pdf_preview(source_path, dest_path, width):
+    """First page as a PNG; needs PyMuPDF, skipped when it is not installed"""
+    try:
+        import fitz
+    except ImportError:
+        return False
+
+    with fitz.open(source_path) as document:
+        if document.page_count == 0:
+            return False
+        page = document[0]
+        zoom = width / page.rect.width
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        pixmap.save(dest_path)
+    return True
+
+
+# Background tasks, run by the task worker
+
+@task("derivatives.profile_thumbnail")
+def make_profile_thumbnail(user_id, picture_name):
+    dest_name = derivative_name(picture_name, *THUMBNAIL)
+    if not default_storage.exists(dest_name):
+        source_path = User._meta.get_field("profile_picture").storage.path(picture_name)
+        render_thumbnail(source_path, default_storage.path(dest_name), settings.PROFILE_THUMBNAIL_SIZE)
+    # Only record it if the user has not changed picture in the meantime
+    User.objects.filter(pk=user_id, profile_picture=picture_name).update(profile_thumbnail=dest_name)
+
+
+@task("derivatives.material_preview")
+def make_material_preview(material_id, file_name):
+    dest_name = derivative_name(file_name, *PREVIEW)
+    if not default_storage.exists(dest_name):
+        source_path = Material._meta.get_field("file").storage.path(file_name)
+        if not render_pdf_preview(source_path, default_storage.path(dest_name), settings.MATERIAL_PREVIEW_WIDTH):
+            return
+    Material.objects.filter(pk=material_id, file=file_name).update(preview=dest_name)
+
+
+def schedule_profile_thumbnail(user_id, picture_name):
+    enqueue_on_commit("derivatives.profile_thumbnail", {"user_id": user_id, "picture_name": picture_name})
+
+
+def schedule_material_preview(material_id, file_name):
+    if file_name.lower().endswith(".pdf"):
+        enqueue_on_commit("derivatives.material_preview", {"material_id": material_id, "file_name": file_name})
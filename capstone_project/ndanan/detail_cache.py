@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Course, Material
+from .replicas import primary_reads
+from .serializers import CourseDetailSerializer, MaterialSerializer
+
+DETAIL_KEY = "ndanan:detail:{}:{}"
+STATS_KEY = "ndanan:detail:stats:{}"
+
+
+def _version(obj):
+    """Version stamp for ``obj``; any save through the ORM moves updated_at"""
+    return obj.updated_at.isoformat()
+
+
+def _record(outcome):
+    key = STATS_KEY.format(outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First event since the counters were reset or evicted
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def _read_through(kind, obj, build):
+    key = DETAIL_KEY.format(kind, obj.pk)
+    version = _version(obj)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        _record("hits")
+        return cached[1]
+
+    _record("misses")
+    # Built from the primary: a payload read from a lagging replica would be served until it expires
+    with primary_reads():
+        payload = build()
+    cache.set(key, (version, payload), settings.DETAIL_CACHE_TIMEOUT)
+    return payload
+
+
+def _build_course_detail(course):
+    course = Course.objects.with_teacher().with_enrolled_students().get(pk=course.pk)
+    payload = dict(CourseDetailSerializer(course).data)
+    payload["materials"] = list(
+        course.materials.order_by("-created_at", "-id").values("id", "title", "description")
+    )
+    return payload
+
+
+def _build_material_detail(material):
+    material = Material.objects.select_related("course", "uploaded_by").get(pk=material.pk)
+    return dict(MaterialSerializer(material).data)
+
+
+def get_course_detail(course):
+    """Serialized course, enrolled students and materials for the detail page"""
+    return _read_through("course", course, lambda: _build_course_detail(course))
+
+
+def get_material_detail(material):
+    """Serialized material for the detail page"""
+    return _read_through("material", material, lambda: _build_material_detail(material))
+
+
+def invalidate_course_detail(*course_ids):
+    cache.delete_many([DETAIL_KEY.format("course", pk) for pk in course_ids])
+
+
+def invalidate_material_detail(*material_ids):
+    cache.delete_many([DETAIL_KEY.format("material", pk) for pk in material_ids])
+
+
+def detail_cache_stats():
+    """Hit and miss counters shared by every process using the cache"""
+    hits = cache.get(STATS_KEY.format("hits"), 0)
+    misses = cache.get(STATS_KEY.format("misses"), 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+
+def reset_detail_cache_stats():
+    cache.delete_many([STATS_KEY.format("hits"), STATS_KEY.format("misses")])
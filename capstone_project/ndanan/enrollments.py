@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+import time
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from . import counters, dashboards
+from .access import invalidate_enrolled_course_ids
+from .analytics import schedule_course_refresh
+from .detail_cache import invalidate_course_detail
+from .models import User, Course, CourseEnrollment
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class BulkEnrollmentResult:
+    """Outcome of a bulk enrollment run, including per-row errors and throughput"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    def add_error(self, row_number, message):
+        self.errors.append({"row": row_number, "error": message})
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def read_enrollment_rows(stream, fmt):
+    """
+    Parse CSV or JSON into dicts with ``course_code`` and ``student``.
+    ``student`` may be an email or a user id; CSV headers student_email and
+    student_id are accepted as aliases.
+    """
+    if isinstance(stream, bytes):
+        stream = stream.decode("utf-8-sig")
+    if isinstance(stream, str):
+        stream = io.StringIO(stream)
+
+    if fmt == "json":
+        records = json.load(stream)
+    elif fmt == "csv":
+        records = csv.DictReader(stream)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    if fmt == "json" and not isinstance(records, list):
+        raise ValueError("JSON must be a list of rows")
+    rows = []
+    for record in records:
+        if not isinstance(record, dict):
+            raise ValueError("Every row must be an object")
+        student = record.get("student") or record.get("student_email") or record.get("student_id")
+        rows.append({"course_code": record.get("course_code"), "student": student})
+    return rows
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _load_students(keys, chunk_size):
+    """Map every email and id in ``keys`` to (id, role) using set-based lookups"""
+    emails = {key.lower() for key in keys if "@" in key}
+    ids = {int(key) for key in keys if key.isdigit()}
+    found = {}
+    for chunk in _chunks(emails, chunk_size):
+        for pk, email, role in User.objects.filter(email__in=chunk).values_list("id", "email", "role"):
+            found[email.lower()] = (pk, role)
+    # Stored addresses keep the case they were typed in; those miss the indexed lookup above
+    for chunk in _chunks(emails.difference(found), chunk_size):
+        matches = reduce(or_, (Q(email__iexact=email) for email in chunk))
+        for pk, email, role in User.objects.filter(matches).values_list("id", "email", "role"):
+            found[email.lower()] = (pk, role)
+    for chunk in _chunks(ids, chunk_size):
+        for pk, role in User.objects.filter(id__in=chunk).values_list("id", "role"):
+            found[str(pk)] = (pk, role)
+    return found
+
+
+def _active_pairs(pairs, chunk_size):
+    """The (course_id, student_id) pairs among ``pairs`` that are already actively enrolled"""
+    found = set()
+    course_ids = {course_id for course_id, _ in pairs}
+    for chunk in _chunks({student_id for _, student_id in pairs}, chunk_size):
+        found.update(
+            CourseEnrollment.objects.filter(course_id__in=course_ids, student_id__in=chunk, is_active=True)
+            .values_list("course_id", "student_id")
+        )
+    return found.intersection(pairs)
+
+
+def _write_enrollments(pairs, chunk_size):
+    """Insert the pairs and update counters and caches in one transaction"""
+    # bulk_create skips the model signals, so counters and caches are updated here
+    added = {}
+    with transaction.atomic():
+        for chunk in _chunks(pairs, chunk_size):
+            CourseEnrollment.objects.bulk_create(
+                [CourseEnrollment(course_id=course_id, student_id=student_id) for course_id, student_id in chunk]
+            )
+        for course_id, _ in pairs:
+            added[course_id] = added.get(course_id, 0) + 1
+        for course_id, count in added.items():
+            counters.adjust(Course, course_id, "student_count", count)
+            schedule_course_refresh(course_id)
+
+        student_ids = {student_id for _, student_id in pairs}
+        transaction.on_commit(lambda: invalidate_enrolled_course_ids(*student_ids))
+        dashboards.schedule_refresh(student_ids, ["courses", "upcoming"])
+        transaction.on_commit(lambda: invalidate_course_detail(*added))
+
+
+def bulk_enroll(rows, requested_by=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Enroll (course_code, student) pairs with a fixed number of queries per chunk.
+    Existing active enrollments are skipped; everything is written in one
+    transaction. Teachers may only enroll students into their own courses.
+    """
+    started = time.perf_counter()
+    result = BulkEnrollmentResult()
+    result.rows = len(rows)
+
+    pending = []
+    for number, row in enumerate(rows, start=1):
+        code = str(row.get("course_code") or "").strip()
+        student = str(row.get("student") or "").strip().lower()
+        if not code or not student:
+            result.add_error(number, "course_code and student are required")
+            continue
+        pending.append((number, code, student))
+
+    courses = {}
+    for chunk in _chunks({code for _, code, _ in pending}, chunk_size):
+        for course in Course.objects.filter(course_code__in=chunk).only("id", "course_code", "teacher_id"):
+            courses[course.course_code] = course
+    students = _load_students({student for _, _, student in pending}, chunk_size)
+
+    candidates = []
+    for number, code, student in pending:
+        course = courses.get(code)
+        if course is None:
+            result.add_error(number, f"Course {code} not found")
+            continue
+        if requested_by is not None and requested_by.role == "teacher" and course.teacher_id != requested_by.pk:
+            result.add_error(number, f"You are not the teacher of {code}")
+            continue
+        if student not in students:
+            result.add_error(number, "Student not found")
+            continue
+        student_id, role = students[student]
+        if role != "student":
+            result.add_error(number, "User must be a student")
+            continue
+        candidates.append((course.pk, student_id))
+
+    existing = _active_pairs(candidates, chunk_size)
+
+    new_pairs = []
+    for pair in candidates:
+        if pair in existing:
+            result.skipped += 1
+            continue
+        existing.add(pair)
+        new_pairs.append(pair)
+
+    try:
+        _write_enrollments(new_pairs, chunk_size)
+    except IntegrityError:
+        # A concurrent request enrolled some of these pairs after they were checked;
+        # the transaction rolled back, so skip those and write the rest again
+        taken = _active_pairs(new_pairs, chunk_size)
+        result.skipped += len(taken)
+        new_pairs = [pair for pair in new_pairs if pair not in taken]
+        _write_enrollments(new_pairs, chunk_size)
+
+    result.created = len(new_pairs)
+    result.elapsed = time.perf_counter() - started
+    return result
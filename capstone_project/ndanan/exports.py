@@ -0,0 +1,89 @@
+import csv
+import json
+
+from .models import CourseEnrollment, Submission
+
+DEFAULT_CHUNK_SIZE = 2000
+
+GRADEBOOK_COLUMNS = [
+    "student_id", "student_email", "student_name", "assignment_id", "assignment_title",
+    "max_score", "status", "score", "submitted_at", "is_late",
+]
+
+
+def gradebook_rows(course, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield one row per (active student, assignment) of ``course``.
+    Students and submissions are both streamed in student order with
+    .iterator() and merged, so memory holds one student's submissions at a time.
+    """
+    assignments = list(course.assignments.order_by("due_date", "id").values("id", "title", "max_score", "due_date"))
+
+    students = (
+        CourseEnrollment.objects.filter(course=course, is_active=True)
+        .order_by("student_id")
+        .values_list("student_id", "student__email", "student__first_name", "student__last_name")
+        .iterator(chunk_size=chunk_size)
+    )
+    submissions = (
+        Submission.objects.filter(assignment__course=course)
+        .order_by("student_id", "submitted_at", "id")
+        .values_list("student_id", "assignment_id", "status", "submitted_at", "grade__score")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    pending = next(submissions, None)
+    for student_id, email, first_name, last_name in students:
+        # Skip submissions of students who are no longer enrolled
+        while pending is not None and pending[0] < student_id:
+            pending = next(submissions, None)
+
+        latest = {}
+        while pending is not None and pending[0] == student_id:
+            latest[pending[1]] = pending
+            pending = next(submissions, None)
+
+        for assignment in assignments:
+            submission = latest.get(assignment["id"])
+            if submission is None:
+                status, score, submitted_at, is_late = "missing", None, None, None
+            else:
+                _, _, status, submitted_at, score = submission
+                is_late = submitted_at > assignment["due_date"]
+            yield {
+                "student_id": student_id,
+                "student_email": email,
+                "student_name": f"{first_name} {last_name}",
+                "assignment_id": assignment["id"],
+                "assignment_title": assignment["title"],
+                "max_score": assignment["max_score"],
+                "status": status,
+                "score": score,
+                "submitted_at": submitted_at.isoformat() if submitted_at else None,
+                "is_late": is_late,
+            }
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the generator"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.DictWriter(_Echo(), fieldnames=GRADEBOOK_COLUMNS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv"),
+    "jsonl": (stream_jsonl, "application/x-ndjson"),
+}
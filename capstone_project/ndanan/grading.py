@@ -0,0 +1,136 @@
+import math
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import counters, dashboards
+from .analytics import schedule_course_refresh
+from .models import Assignment, Submission, Grade
+from .notifications import notify_grade_posted
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+class BatchGradingResult:
+    """Outcome of a batch grading run; nothing is written when errors is non-empty"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    def add_error(self, row_number, message):
+        self.errors.append({"row": row_number, "error": message})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "errors": self.errors,
+            "elapsed_seconds": round(self.elapsed, 3),
+        }
+
+
+def _clean_row(row):
+    """Return (submission_id, score, feedback) or raise ValueError with the row's problem"""
+    try:
+        submission_id = int(row.get("submission_id"))
+    except (TypeError, ValueError):
+        raise ValueError("submission_id must be an integer")
+    try:
+        score = float(row.get("score"))
+    except (TypeError, ValueError):
+        raise ValueError("score must be a number")
+    # float() accepts "nan" and "inf", which would poison the grade analytics
+    if not math.isfinite(score):
+        raise ValueError("score must be a finite number")
+    if score < 0:
+        raise ValueError("Score cannot be negative")
+    return submission_id, score, str(row.get("feedback") or "")
+
+
+def grade_batch(rows, graded_by, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Grade many submissions in one transaction.
+    Every row is validated against its assignment's max_score using a single
+    joined query; if any row fails, nothing is written. Grades are written with
+    bulk_create/bulk_update and the submissions flipped to graded with one UPDATE.
+    """
+    started = time.perf_counter()
+    result = BatchGradingResult()
+    result.rows = len(rows)
+
+    cleaned = []
+    for number, row in enumerate(rows, start=1):
+        try:
+            cleaned.append((number,) + _clean_row(row))
+        except ValueError as exc:
+            result.add_error(number, str(exc))
+
+    submissions = Submission.objects.select_related("assignment__course", "grade").in_bulk(
+        {submission_id for _, submission_id, _, _ in cleaned}
+    )
+
+    seen = set()
+    to_create, to_update = [], []
+    now = timezone.now()
+    for number, submission_id, score, feedback in cleaned:
+        submission = submissions.get(submission_id)
+        if submission is None:
+            result.add_error(number, "Submission not found")
+            continue
+        if submission_id in seen:
+            result.add_error(number, "Submission appears more than once")
+            continue
+        seen.add(submission_id)
+
+        assignment = submission.assignment
+        if graded_by.role != "admin" and assignment.course.teacher_id != graded_by.pk:
+            result.add_error(number, "You are not the teacher of this course.")
+            continue
+        if score > assignment.max_score:
+            result.add_error(number, f"Score cannot be greater than the max score of {assignment.max_score}")
+            continue
+
+        grade = submission.get_grade()
+        if grade is None:
+            to_create.append(Grade(submission=submission, score=score, feedback=feedback, graded_by=graded_by))
+        else:
+            grade.score, grade.feedback, grade.graded_by, grade.updated_at = score, feedback, graded_by, now
+            to_update.append(grade)
+
+    if result.errors:
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    # bulk_create skips the model signals, so graded_count is bumped and analytics and dashboards refreshed here
+    with transaction.atomic():
+        Grade.objects.bulk_create(to_create, batch_size=chunk_size)
+        Grade.objects.bulk_update(
+            to_update, ["score", "feedback", "graded_by", "updated_at"], batch_size=chunk_size
+        )
+        Submission.objects.filter(pk__in=seen).exclude(status="graded").update(status="graded")
+
+        new_per_assignment = {}
+        for grade in to_create:
+            assignment_id = grade.submission.assignment_id
+            new_per_assignment[assignment_id] = new_per_assignment.get(assignment_id, 0) + 1
+        for assignment_id, count in new_per_assignment.items():
+            counters.adjust(Assignment, assignment_id, "graded_count", count)
+
+        for grade in to_create:
+            notify_grade_posted(grade)
+        for course_id in {submissions[submission_id].assignment.course_id for submission_id in seen}:
+            schedule_course_refresh(course_id)
+        dashboards.schedule_refresh(
+            [submissions[submission_id].student_id for submission_id in seen], ["pending", "recent_grades"]
+        )
+
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    result.elapsed = time.perf_counter() - started
+    return result
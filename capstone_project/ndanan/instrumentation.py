@@ -0,0 +1,125 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """
+    execute_wrapper that counts queries and DB time and tallies each SQL shape.
+    Parameters are not part of the shape, so a query repeated once per row
+    (the N+1 signature) shows up as one shape with a high count.
+    """
+
+    def __init__(self, duplicate_threshold=None):
+        self.duplicate_threshold = duplicate_threshold or settings.QUERY_DUPLICATE_THRESHOLD
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[sql] += 1
+
+    def duplicates(self):
+        """(sql, count) for shapes run at least duplicate_threshold times, most repeated first"""
+        return [(sql, n) for sql, n in self.shapes.most_common() if n >= self.duplicate_threshold]
+
+
+@contextmanager
+def record_queries(duplicate_threshold=None):
+    """Record every query run in this thread, on every database alias, inside the block"""
+    recorder = QueryRecorder(duplicate_threshold)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Per request: query count, DB time, duplicate query shapes and view time,
+    sent as a Server-Timing header and one JSON log line on ``ndanan.instrumentation``
+    (WARNING when a query shape repeats, INFO otherwise). Off with QUERY_INSTRUMENTATION=False.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # A sync process_view would be run on a worker thread for every request
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        return self.report(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        # Connections are per thread and the async ORM runs on the request's
+        # thread-sensitive worker, so the wrappers are installed there
+        recording = record_queries()
+        recorder = await sync_to_async(recording.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.__exit__)(None, None, None)
+        return self.report(request, response, recorder, started)
+
+    def report(self, request, response, recorder, started):
+        total = time.perf_counter() - started
+        view_started = getattr(request, "_view_started", None)
+        view = time.perf_counter() - view_started if view_started is not None else 0.0
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+            f"view;dur={view * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+        duplicates = recorder.duplicates()
+        level = logging.WARNING if duplicates else logging.INFO
+        if logger.isEnabledFor(level):
+            match = getattr(request, "resolver_match", None)
+            logger.log(level, json.dumps({
+                "event": "request",
+                "method": request.method,
+                "path": request.path,
+                "view": match.view_name if match else None,
+                "status": response.status_code,
+                "queries": recorder.count,
+                "db_ms": round(recorder.duration * 1000, 1),
+                "view_ms": round(view * 1000, 1),
+                "total_ms": round(total * 1000, 1),
+                "duplicates": [{"sql": sql[:300], "count": n} for sql, n in duplicates[:3]],
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
@@ -0,0 +1,172 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import path, include, reverse
+
+from ndanan import urls as ndanan_urls
+from ndanan.models import User, Course, CourseEnrollment, Material
+
+HOST = "localhost"
+
+
+def _urlconf(async_views):
+    """ndanan's URLs at the root, with the read views sync (WSGI) or async (ASGI)"""
+    read = ndanan_urls.read_patterns(async_views)
+    names = {pattern.name for pattern in read}
+    rest = [pattern for pattern in ndanan_urls.urlpatterns if pattern.name not in names]
+
+    class URLConf:
+        urlpatterns = [path("", include(read + rest))]
+    return URLConf
+
+
+def _summary(latencies, elapsed, errors):
+    latencies = sorted(latencies)
+    return {
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def run_wsgi(url, cookie, total, concurrency):
+    """Sync views through WSGIHandler, one request per worker thread as a threaded WSGI server would"""
+    handler = WSGIHandler()
+
+    def one(_):
+        environ = {
+            "REQUEST_METHOD": "GET", "PATH_INFO": url, "QUERY_STRING": "", "SCRIPT_NAME": "",
+            "SERVER_NAME": HOST, "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": HOST, "HTTP_COOKIE": cookie, "REMOTE_ADDR": "127.0.0.1",
+            "wsgi.input": BytesIO(), "wsgi.errors": BytesIO(), "wsgi.url_scheme": "http",
+            "wsgi.version": (1, 0), "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+        }
+        status = []
+        started = time.perf_counter()
+        response = handler(environ, lambda line, headers, exc_info=None: status.append(line))
+        b"".join(response)
+        response.close()
+        return time.perf_counter() - started, status[0].startswith("200")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    return _summary([r[0] for r in results], elapsed, sum(1 for r in results if not r[1]))
+
+
+def run_asgi(url, cookie, total, concurrency):
+    """Async views through ASGIHandler, with ``concurrency`` requests in flight on one event loop"""
+    handler = ASGIHandler()
+
+    async def one(semaphore):
+        async with semaphore:
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                "scheme": "http", "path": url, "raw_path": url.encode(), "query_string": b"", "root_path": "",
+                "headers": [(b"host", HOST.encode()), (b"cookie", cookie.encode())],
+                "client": ("127.0.0.1", 0), "server": (HOST, 80),
+            }
+            body_sent = False
+            never = asyncio.Event()
+            messages = []
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                # The client stays connected until the response is done
+                await never.wait()
+
+            async def send(message):
+                messages.append(message)
+
+            started = time.perf_counter()
+            await handler(scope, receive, send)
+            return time.perf_counter() - started, messages[0]["status"] == 200
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(one(semaphore) for _ in range(total)))
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - started
+    return _summary([r[0] for r in results], elapsed, sum(1 for r in results if not r[1]))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sync views under WSGI with the async views under ASGI at high concurrency. "
+        "Runs against a throwaway test database; use SQLite settings for a local baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Requests per page and mode")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--courses", type=int, default=20, help="Courses the benchmark student is enrolled in")
+        parser.add_argument("--materials", type=int, default=5, help="Materials per course")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            student, course, material = self.seed(options["courses"], options["materials"])
+            client = Client()
+            client.force_login(student)
+            cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+            self.stdout.write(
+                f"{options['requests']} requests per page, concurrency {options['concurrency']}, "
+                f"{connection.vendor} database"
+            )
+            self.stdout.write(f"{'page':<18}{'mode':<6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+            for mode, async_views, runner in (("wsgi", False, run_wsgi), ("asgi", True, run_asgi)):
+                conf = _urlconf(async_views)
+                with override_settings(ROOT_URLCONF=conf, ALLOWED_HOSTS=[HOST]):
+                    pages = {
+                        "course_list": reverse("course_list"),
+                        "course_details": reverse("course_details", args=[course.pk]),
+                        "material_list": reverse("material_list"),
+                        "material_details": reverse("material_details", args=[material.pk]),
+                    }
+                    for name, url in pages.items():
+                        # Each mode starts cold so neither benefits from the other's detail cache
+                        cache.clear()
+                        stats = runner(url, cookie, options["requests"], options["concurrency"])
+                        self.stdout.write(
+                            f"{name:<18}{mode:<6}{stats['rps']:>10.1f}{stats['p50_ms']:>10.1f}"
+                            f"{stats['p95_ms']:>10.1f}{stats['errors']:>8}"
+                        )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, num_courses, materials_per_course):
+        teacher = User.objects.create_user(
+            email="bench-teacher@school.edu", password="bench", first_name="Bench", last_name="Teacher", role="teacher"
+        )
+        student = User.objects.create_user(
+            email="bench-student@school.edu", password="bench", first_name="Bench", last_name="Student", role="student"
+        )
+        courses = [
+            Course.objects.create(name=f"Course {i}", course_code=f"BEN{i:04d}", teacher=teacher)
+            for i in range(num_courses)
+        ]
+        CourseEnrollment.objects.bulk_create([CourseEnrollment(course=c, student=student) for c in courses])
+        Material.objects.bulk_create([
+            Material(course=c, title=f"Material {i}", description="Benchmark material",
+                     file=f"materials/bench-{c.pk}-{i}.pdf", uploaded_by=teacher)
+            for c in courses for i in range(materials_per_course)
+        ])
+        return student, courses[0], courses[0].materials.first()
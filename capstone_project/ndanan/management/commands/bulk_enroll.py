@@ -0,0 +1,37 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ndanan.enrollments import DEFAULT_CHUNK_SIZE, bulk_enroll, read_enrollment_rows
+
+
+class Command(BaseCommand):
+    help = "Enroll a cohort from a CSV or JSON file of (course_code, student email/id) rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV with course_code,student columns or a JSON list of rows")
+        parser.add_argument("--format", choices=["csv", "json"], help="Defaults to the file extension")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        fmt = options["format"] or ("json" if path.suffix.lower() == ".json" else "csv")
+
+        with path.open(encoding="utf-8-sig", newline="") as stream:
+            try:
+                rows = read_enrollment_rows(stream, fmt)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+        result = bulk_enroll(rows, chunk_size=options["chunk_size"])
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} created, {result.skipped} skipped, {len(result.errors)} error(s) "
+            f"from {result.rows} rows in {result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s)"
+        ))
+        if options["verbosity"] > 1:
+            self.stdout.write(json.dumps(result.as_dict(), indent=2))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ndanan.detail_cache import detail_cache_stats, reset_detail_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit and miss counters for the course/material detail cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing them")
+
+    def handle(self, *args, **options):
+        stats = detail_cache_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.1%}"
+        )
+        if options["reset"]:
+            reset_detail_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ndanan.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, gradebook_rows
+from ndanan.models import Course
+
+
+class Command(BaseCommand):
+    help = "Stream a course's gradebook (students x assignments) as CSV or JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_code")
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--output", help="File to write; defaults to stdout")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(course_code=options["course_code"])
+        except Course.DoesNotExist:
+            raise CommandError(f"Course {options['course_code']} not found")
+
+        writer, _ = EXPORT_FORMATS[options["format"]]
+        chunks = writer(gradebook_rows(course, chunk_size=options["chunk_size"]))
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as stream:
+                stream.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
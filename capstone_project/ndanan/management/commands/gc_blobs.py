@@ -0,0 +1,85 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ndanan.derivatives import delete_derivatives
+from ndanan.models import StoredBlob
+from ndanan.storage import BLOB_PREFIX, blob_storage, referenced_blob_counts
+
+
+class Command(BaseCommand):
+    help = "Recount blob references from the file fields and delete blobs nothing uses"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age-hours", type=float, default=24,
+                            help="Keep unreferenced blobs younger than this (uploads still being attached)")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        cutoff = timezone.now() - timedelta(hours=options["min_age_hours"])
+        counts = referenced_blob_counts()
+
+        # Mark: repair reference counts that drifted (rows deleted without their files, failed saves)
+        drifted = []
+        for blob in StoredBlob.objects.only("id", "name", "ref_count").iterator(chunk_size=5000):
+            actual = counts.get(blob.name, 0)
+            if blob.ref_count != actual:
+                drifted.append((blob.pk, blob.ref_count, actual))
+        repaired = len(drifted)
+        if not dry_run:
+            # Only counts still as read: a save that re-referenced the blob since keeps its +1
+            repaired = sum(
+                StoredBlob.objects.filter(pk=pk, ref_count=read).update(ref_count=actual)
+                for pk, read, actual in drifted
+            )
+
+        # Sweep: only rows still unreferenced at delete time lose their file. Referenced
+        # names are skipped here rather than in SQL, where they would be one bind parameter each
+        removed, freed = 0, 0
+        candidates = StoredBlob.objects.filter(created_at__lt=cutoff)
+        if not dry_run:
+            # The counts were repaired above; a dry run left them as they were
+            candidates = candidates.filter(ref_count=0)
+        for blob in candidates.only("id", "name", "size").iterator(chunk_size=1000):
+            if blob.name in counts:
+                continue
+            if not dry_run and not self.remove_blob(blob):
+                continue
+            removed += 1
+            freed += blob.size
+
+        stale_temp = self.sweep_temp_files(cutoff, dry_run)
+        prefix = "Would remove" if dry_run else "Removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{repaired} reference count(s) repaired; {prefix} {removed} blob(s), "
+            f"{freed / (1024 * 1024):.1f}MB, and {stale_temp} stale temp file(s)"
+        ))
+
+    def remove_blob(self, blob):
+        """
+        Delete the file, its derivatives and the row while holding the row lock,
+        so a concurrent save of the same bytes waits and then writes the file again
+        """
+        with transaction.atomic():
+            if not StoredBlob.objects.select_for_update().filter(pk=blob.pk, ref_count=0).exists():
+                return False
+            blob_storage.delete_blob(blob.name)
+            delete_derivatives(blob.name)
+            StoredBlob.objects.filter(pk=blob.pk).delete()
+        return True
+
+    def sweep_temp_files(self, cutoff, dry_run):
+        temp_dir = blob_storage.path(os.path.join(BLOB_PREFIX, "tmp"))
+        if not os.path.isdir(temp_dir):
+            return 0
+        stale = 0
+        for entry in os.scandir(temp_dir):
+            if entry.is_file() and entry.stat().st_mtime < cutoff.timestamp():
+                stale += 1
+                if not dry_run:
+                    os.remove(entry.path)
+        return stale
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ndanan.benchmarks import COURSE_PREFIX, SCALES, generate_dataset
+from ndanan.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with a synthetic school for profiling. "
+        "run_benchmarks builds its own throwaway copy; use this to explore a dataset by hand."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=SCALES, default="medium")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if Course.objects.filter(course_code__startswith=COURSE_PREFIX).exists():
+            raise CommandError("Benchmark data is already present in this database")
+        started = time.perf_counter()
+        with transaction.atomic():
+            counts = generate_dataset(
+                **SCALES[options["scale"]], seed=options["seed"], batch_size=options["batch_size"],
+                log=lambda message: self.stdout.write(f"  {message}"),
+            )
+        summary = ", ".join(f"{n} {name}" for name, n in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {time.perf_counter() - started:.1f}s"))
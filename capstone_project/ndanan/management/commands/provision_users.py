@@ -0,0 +1,45 @@
+import csv
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ndanan.provisioning import DEFAULT_CHUNK_SIZE, provision_users, read_roster_rows
+
+
+class Command(BaseCommand):
+    help = "Create accounts from a CSV or JSON roster of (first_name, last_name, role, password) rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV with first_name,last_name,role[,password] columns or a JSON list of rows")
+        parser.add_argument("--format", choices=["csv", "json"], help="Defaults to the file extension")
+        parser.add_argument("--workers", type=int, help="Password hashing processes; defaults to PROVISIONING_HASH_WORKERS")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--output", help="Write the created accounts (row, id, email) to this CSV")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        fmt = options["format"] or ("json" if path.suffix.lower() == ".json" else "csv")
+
+        with path.open(encoding="utf-8-sig", newline="") as stream:
+            try:
+                rows = read_roster_rows(stream, fmt)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+        result = provision_users(rows, workers=options["workers"], chunk_size=options["chunk_size"])
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                writer = csv.DictWriter(output, fieldnames=["row", "id", "email"])
+                writer.writeheader()
+                writer.writerows(result.users)
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} created, {len(result.errors)} error(s) "
+            f"from {result.rows} rows in {result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s)"
+        ))
+        if options["verbosity"] > 1:
+            self.stdout.write(json.dumps(result.as_dict(), indent=2))
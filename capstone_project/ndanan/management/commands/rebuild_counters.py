@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from ndanan.counters import rebuild_course_counters, rebuild_assignment_counters
+from ndanan.tasks import enqueue
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized Course and Assignment counters from the source tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--background", action="store_true",
+                            help="Queue the rebuild for the task worker instead of running it now")
+
+    def handle(self, *args, **options):
+        if options["background"]:
+            task = enqueue("counters.rebuild", {"batch_size": options["batch_size"]}, priority=-10)
+            self.stdout.write(self.style.SUCCESS(f"Queued counter rebuild as task {task.pk}"))
+            return
+        courses = rebuild_course_counters(batch_size=options["batch_size"])
+        assignments = rebuild_assignment_counters(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt counters: {courses} course(s) and {assignments} assignment(s) corrected"
+        ))
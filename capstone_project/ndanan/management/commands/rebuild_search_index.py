@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ndanan.search import backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Re-index every course and material for search (after bulk imports or a SEARCH_BACKEND change)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        written = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} document(s) for the {backend()} backend"))
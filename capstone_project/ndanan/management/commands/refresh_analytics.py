@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from ndanan.analytics import refresh_course
+from ndanan.models import Course
+from ndanan.tasks import enqueue
+
+
+class Command(BaseCommand):
+    help = "Recompute the grade analytics summaries (assignment distributions and leaderboards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", type=int, action="append", help="Only this course id (repeatable)")
+        parser.add_argument("--background", action="store_true",
+                            help="Queue the refresh for the task worker instead of running it now")
+
+    def handle(self, *args, **options):
+        if options["background"]:
+            if options["course"]:
+                for course_id in options["course"]:
+                    enqueue("analytics.refresh_course", {"course_id": course_id}, priority=-5)
+            else:
+                enqueue("analytics.refresh_all", priority=-10)
+            self.stdout.write(self.style.SUCCESS("Queued analytics refresh"))
+            return
+        course_ids = options["course"] or Course.objects.values_list("id", flat=True)
+        rows = sum(refresh_course(course_id) for course_id in course_ids)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed analytics: {rows} summary row(s) written"))
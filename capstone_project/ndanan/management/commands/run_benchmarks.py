@@ -0,0 +1,76 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from ndanan.benchmarks import SCALES, compare, generate_dataset, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every serializer and read view (queries, p50/p95 latency, peak memory) "
+        "on a throwaway test database filled with generated data. Results are written as "
+        "JSON and can be compared with an earlier run. Use SQLite settings for a local baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=SCALES, default="small")
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--only", nargs="*", help="Run benchmarks whose name contains any of these")
+        parser.add_argument("--output", default="benchmark-results.json")
+        parser.add_argument("--baseline", help="Earlier results to compare against")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Allowed fractional slowdown in p95 latency and peak memory")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline: {exc}")
+
+        log = lambda message: self.stdout.write(f"  {message}")
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            started = time.perf_counter()
+            with transaction.atomic():
+                counts = generate_dataset(**SCALES[options["scale"]], seed=options["seed"], log=log)
+            self.stdout.write(
+                f"Generated {', '.join(f'{n} {name}' for name, n in counts.items())} "
+                f"in {time.perf_counter() - started:.1f}s on {connection.vendor}"
+            )
+            # The view benchmarks use the test client, which sends Host: testserver
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                results = run_benchmarks(iterations=options["iterations"], only=options["only"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        results["meta"].update(scale=options["scale"], seed=options["seed"], rows=counts)
+        with open(options["output"], "w") as f:
+            json.dump(results, f, indent=2)
+
+        self.stdout.write(f"{'benchmark':<30}{'queries':>8}{'p50 ms':>10}{'p95 ms':>10}{'peak KB':>10}")
+        for name, row in results["benchmarks"].items():
+            self.stdout.write(
+                f"{name:<30}{row['queries']:>8}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['peak_kb']:>10.1f}"
+            )
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is None:
+            return
+        if baseline.get("meta", {}).get("scale") != options["scale"]:
+            self.stdout.write(self.style.WARNING("Baseline was recorded at a different scale"))
+        regressions = compare(results, baseline, tolerance=options["tolerance"])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+            return
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(f"  {line}"))
+        if options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} regression(s) against the baseline")
@@ -0,0 +1,55 @@
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ndanan.processes import process_pool, run_task
+from ndanan.tasks import claim, requeue_stale
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (notifications, derivatives, counter rebuilds) from a worker pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=settings.TASK_WORKER_CONCURRENCY)
+        parser.add_argument("--mode", choices=["thread", "process"], default="thread",
+                            help="thread for I/O-bound tasks, process for CPU-bound ones like rendering")
+        parser.add_argument("--poll-interval", type=float, default=settings.TASK_WORKER_POLL_INTERVAL)
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        stale_after = timedelta(seconds=settings.TASK_STALE_AFTER)
+
+        if options["mode"] == "process":
+            pool = process_pool(concurrency)
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency)
+
+        done = failed = 0
+        self.stdout.write(f"Worker {worker_id} started ({options['mode']} x{concurrency})")
+        try:
+            with pool:
+                while True:
+                    requeue_stale(stale_after)
+                    ids = claim(worker_id, concurrency * 2)
+                    if not ids:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll_interval"])
+                        continue
+                    finished, _ = wait([pool.submit(run_task, task_id) for task_id in ids])
+                    for future in finished:
+                        if future.exception() is None and future.result():
+                            done += 1
+                        else:
+                            failed += 1
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Worker stopped: {done} task(s) done, {failed} attempt(s) failed"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from ndanan.deadlines import schedule_reminders
+from ndanan.tasks import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue due-date reminders for students who have not submitted assignments due within "
+        "DEADLINE_REMINDER_HOURS. Safe to run as often as you like, e.g. every 15 minutes from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Students per reminder task")
+        parser.add_argument("--background", action="store_true",
+                            help="Queue the scan for the task worker instead of running it now")
+
+    def handle(self, *args, **options):
+        if options["background"]:
+            task = enqueue("deadlines.schedule_reminders")
+            self.stdout.write(self.style.SUCCESS(f"Queued reminder scan as task {task.pk}"))
+            return
+        queued = schedule_reminders(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} deadline reminder(s)"))
@@ -0,0 +1,64 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import replicas
+
+PRIMARY_COOKIE = "ndanan_primary_until"
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Start each request's database routing state. A request that writes sets a
+    short-lived cookie so the same browser keeps reading from the primary
+    until the replica has caught up with its own writes.
+    Install it above SessionMiddleware so session saves count as writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # A sync process_view would be run on a worker thread for every request
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.begin(request)
+        return self.finish(state, self.get_response(request))
+
+    async def __acall__(self, request):
+        state = self.begin(request)
+        return self.finish(state, await self.get_response(request))
+
+    def begin(self, request):
+        try:
+            pinned = float(request.COOKIES.get(PRIMARY_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        return replicas.begin_request(pinned=pinned)
+
+    def finish(self, state, response):
+        if state.wrote:
+            seconds = settings.PRIMARY_STICKY_SECONDS
+            response.set_cookie(
+                PRIMARY_COOKIE, str(int(time.time()) + seconds), max_age=seconds, httponly=True, samesite="Lax"
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.route_view(view_func)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.route_view(view_func)
+
+    def route_view(self, view_func):
+        view = getattr(view_func, "view_class", view_func)
+        if getattr(view, "read_replica", False):
+            replicas.allow_replica_reads()
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, outer_field):
+    counted = (
+        queryset.filter(**{outer_field: OuterRef('pk')})
+        .order_by()
+        .values(outer_field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted, output_field=models.IntegerField()), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Course = apps.get_model('ndanan', 'Course')
+    Assignment = apps.get_model('ndanan', 'Assignment')
+    CourseEnrollment = apps.get_model('ndanan', 'CourseEnrollment')
+    Material = apps.get_model('ndanan', 'Material')
+    Submission = apps.get_model('ndanan', 'Submission')
+    Grade = apps.get_model('ndanan', 'Grade')
+
+    Course.objects.update(
+        student_count=_count(CourseEnrollment.objects.filter(is_active=True), 'course'),
+        material_count=_count(Material.objects.all(), 'course'),
+        assignment_count=_count(Assignment.objects.all(), 'course'),
+    )
+    Assignment.objects.update(
+        submission_count=_count(Submission.objects.all(), 'assignment'),
+        graded_count=_count(Grade.objects.all(), 'submission__assignment'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ndanan', '0002_assignment_created_by_grade_graded_by_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='graded_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='submission_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='assignment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='material_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='student_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ndanan', '0003_course_assignment_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='courseenrollment',
+            index=models.Index(fields=['student', 'is_active', 'course'], name='enroll_student_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['assignment', 'status'], name='submission_assign_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='courseenrollment',
+            constraint=models.UniqueConstraint(models.Case(models.When(is_active=True, then=models.F('course'))), models.Case(models.When(is_active=True, then=models.F('student'))), name='unique_active_enrollment'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:12
+
+import ndanan.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ndanan', '0006_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=ndanan.storage.get_blob_storage, upload_to='materials/'),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='submission_file',
+            field=models.FileField(storage=ndanan.storage.get_blob_storage, upload_to='submissions/'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=ndanan.storage.get_blob_storage, upload_to='profiles/'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ndanan', '0009_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentStats',
+            fields=[
+                ('assignment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='ndanan.assignment')),
+                ('enrolled', models.PositiveIntegerField(default=0)),
+                ('submitted', models.PositiveIntegerField(default=0)),
+                ('graded', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(null=True)),
+                ('median', models.FloatField(null=True)),
+                ('stddev', models.FloatField(null=True)),
+                ('histogram', models.JSONField(default=list)),
+                ('completion_rate', models.FloatField(default=0)),
+                ('late_rate', models.FloatField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StudentCourseStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assignments', models.PositiveIntegerField(default=0)),
+                ('submitted', models.PositiveIntegerField(default=0)),
+                ('graded', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(null=True)),
+                ('median', models.FloatField(null=True)),
+                ('stddev', models.FloatField(null=True)),
+                ('completion_rate', models.FloatField(default=0)),
+                ('late_rate', models.FloatField(default=0)),
+                ('rank', models.PositiveIntegerField(null=True)),
+                ('percentile', models.FloatField(null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_stats', to='ndanan.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', 'rank'], name='stats_leaderboard_idx')],
+                'constraints': [models.UniqueConstraint(fields=('course', 'student'), name='unique_student_course_stats')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:38
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ndanan', '0010_analytics_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentDashboard',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('courses', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('upcoming', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('pending', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('recent_grades', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('expires_at', models.DateTimeField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
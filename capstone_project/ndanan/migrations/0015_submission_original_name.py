@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ndanan', '0014_id_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='original_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
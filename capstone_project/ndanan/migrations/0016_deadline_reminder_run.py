@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ndanan', '0015_submission_original_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deadlinereminder',
+            name='run',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+    ]
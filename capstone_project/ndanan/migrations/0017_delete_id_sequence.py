@@ -0,0 +1,16 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ndanan', '0016_deadline_reminder_run'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='IdSequence',
+        ),
+    ]
@@ -1,5 +1,13 @@
+import uuid
+
 from django.db import models
+from django.db.models import Case, Count, F, OuterRef, Prefetch, Subquery, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .storage import get_blob_storage
 
 
 class UserManager(BaseUserManager):
@@ -33,7 +41,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     date_joined = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
-    profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='profiles/', storage=get_blob_storage, blank=True, null=True)
+    # Generated in the background by ndanan.derivatives, next to the original
+    profile_thumbnail = models.ImageField(blank=True, null=True, editable=False)
     groups = models.ManyToManyField(
         'auth.Group',
         related_name='ndanan_user_groups',
@@ -57,6 +67,45 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.email
 
 
+def _count_subquery(queryset, outer_field="course"):
+    """Correlated COUNT(*) over ``queryset`` for each row of the outer query"""
+    counted = (
+        queryset.filter(**{outer_field: OuterRef("pk")})
+        .order_by()
+        .values(outer_field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counted, output_field=models.IntegerField()), 0)
+
+
+class CourseQuerySet(models.QuerySet):
+    def with_teacher(self):
+        """Join the teacher row so teacher names cost no extra query"""
+        return self.select_related("teacher")
+
+    def with_counts(self):
+        """
+        Annotate num_students, num_materials and num_assignments.
+        Each count is a correlated subquery so the joins do not multiply rows.
+        """
+        return self.annotate(
+            num_students=_count_subquery(CourseEnrollment.objects.filter(is_active=True)),
+            num_materials=_count_subquery(Material.objects.all()),
+            num_assignments=_count_subquery(Assignment.objects.all()),
+        )
+
+    def with_enrolled_students(self):
+        """Prefetch active enrollments and their students into active_enrollments"""
+        return self.prefetch_related(
+            Prefetch(
+                "enrollments",
+                queryset=CourseEnrollment.objects.filter(is_active=True).select_related("student"),
+                to_attr="active_enrollments",
+            )
+        )
+
+
 class Course(models.Model):
     name = models.CharField(max_length=100)
     course_code = models.CharField(max_length=30, unique=True)
@@ -65,6 +114,18 @@ class Course(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='taught_courses')
+    # Denormalized counters kept current by ndanan.signals; rebuild with `manage.py rebuild_counters`
+    student_count = models.PositiveIntegerField(default=0, editable=False)
+    material_count = models.PositiveIntegerField(default=0, editable=False)
+    assignment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CourseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination seeks on (created_at, id)
+            models.Index(fields=["created_at", "id"], name="course_created_id_idx"),
+        ]
 
     def __str__(self):
         return self.course_code
@@ -73,16 +134,32 @@ class Course(models.Model):
 class Material(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
-    file = models.FileField(upload_to='materials/', blank=True, null=True)
+    file = models.FileField(upload_to='materials/', storage=get_blob_storage, blank=True, null=True)
+    # First-page preview of PDF materials, generated by ndanan.derivatives
+    preview = models.ImageField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='materials')
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE,null=True, related_name="uploaded_materials")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="material_created_id_idx"),
+        ]
     
     def __str__(self):
         return self.title
 
 
+class AssignmentQuerySet(models.QuerySet):
+    def with_counts(self):
+        """Annotate num_submissions and num_graded (submissions that have a grade)"""
+        return self.annotate(
+            num_submissions=_count_subquery(Submission.objects.all(), outer_field="assignment"),
+            num_graded=_count_subquery(Grade.objects.all(), outer_field="submission__assignment"),
+        )
+
+
 class Assignment(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField(max_length=500)
@@ -92,6 +169,17 @@ class Assignment(models.Model):
     due_date = models.DateTimeField()
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='assignments')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name="assignments")
+    # Denormalized counters kept current by ndanan.signals
+    submission_count = models.PositiveIntegerField(default=0, editable=False)
+    graded_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = AssignmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The deadline scheduler range-scans upcoming due dates
+            models.Index(fields=["due_date", "course"], name="assignment_due_idx"),
+        ]
 
     def __str__(self):
         return f"title:{self.title}, course:{self.course} and description:{self.description}"
@@ -104,10 +192,34 @@ class CourseEnrollment(models.Model):
     enrolled_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Covers the role-scoped list lookups and the per-course access check
+            models.Index(fields=["student", "is_active", "course"], name="enroll_student_active_idx"),
+        ]
+        constraints = [
+            # Inactive rows map to NULLs, which never collide, so only active pairs are unique.
+            # Written as expressions because MySQL ignores conditional unique constraints.
+            models.UniqueConstraint(
+                Case(When(is_active=True, then=F("course"))),
+                Case(When(is_active=True, then=F("student"))),
+                name="unique_active_enrollment",
+            ),
+        ]
+
     def __str__(self):
         return self.course
 
 
+class SubmissionQuerySet(models.QuerySet):
+    def with_related(self):
+        """Join assignment, student and grade so serializing a row costs no extra query"""
+        return self.select_related("assignment", "student", "grade")
+
+    def for_assignment(self, assignment):
+        return self.with_related().filter(assignment=assignment).order_by("submitted_at", "id")
+
+
 class Submission(models.Model):
     STATUS_CHOICES = [
         ('submitted', 'Submitted'),
@@ -118,12 +230,35 @@ class Submission(models.Model):
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='submissions')
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='submissions')
     status = models.CharField(max_length=64, choices=STATUS_CHOICES, default='pending')
-    submission_file = models.FileField(upload_to='submissions/')
+    submission_file = models.FileField(upload_to='submissions/', storage=get_blob_storage)
+    # The uploaded file's name; stored files are named by their content hash
+    original_name = models.CharField(max_length=255, blank=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SubmissionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["assignment", "status"], name="submission_assign_status_idx"),
+            # "Has this student submitted this assignment?", the deadline scheduler's anti-join
+            models.Index(fields=["student", "assignment"], name="submission_student_assign_idx"),
+        ]
+
     def __str__(self):
         return self.status
 
+    def get_grade(self):
+        """Return the grade or None, using the select_related cache when present"""
+        if Submission.grade.is_cached(self):
+            return Submission.grade.related.get_cached_value(self)
+        return Grade.objects.filter(submission=self).first()
+
+
+class GradeQuerySet(models.QuerySet):
+    def with_related(self):
+        """Join the submission with its student and assignment in one query"""
+        return self.select_related("submission__student", "submission__assignment")
+
 
 class Grade(models.Model):
     submission = models.OneToOneField(Submission, on_delete=models.CASCADE, related_name='grade')
@@ -133,5 +268,204 @@ class Grade(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     graded_by = models.ForeignKey(User,on_delete=models.CASCADE, null=True, related_name="grades")
 
+    objects = GradeQuerySet.as_manager()
+
+    def __str__(self):
+        return self.score
+
+
+class UploadSession(models.Model):
+    """A resumable chunked upload that becomes a Material or Submission file when complete"""
+    TARGET_CHOICES = [
+        ('material', 'Material'),
+        ('submission', 'Submission'),
+    ]
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    target = models.CharField(max_length=32, choices=TARGET_CHOICES)
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    # Fields for the row created on completion (title, course, assignment, ...)
+    metadata = models.JSONField(default=dict)
+    status = models.CharField(max_length=32, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size})"
+
+    @property
+    def next_chunk(self):
+        return self.received_bytes // self.chunk_size
+
+
+class StoredBlob(models.Model):
+    """One content-addressed file in ContentAddressedStorage and how many rows use it"""
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Task(models.Model):
+    """A unit of background work run by `manage.py run_task_worker`"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Enqueueing again with the same key returns the existing task
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's claim query: queued tasks by priority, then age
+            models.Index(fields=["status", "-priority", "run_after"], name="task_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class AssignmentStats(models.Model):
+    """Score distribution of one assignment, kept by ndanan.analytics. Scores are percent of max_score."""
+    assignment = models.OneToOneField(Assignment, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    enrolled = models.PositiveIntegerField(default=0)
+    submitted = models.PositiveIntegerField(default=0)
+    graded = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(null=True)
+    median = models.FloatField(null=True)
+    stddev = models.FloatField(null=True)
+    # Graded submissions per 10-point bucket: [0-10), [10-20), ... [90-100]
+    histogram = models.JSONField(default=list)
+    completion_rate = models.FloatField(default=0)
+    late_rate = models.FloatField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"stats for assignment {self.assignment_id}"
+
+
+class StudentCourseStats(models.Model):
+    """One enrolled student's results across a course's assignments, kept by ndanan.analytics"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="student_stats")
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="course_stats")
+    assignments = models.PositiveIntegerField(default=0)
+    submitted = models.PositiveIntegerField(default=0)
+    graded = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(null=True)
+    median = models.FloatField(null=True)
+    stddev = models.FloatField(null=True)
+    completion_rate = models.FloatField(default=0)
+    late_rate = models.FloatField(default=0)
+    # Leaderboard position by mean (1 is best, ties share a rank) and the
+    # percent of graded classmates with a lower mean; NULL until graded
+    rank = models.PositiveIntegerField(null=True)
+    percentile = models.FloatField(null=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["course", "student"], name="unique_student_course_stats"),
+        ]
+        indexes = [
+            models.Index(fields=["course", "rank"], name="stats_leaderboard_idx"),
+        ]
+
+    def __str__(self):
+        return f"stats for student {self.student_id} in course {self.course_id}"
+
+
+class StudentDashboard(models.Model):
+    """A student's precomputed home page, one row per student, kept current by ndanan.dashboards"""
+    student = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="dashboard")
+    courses = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    # Unsubmitted assignments due next, soonest first
+    upcoming = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    # Submissions waiting for a grade
+    pending = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    recent_grades = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    # When the first upcoming assignment falls due and the snapshot must be rebuilt
+    expires_at = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"dashboard of {self.student_id}"
+
+
+class DeadlineReminder(models.Model):
+    """A due-date reminder queued for one student, so each reminder window fires once"""
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name="reminders")
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="deadline_reminders")
+    # The DEADLINE_REMINDER_HOURS window it was sent for
+    window_hours = models.PositiveSmallIntegerField()
+    # The scheduler run that inserted the row; only that run mails the student
+    run = models.UUIDField(null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["assignment", "student", "window_hours"], name="unique_deadline_reminder"),
+        ]
+
+    def __str__(self):
+        return f"{self.window_hours}h reminder for assignment {self.assignment_id}"
+
+
+class SearchDocument(models.Model):
+    """The searchable text of one course or material, kept by ndanan.search"""
+    # "course:<id>" or "material:<id>"
+    key = models.CharField(max_length=40, unique=True)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="search_documents")
+    material = models.OneToOneField(Material, on_delete=models.CASCADE, null=True, related_name="search_document")
+    title = models.CharField(max_length=255)
+    content = models.TextField(blank=True)
+    # Text extracted from the uploaded file (PDF materials)
+    attachment = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+
+class SearchPosting(models.Model):
+    """One term of a SearchDocument in the portable inverted index, with its field-weighted frequency"""
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name="postings")
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["term", "document"], name="unique_search_posting"),
+        ]
+
     def __str__(self):
-        return self.score
\ No newline at end of file
+        return f"{self.term} in {self.document_id}"
@@ -0,0 +1,73 @@
+from django.core.mail import send_mail, send_mass_mail
+from django.utils import timezone
+
+from .models import Assignment, Grade, User
+from .tasks import enqueue_on_commit, task
+
+
+@task("notifications.grade_posted", max_attempts=5)
+def send_grade_posted(submission_id):
+    grade = Grade.objects.with_related().filter(submission_id=submission_id).first()
+    if grade is None:
+        return
+    student = grade.submission.student
+    assignment = grade.submission.assignment
+    send_mail(
+        f"Your grade for {assignment.title}",
+        f"Hi {student.first_name},\n\n"
+        f"You scored {grade.score} out of {assignment.max_score} on {assignment.title}.\n\n"
+        f"{grade.feedback}".rstrip() + "\n",
+        None,
+        [student.email],
+    )
+
+
+@task("notifications.welcome", max_attempts=5)
+def send_welcome(user_id):
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    send_mail(
+        "Welcome to Ndanan",
+        f"Hi {user.first_name},\n\nYour account is ready. Sign in with {user.email}.\n",
+        None,
+        [user.email],
+    )
+
+
+@task("notifications.deadline_reminder", max_attempts=5)
+def send_deadline_reminders(assignment_id, student_ids, hours):
+    assignment = Assignment.objects.select_related("course").filter(pk=assignment_id).first()
+    if assignment is None:
+        return
+    due = timezone.localtime(assignment.due_date).strftime("%b %d, %H:%M")
+    # One SMTP connection for the whole batch
+    send_mass_mail([
+        (
+            f"Due within {hours} hours: {assignment.title}",
+            f"Hi {student.first_name},\n\n"
+            f"{assignment.title} for {assignment.course.name} is due {due} and you have not submitted it yet.\n",
+            None,
+            [student.email],
+        )
+        for student in User.objects.filter(pk__in=student_ids, is_active=True).order_by("id")
+    ])
+
+
+def notify_grade_posted(grade):
+    # Keyed by submission (one grade each) since bulk_create leaves pk unset on MySQL;
+    # the student hears about the first grade only, not every later edit
+    enqueue_on_commit("notifications.grade_posted", {"submission_id": grade.submission_id},
+                      idempotency_key=f"grade-posted:{grade.submission_id}")
+
+
+def notify_deadline(assignment_id, student_ids, hours):
+    # Keyed by the batch's first student: a later run never batches a reminded student again
+    enqueue_on_commit("notifications.deadline_reminder",
+                      {"assignment_id": assignment_id, "student_ids": student_ids, "hours": hours},
+                      idempotency_key=f"deadline:{assignment_id}:{hours}:{student_ids[0]}")
+
+
+def notify_welcome(user):
+    enqueue_on_commit("notifications.welcome", {"user_id": user.pk},
+                      idempotency_key=f"welcome:{user.pk}")
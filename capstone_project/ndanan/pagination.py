@@ -0,0 +1,162 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import Http404
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+CURSOR_PARAM = "cursor"
+# Newest first; offset pages use it too, so both modes list rows in the same order
+KEYSET_ORDERING = ("-created_at", "-id")
+
+
+def encode_cursor(obj, direction):
+    """Opaque cursor pointing just past ``obj`` in ``direction`` ("next" or "prev")"""
+    position = {"t": obj.created_at.isoformat(), "i": obj.pk, "d": direction}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id, direction); raises ValueError for anything malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction = position["d"]
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(position["t"]), int(position["i"]), direction
+    except (KeyError, TypeError, ValueError, json.JSONDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+class KeysetPage:
+    """One page of a keyset scan, newest first, with cursors instead of page numbers"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginate_keyset(queryset, cursor, page_size):
+    """
+    Seek on (created_at, id) instead of OFFSET, newest first.
+    Fetches page_size + 1 rows to learn whether another page exists and
+    never runs COUNT(*).
+    """
+    if not cursor:
+        rows = list(queryset.order_by(*KEYSET_ORDERING)[:page_size + 1])
+        has_more, rows = len(rows) > page_size, rows[:page_size]
+        return KeysetPage(rows, next_cursor=encode_cursor(rows[-1], "next") if has_more else None)
+
+    created_at, pk, direction = decode_cursor(cursor)
+    if direction == "next":
+        rows = list(
+            queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+            .order_by(*KEYSET_ORDERING)[:page_size + 1]
+        )
+        has_more, rows = len(rows) > page_size, rows[:page_size]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1], "next") if has_more else None,
+            previous_cursor=encode_cursor(rows[0], "prev") if rows else None,
+        )
+
+    rows = list(
+        queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+        .order_by("created_at", "id")[:page_size + 1]
+    )
+    has_more, rows = len(rows) > page_size, rows[:page_size][::-1]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1], "next") if rows else None,
+        previous_cursor=encode_cursor(rows[0], "prev") if has_more else None,
+    )
+
+
+class CursorPaginationMixin:
+    """
+    Opt-in keyset pagination for ListViews over models with created_at.
+    Offset pagination stays the default; ``?pagination=cursor`` or a
+    ``cursor`` parameter switches the request to keyset mode.
+    """
+    cursor_pagination = False
+
+    def use_cursor_pagination(self):
+        params = self.request.GET
+        return self.cursor_pagination or params.get("pagination") == "cursor" or CURSOR_PARAM in params
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            if not queryset.ordered:
+                queryset = queryset.order_by(*KEYSET_ORDERING)
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            page = paginate_keyset(queryset, self.request.GET.get(CURSOR_PARAM), page_size)
+        except ValueError:
+            raise Http404("Invalid cursor")
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["cursor_mode"] = self.use_cursor_pagination()
+        return context
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination class with the same (created_at, id) seek, for API views
+    built on the serializers: ``pagination_class = KeysetPagination``.
+    """
+    page_size = 10
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = paginate_keyset(queryset, request.query_params.get(CURSOR_PARAM), self.page_size)
+        except ValueError:
+            raise NotFound("Invalid cursor")
+        return self.page.object_list
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, CURSOR_PARAM, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self._link(self.page.next_cursor),
+            "previous": self._link(self.page.previous_cursor),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,40 @@
+"""
+Process pools for CPU-bound work. Workers are spawned rather than forked, so
+none inherits the parent's database sockets or ndanan.db.pool connections.
+A spawned worker imports this module to unpickle its initializer and jobs
+before Django is set up, so nothing from the app is imported at module level.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _setup(database_names):
+    import django
+    from django.db import connections
+
+    django.setup()
+    # Use the databases the parent runs against (under the test runner, the test ones)
+    for alias, name in database_names.items():
+        connections[alias].settings_dict["NAME"] = name
+
+
+def process_pool(workers):
+    """A pool of ``workers`` spawned processes with Django set up"""
+    from django.db import connections
+
+    database_names = {connection.alias: connection.settings_dict["NAME"] for connection in connections.all()}
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_setup, initargs=(database_names,))
+
+
+def run_task(task_id):
+    """Run one claimed task on a pool thread or process, closing its connections around it"""
+    from django.db import close_old_connections
+
+    from .tasks import execute
+
+    close_old_connections()
+    try:
+        return execute(task_id)
+    finally:
+        close_old_connections()
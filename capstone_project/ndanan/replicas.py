@@ -0,0 +1,88 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.dispatch import receiver
+
+# Routing state of the request being handled; None outside requests
+# (management commands, the task worker), which always use the primary.
+_state = ContextVar("ndanan_db_routing", default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        # Set for views marked read_replica = True
+        self.replica_reads = False
+        # Once set, every read goes to the primary: the session wrote recently
+        # (replication may lag behind) or this request has written
+        self.pinned = pinned
+        self.wrote = False
+        # Above zero inside primary_reads()
+        self.primary_only = 0
+
+
+def begin_request(pinned=False):
+    state = RoutingState(pinned=pinned)
+    _state.set(state)
+    return state
+
+
+def allow_replica_reads():
+    state = _state.get()
+    if state is not None:
+        state.replica_reads = True
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read from the primary inside this block, even in a replica view. For reads
+    that decide access or fill a shared cache: a lagging replica would hand out
+    stale rows that then outlive the lag, for as long as the cache entry.
+    """
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    state.primary_only += 1
+    try:
+        yield
+    finally:
+        state.primary_only -= 1
+
+
+@receiver(request_finished)
+def end_request(sender, **kwargs):
+    # Streaming responses (gradebook exports) keep reading until the response is closed
+    _state.set(None)
+
+
+class PrimaryReplicaRouter:
+    """
+    Reads of ndanan content from views marked ``read_replica = True`` go to
+    READ_REPLICA_DATABASE unless the browser is pinned to the primary or the
+    read is inside primary_reads(); everything else, and all writes, use the
+    default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = settings.READ_REPLICA_DATABASE
+        state = _state.get()
+        if not alias or state is None or not state.replica_reads or state.pinned or state.primary_only:
+            return None
+        # Sessions and the logged-in user always come from the primary so a
+        # fresh login or logout is never undone by replication lag
+        if model._meta.app_label != "ndanan" or model._meta.label == settings.AUTH_USER_MODEL:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
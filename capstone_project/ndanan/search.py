@@ -0,0 +1,209 @@
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+
+from .access import enrolled_course_ids
+from .models import Course, Material, SearchDocument, SearchPosting
+from .tasks import enqueue_on_commit, task
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset("a an and are as at be by for from in is it of on or the this to with".split())
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+# A title match counts for more than one in the description, which counts for more
+# than one deep in an attached PDF; per-field frequency is capped so a long file
+# repeating a word cannot outrank a document with that word in its title
+FIELD_WEIGHTS = (("title", 3.0), ("content", 1.0), ("attachment", 0.5))
+MAX_TERM_FREQUENCY = 10
+SNIPPET_LENGTH = 160
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def term_weights(document):
+    weights = Counter()
+    for field, factor in FIELD_WEIGHTS:
+        for term, count in Counter(tokenize(getattr(document, field))).items():
+            weights[term] += min(count, MAX_TERM_FREQUENCY) * factor
+    return weights
+
+
+def backend():
+    """'fulltext' (MySQL MATCH ... AGAINST) or 'index' (SearchPosting, any database)"""
+    if settings.SEARCH_BACKEND == "auto":
+        return "fulltext" if connection.vendor == "mysql" else "index"
+    return settings.SEARCH_BACKEND
+
+
+# Indexing
+
+def _save_document(key, course_id, material_id, title, content, attachment=None):
+    """Upsert the document; with the index backend its postings are replaced too"""
+    defaults = {"course_id": course_id, "material_id": material_id, "title": title[:255], "content": content}
+    if attachment is not None:
+        defaults["attachment"] = attachment
+    with transaction.atomic():
+        document, _ = SearchDocument.objects.update_or_create(key=key, defaults=defaults)
+        if backend() == "index":
+            SearchPosting.objects.filter(document=document).delete()
+            SearchPosting.objects.bulk_create([
+                SearchPosting(term=term, document=document, weight=weight)
+                for term, weight in term_weights(document).items()
+            ], batch_size=1000)
+    return document
+
+
+def index_course(course_id):
+    course = Course.objects.filter(pk=course_id).first()
+    if course is None:
+        return None
+    return _save_document(f"course:{course.pk}", course.pk, None, course.name,
+                          f"{course.course_code}\n{course.description}")
+
+
+def index_material(material_id, attachment=None):
+    """Index the title and description; ``attachment`` replaces the extracted file text when given"""
+    material = Material.objects.filter(pk=material_id).first()
+    if material is None:
+        return None
+    return _save_document(f"material:{material.pk}", material.course_id, material.pk, material.title,
+                          material.description, attachment)
+
+
+def extract_pdf_text(path, limit):
+    """Text of a PDF up to ``limit`` characters; needs PyMuPDF, empty when it is not installed"""
+    try:
+        import fitz
+    except ImportError:
+        return ""
+
+    parts, size = [], 0
+    with fitz.open(path) as document:
+        for page in document:
+            text = page.get_text()
+            parts.append(text)
+            size += len(text)
+            if size >= limit:
+                break
+    return "".join(parts)[:limit]
+
+
+@task("search.extract_material_text")
+def extract_material_text(material_id, file_name):
+    # Skip files that have been replaced since the task was queued
+    if not Material.objects.filter(pk=material_id, file=file_name).exists():
+        return
+    path = Material._meta.get_field("file").storage.path(file_name)
+    index_material(material_id, attachment=extract_pdf_text(path, settings.SEARCH_MAX_ATTACHMENT_CHARS))
+
+
+def schedule_material_text(material_id, file_name):
+    if file_name.lower().endswith(".pdf"):
+        enqueue_on_commit("search.extract_material_text", {"material_id": material_id, "file_name": file_name})
+
+
+def rebuild_index(batch_size=500):
+    """Index every course and material from scratch, keeping extracted file text; returns documents written"""
+    written = 0
+    for course_id in Course.objects.values_list("id", flat=True).iterator(chunk_size=batch_size):
+        written += bool(index_course(course_id))
+    for material_id in Material.objects.values_list("id", flat=True).iterator(chunk_size=batch_size):
+        written += bool(index_material(material_id))
+    return written
+
+
+# Searching
+
+def visible_documents(user):
+    """The same visibility as the course and material list views"""
+    role = getattr(user, "role", None)
+    documents = SearchDocument.objects.all()
+    if role == "admin":
+        return documents
+    if role == "teacher":
+        return documents.filter(Q(material__isnull=True, course__teacher=user) | Q(material__uploaded_by=user))
+    if role == "student":
+        return documents.filter(course_id__in=enrolled_course_ids(user))
+    return documents.none()
+
+
+def _rank_fulltext(documents, terms):
+    match = RawSQL(
+        "MATCH (ndanan_searchdocument.title, ndanan_searchdocument.content, ndanan_searchdocument.attachment) "
+        "AGAINST (%s IN NATURAL LANGUAGE MODE)",
+        (" ".join(terms),),
+        output_field=FloatField(),
+    )
+    return documents.annotate(score=match).filter(score__gt=0).order_by("-score", "id")
+
+
+def _rank_postings(documents, terms):
+    """
+    Documents holding any of ``terms``, those matching more terms first, then
+    by the sum of their field weights times each term's BM25 inverse document frequency.
+    """
+    total = SearchDocument.objects.count()
+    frequencies = SearchPosting.objects.filter(term__in=terms).values_list("term").annotate(n=Count("id"))
+    idf = {term: math.log(1 + (total - n + 0.5) / (n + 0.5)) for term, n in frequencies}
+    if not idf:
+        return documents.none()
+    score = Sum(Case(
+        *[When(postings__term=term, then=F("postings__weight") * Value(weight)) for term, weight in idf.items()],
+        output_field=FloatField(),
+    ))
+    return (
+        documents.filter(postings__term__in=list(idf))
+        .annotate(matched=Count("postings"), score=score)
+        .order_by("-matched", "-score", "id")
+    )
+
+
+def _snippet(document, terms):
+    for text in (document.content, document.attachment):
+        lowered = text.lower()
+        found = [position for position in (lowered.find(term) for term in terms) if position >= 0]
+        if found:
+            start = max(min(found) - SNIPPET_LENGTH // 4, 0)
+            excerpt = " ".join(text[start:start + SNIPPET_LENGTH].split())
+            return ("..." if start else "") + excerpt + ("..." if start + SNIPPET_LENGTH < len(text) else "")
+    return " ".join(document.content[:SNIPPET_LENGTH].split())
+
+
+def search(user, query, kind=None, limit=20):
+    """Ranked courses and materials matching ``query`` that ``user`` may see"""
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return []
+    documents = visible_documents(user)
+    if kind == "course":
+        documents = documents.filter(material__isnull=True)
+    elif kind == "material":
+        documents = documents.filter(material__isnull=False)
+
+    rank = _rank_fulltext if backend() == "fulltext" else _rank_postings
+    results = []
+    for document in rank(documents, terms).select_related("course")[:limit]:
+        is_material = document.material_id is not None
+        results.append({
+            "kind": "material" if is_material else "course",
+            "id": document.material_id if is_material else document.course_id,
+            "title": document.title,
+            "course_id": document.course_id,
+            "course_code": document.course.course_code,
+            "snippet": _snippet(document, terms),
+            "score": round(document.score, 3),
+            "url": reverse("material_details" if is_material else "course_details",
+                           args=[document.material_id if is_material else document.course_id]),
+        })
+    return results
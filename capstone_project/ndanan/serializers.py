@@ -1,21 +1,34 @@
+import os
+
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
-from .models import User, Course, Assignment, Material, CourseEnrollment, Submission, Grade
+from .models import (
+    User, Course, Assignment, Material, CourseEnrollment, Submission, Grade, UploadSession,
+    AssignmentStats, StudentCourseStats,
+)
 from django.utils import timezone
+from django.utils.functional import cached_property
+from .notifications import notify_grade_posted
 
 #  USER SERIALIZERS 
 
 class UserSerializer(serializers.ModelSerializer):
     """Basic user info - safe for general display"""
     full_name = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     
     class Meta:
         model = User
-        fields = ["id", "email", "first_name", "last_name", "full_name", "role", "profile_picture"]
+        fields = ["id", "email", "first_name", "last_name", "full_name", "role", "profile_picture", "thumbnail_url"]
         read_only_fields = ["id"]
     
     def get_full_name(self, obj):
         return f"{obj.first_name} {obj.last_name}"
+    
+    def get_thumbnail_url(self, obj):
+        # Small derivative for lists; None until the background job has made it
+        return obj.profile_thumbnail.url if obj.profile_thumbnail else None
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -49,46 +62,43 @@ class UserProfileSerializer(serializers.ModelSerializer):
 # COURSE SERIALIZERS
 
 class CourseListSerializer(serializers.ModelSerializer):
-    """For listing courses - includes teacher name and student count"""
+    """
+    For listing courses - includes teacher name and student count.
+    Serialize Course.objects.with_teacher() to avoid per-row queries.
+    """
     teacher_name = serializers.SerializerMethodField()
-    student_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Course
         fields = ["id", "name", "course_code", "description", "teacher", "teacher_name", 
                   "student_count", "is_active", "created_at"]
-        read_only_fields = ["id", "created_at"]
+        read_only_fields = ["id", "student_count", "created_at"]
     
     def get_teacher_name(self, obj):
         return f"{obj.teacher.first_name} {obj.teacher.last_name}"
-    
-    def get_student_count(self, obj):
-        return obj.enrollments.filter(is_active=True).count()
 
 
 class CourseDetailSerializer(serializers.ModelSerializer):
-    """Detailed course view with enrolled students"""
+    """
+    Detailed course view with enrolled students.
+    Serialize Course.objects.with_teacher().with_enrolled_students().
+    """
     teacher = UserSerializer(read_only=True)
     enrolled_students = serializers.SerializerMethodField()
-    material_count = serializers.SerializerMethodField()
-    assignment_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Course
         fields = ["id", "name", "course_code", "description", "teacher", 
                   "enrolled_students", "material_count", "assignment_count",
                   "is_active", "created_at", "updated_at"]
-        read_only_fields = ["id", "teacher", "created_at", "updated_at"]
+        read_only_fields = ["id", "teacher", "material_count", "assignment_count", "created_at", "updated_at"]
     
     def get_enrolled_students(self, obj):
-        enrollments = obj.enrollments.filter(is_active=True)
+        # Prefetched by Course.objects.with_enrolled_students()
+        enrollments = getattr(obj, "active_enrollments", None)
+        if enrollments is None:
+            enrollments = obj.enrollments.filter(is_active=True).select_related("student")
         return UserSerializer([e.student for e in enrollments], many=True).data
-    
-    def get_material_count(self, obj):
-        return obj.materials.count()
-    
-    def get_assignment_count(self, obj):
-        return obj.assignments.count()
 
 
 class CourseCreateSerializer(serializers.ModelSerializer):
@@ -109,16 +119,20 @@ class MaterialSerializer(serializers.ModelSerializer):
     """For material uploads and viewing"""
     course_name = serializers.CharField(source='course.name', read_only=True)
     uploaded_by_name = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Material
-        fields = ["id", "course", "course_name", "title", "description", "file", 
+        fields = ["id", "course", "course_name", "title", "description", "file", "preview_url",
                   "uploaded_by", "uploaded_by_name", "created_at", "updated_at"]
         read_only_fields = ["id", "uploaded_by", "created_at", "updated_at"]
     
     def get_uploaded_by_name(self, obj):
         return f"{obj.uploaded_by.first_name} {obj.uploaded_by.last_name}"
     
+    def get_preview_url(self, obj):
+        return obj.preview.url if obj.preview else None
+    
     def create(self, validated_data):
         validated_data["uploaded_by"] = self.context["request"].user
         return super().create(validated_data)
@@ -129,21 +143,22 @@ class MaterialSerializer(serializers.ModelSerializer):
 class AssignmentListSerializer(serializers.ModelSerializer):
     """For listing assignments"""
     course_name = serializers.CharField(source="course.name", read_only=True)
-    submission_count = serializers.SerializerMethodField()
     is_overdue = serializers.SerializerMethodField()
     
     class Meta:
         model = Assignment
         fields = ["id", "course", "course_name", "title", "description", "due_date", 
                   "max_score", "submission_count", "is_overdue", "created_at", "created_by"]
-        read_only_fields = ["id", "created_at", "created_by"]
+        read_only_fields = ["id", "submission_count", "created_at", "created_by"]
     
-    def get_submission_count(self, obj):
-        return obj.submissions.count()
+    @cached_property
+    def now(self):
+        # With many=True one child serializer renders every row, so all rows share one clock read
+        return timezone.now()
     
     def get_is_overdue(self, obj):
         if obj.due_date:
-            return timezone.now() > obj.due_date
+            return self.now > obj.due_date
         return False
     
 
@@ -152,20 +167,12 @@ class AssignmentDetailSerializer(serializers.ModelSerializer):
     """Detailed assignment view"""
     course = CourseListSerializer(read_only=True)
     created_by = UserSerializer(read_only=True)
-    submission_count = serializers.SerializerMethodField()
-    graded_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Assignment
         fields = ["id", "course", "title", "description", "due_date", "max_score", 
                   "created_by", "submission_count", "graded_count", "created_at", "updated_at"]
-        read_only_fields = ["id", "created_by", "created_at", "updated_at"]
-    
-    def get_submission_count(self, obj):
-        return obj.submissions.count()
-    
-    def get_graded_count(self, obj):
-        return obj.submissions.filter(status="graded").count()
+        read_only_fields = ["id", "created_by", "submission_count", "graded_count", "created_at", "updated_at"]
 
 
 class AssignmentCreateSerializer(serializers.ModelSerializer):
@@ -216,10 +223,35 @@ class EnrollStudentSerializer(serializers.Serializer):
         return value
 
 
+class BulkEnrollmentSerializer(serializers.Serializer):
+    """For enrolling many students at once - a JSON list of rows or a CSV/JSON file"""
+    enrollments = serializers.ListField(child=serializers.DictField(), required=False, allow_empty=False)
+    file = serializers.FileField(required=False)
+    
+    def validate(self, data):
+        if not data.get("enrollments") and not data.get("file"):
+            raise serializers.ValidationError("Provide either enrollments or a file")
+        return data
+
+
+
+class BulkUserProvisionSerializer(serializers.Serializer):
+    """For creating many accounts at once - a JSON list of rows or a CSV/JSON roster file"""
+    users = serializers.ListField(child=serializers.DictField(), required=False, allow_empty=False)
+    file = serializers.FileField(required=False)
+    
+    def validate(self, data):
+        if not data.get("users") and not data.get("file"):
+            raise serializers.ValidationError("Provide either users or a file")
+        return data
+
 # SUBMISSION SERIALIZERS
 
 class SubmissionSerializer(serializers.ModelSerializer):
-    """For student submissions"""
+    """
+    For student submissions.
+    Serialize Submission.objects.with_related() so each row costs no extra query.
+    """
     assignment_title = serializers.CharField(source="assignment.title", read_only=True)
     student_name = serializers.SerializerMethodField()
     is_late = serializers.SerializerMethodField()
@@ -240,26 +272,27 @@ class SubmissionSerializer(serializers.ModelSerializer):
         return False
     
     def get_grade_info(self, obj):
-        try:
-            grade = obj.grade
-            return {
-                "score": grade.score,
-                "feedback": grade.feedback,
-                "graded_at": grade.graded_at
-            }
-        except Grade.DoesNotExist:
+        grade = obj.get_grade()
+        if grade is None:
             return None
+        return {
+            "score": grade.score,
+            "feedback": grade.feedback,
+            "graded_at": grade.graded_at
+        }
     
     def validate_submission_file(self, value):
-        # Limiting the file size to 5MB for submissions
-        if value.size > 5 * 1024 * 1024:
-            raise serializers.ValidationError("Submission file cannot exceed 5MB")
+        # Limiting the file size to 5MB for submissions; chunked uploads enforce the same limit
+        limit = settings.SUBMISSION_MAX_UPLOAD_SIZE
+        if value.size > limit:
+            raise serializers.ValidationError(f"Submission file cannot exceed {limit // (1024 * 1024)}MB")
         return value
     
     def create(self, validated_data):
         from django.utils import timezone
         validated_data["student"] = self.context["request"].user
         validated_data["submitted_at"] = timezone.now()
+        validated_data["original_name"] = os.path.basename(validated_data["submission_file"].name)[:255]
         
         # Check if late
         assignment = validated_data["assignment"]
@@ -272,7 +305,10 @@ class SubmissionSerializer(serializers.ModelSerializer):
 
 
 class SubmissionListSerializer(serializers.ModelSerializer):
-    """Simplified submission list for teachers"""
+    """
+    Simplified submission list for teachers.
+    Serialize Submission.objects.for_assignment(assignment) for a fixed query count.
+    """
     student = UserSerializer(read_only=True)
     assignment_title = serializers.CharField(source="assignment.title", read_only=True)
     has_grade = serializers.SerializerMethodField()
@@ -283,13 +319,16 @@ class SubmissionListSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
     
     def get_has_grade(self, obj):
-        return hasattr(obj, "grade")
+        return obj.get_grade() is not None
 
 
 # GRADE SERIALIZERS
 
 class GradeSerializer(serializers.ModelSerializer):
-    """For viewing grades with submission details"""
+    """
+    For viewing grades with submission details.
+    Serialize Grade.objects.with_related() so each row costs no extra query.
+    """
     student_name = serializers.SerializerMethodField()
     assignment_title = serializers.SerializerMethodField()
     
@@ -327,14 +366,16 @@ class GradeSerializer(serializers.ModelSerializer):
         # Update submission status to graded
         submission = validated_data["submission"]
         submission.status = "graded"
-        submission.save()
-        
-        return super().create(validated_data)
+        submission.save(update_fields=["status"])
+
+        grade = super().create(validated_data)
+        notify_grade_posted(grade)
+        return grade
     
     def update(self, instance, validated_data):
         # Keep submission as graded
         instance.submission.status = "graded"
-        instance.submission.save()
+        instance.submission.save(update_fields=["status"])
         
         return super().update(instance, validated_data)
 
@@ -350,6 +391,94 @@ class GradeCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Score cannot be negative")
         return value
     
+class BatchGradeSerializer(serializers.Serializer):
+    """For grading many submissions at once - rows of submission_id, score and feedback"""
+    grades = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+
+# ANALYTICS SERIALIZERS
+
+class AssignmentStatsSerializer(serializers.ModelSerializer):
+    """
+    Score distribution of one assignment, in percent of max_score.
+    Serialize AssignmentStats with select_related("assignment").
+    """
+    title = serializers.CharField(source="assignment.title", read_only=True)
+    due_date = serializers.DateTimeField(source="assignment.due_date", read_only=True)
+
+    class Meta:
+        model = AssignmentStats
+        fields = ["assignment", "title", "due_date", "enrolled", "submitted", "graded", "late",
+                  "mean", "median", "stddev", "histogram", "completion_rate", "late_rate", "refreshed_at"]
+        read_only_fields = fields
+
+
+class StudentCourseStatsSerializer(serializers.ModelSerializer):
+    """
+    A student's results in one course, in percent of max_score.
+    Serialize StudentCourseStats with select_related("student").
+    """
+    student_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = StudentCourseStats
+        fields = ["student", "student_name", "rank", "percentile", "assignments", "submitted", "graded",
+                  "late", "mean", "median", "stddev", "completion_rate", "late_rate", "refreshed_at"]
+        read_only_fields = fields
+
+    def get_student_name(self, obj):
+        return f"{obj.student.first_name} {obj.student.last_name}"
+
+
+# UPLOAD SERIALIZERS
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Progress of a chunked upload - next_chunk is where a client resumes"""
+    next_chunk = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = UploadSession
+        fields = ["id", "target", "filename", "total_size", "chunk_size", "received_bytes",
+                  "next_chunk", "sha256", "status", "created_at"]
+        read_only_fields = fields
+
+
+class UploadStartSerializer(serializers.Serializer):
+    """For starting a chunked upload of a material or a submission file"""
+    target = serializers.ChoiceField(choices=UploadSession.TARGET_CHOICES)
+    filename = serializers.CharField(max_length=255)
+    total_size = serializers.IntegerField(min_value=1)
+    title = serializers.CharField(max_length=100, required=False)
+    description = serializers.CharField(required=False, allow_blank=True)
+    course = serializers.PrimaryKeyRelatedField(queryset=Course.objects.all(), required=False)
+    assignment = serializers.PrimaryKeyRelatedField(queryset=Assignment.objects.all(), required=False)
+    
+    def validate(self, data):
+        from .access import enrolled_course_ids
+        user = self.context["request"].user
+        
+        if data["target"] == "material":
+            if user.role not in ["teacher", "admin"]:
+                raise serializers.ValidationError("Only Teachers or Admins can upload materials.")
+            if not data.get("course") or not data.get("title"):
+                raise serializers.ValidationError("Materials need a course and a title")
+        else:
+            if user.role != "student":
+                raise serializers.ValidationError("Only students can upload submissions.")
+            assignment = data.get("assignment")
+            if assignment is None:
+                raise serializers.ValidationError("Submissions need an assignment")
+            if assignment.course_id not in enrolled_course_ids(user):
+                raise serializers.ValidationError("You are not enrolled in this course.")
+        return data
+    
+    def metadata(self):
+        data = self.validated_data
+        if data["target"] == "material":
+            return {"course": data["course"].pk, "title": data["title"], "description": data.get("description", "")}
+        return {"assignment": data["assignment"].pk}
+
+
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
\ No newline at end of file
@@ -0,0 +1,289 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, dashboards, search
+from .analytics import schedule_course_refresh
+from .access import invalidate_enrolled_course_ids
+from .derivatives import schedule_material_preview, schedule_profile_thumbnail
+from .detail_cache import invalidate_course_detail, invalidate_material_detail
+from .models import User, Course, Material, Assignment, CourseEnrollment, Submission, Grade
+
+
+def _deleted_with(origin, *parents):
+    """True when the row goes away because one of ``parents`` is being deleted"""
+    return isinstance(origin, parents) or getattr(origin, "model", None) in parents
+
+
+def _assignment_course_id(submission):
+    """The course of a submission, without loading its assignment unless it is already loaded"""
+    if Submission.assignment.is_cached(submission):
+        return submission.assignment.course_id
+    return Assignment.objects.filter(pk=submission.assignment_id).values_list("course_id", flat=True).first()
+
+
+def _graded_course_id(grade):
+    if Grade.submission.is_cached(grade):
+        return _assignment_course_id(grade.submission)
+    return Submission.objects.filter(pk=grade.submission_id).values_list("assignment__course_id", flat=True).first()
+
+
+def _deferred(instance, *fields):
+    """True when any of ``fields`` is not loaded; reading it would cost a query"""
+    return not instance.get_deferred_fields().isdisjoint(fields)
+
+
+# ENROLLMENT COUNTERS
+
+@receiver(post_init, sender=CourseEnrollment)
+def remember_enrollment_state(sender, instance, **kwargs):
+    if not instance.pk:
+        instance._saved_state = (None, False)
+    elif _deferred(instance, "course_id", "is_active"):
+        # Looked up in pre_save, only if the row is saved with those fields
+        instance._saved_state = None
+    else:
+        instance._saved_state = (instance.course_id, instance.is_active)
+
+
+@receiver(pre_save, sender=CourseEnrollment)
+def load_enrollment_state(sender, instance, **kwargs):
+    fields = {"course_id", "is_active"}
+    if instance._saved_state is None and not fields <= instance.get_deferred_fields():
+        instance._saved_state = CourseEnrollment.objects.filter(pk=instance.pk).values_list(
+            "course_id", "is_active"
+        ).first() or (None, False)
+
+
+@receiver(post_save, sender=CourseEnrollment)
+def count_enrollment_saved(sender, instance, created, **kwargs):
+    if instance._saved_state is None:
+        # Both fields are still deferred, so this save did not change them
+        return
+    old_course_id, was_active = instance._saved_state
+    moved = instance.course_id != old_course_id
+    if was_active and (moved or not instance.is_active):
+        counters.adjust(Course, old_course_id, "student_count", -1)
+    if instance.is_active and (moved or not was_active):
+        counters.adjust(Course, instance.course_id, "student_count", 1)
+    instance._saved_state = (instance.course_id, instance.is_active)
+
+
+@receiver(post_delete, sender=CourseEnrollment)
+def count_enrollment_deleted(sender, instance, origin=None, **kwargs):
+    if instance.is_active and not _deleted_with(origin, Course):
+        counters.adjust(Course, instance.course_id, "student_count", -1)
+
+
+# MATERIAL AND ASSIGNMENT COUNTERS
+
+@receiver(post_save, sender=Material)
+def count_material_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust(Course, instance.course_id, "material_count", 1)
+
+
+@receiver(post_delete, sender=Material)
+def count_material_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, Course):
+        counters.adjust(Course, instance.course_id, "material_count", -1)
+
+
+@receiver(post_save, sender=Assignment)
+def count_assignment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust(Course, instance.course_id, "assignment_count", 1)
+
+
+@receiver(post_delete, sender=Assignment)
+def count_assignment_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, Course):
+        counters.adjust(Course, instance.course_id, "assignment_count", -1)
+
+
+# SUBMISSION AND GRADE COUNTERS
+
+@receiver(post_save, sender=Submission)
+def count_submission_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust(Assignment, instance.assignment_id, "submission_count", 1)
+
+
+@receiver(post_delete, sender=Submission)
+def count_submission_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, Course, Assignment):
+        counters.adjust(Assignment, instance.assignment_id, "submission_count", -1)
+
+
+@receiver(post_save, sender=Grade)
+def count_grade_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_graded(instance.submission_id, 1)
+
+
+@receiver(post_delete, sender=Grade)
+def count_grade_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, Course, Assignment):
+        counters.adjust_graded(instance.submission_id, -1)
+
+
+# ACCESS CACHE
+
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def invalidate_enrollment_access(sender, instance, **kwargs):
+    # After commit, so a concurrent reader cannot re-cache the old ids
+    transaction.on_commit(lambda: invalidate_enrolled_course_ids(instance.student_id))
+
+
+# DETAIL PAGE CACHE
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_page(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_course_detail(instance.pk))
+
+
+@receiver(post_save, sender=Material)
+@receiver(post_delete, sender=Material)
+def invalidate_material_page(sender, instance, **kwargs):
+    def invalidate():
+        invalidate_material_detail(instance.pk)
+        invalidate_course_detail(instance.course_id)
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def invalidate_course_page_for_child(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_course_detail(instance.course_id))
+
+
+# ANALYTICS SUMMARIES
+
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def refresh_course_analytics(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, Course):
+        schedule_course_refresh(instance.course_id)
+
+
+@receiver(post_save, sender=Submission)
+@receiver(post_delete, sender=Submission)
+def refresh_submission_analytics(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, Course, Assignment):
+        course_id = _assignment_course_id(instance)
+        if course_id is not None:
+            schedule_course_refresh(course_id)
+
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def refresh_grade_analytics(sender, instance, origin=None, **kwargs):
+    # A grade deleted with its submission is covered by the submission's refresh
+    if not _deleted_with(origin, Course, Assignment, Submission):
+        course_id = _graded_course_id(instance)
+        if course_id is not None:
+            schedule_course_refresh(course_id)
+
+
+# STUDENT DASHBOARDS
+
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def refresh_enrollment_dashboard(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, User):
+        dashboards.refresh_on_commit(instance.student_id, ["courses", "upcoming"])
+
+
+@receiver(post_save, sender=Submission)
+@receiver(post_delete, sender=Submission)
+def refresh_submission_dashboard(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, Course, User):
+        dashboards.refresh_on_commit(instance.student_id, ["upcoming", "pending", "recent_grades"])
+
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def refresh_grade_dashboard(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, Course, Assignment, Submission, User):
+        dashboards.refresh_on_commit(instance.submission.student_id, ["pending", "recent_grades"])
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def refresh_assignment_dashboards(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, Course):
+        dashboards.schedule_course_refresh(instance.course_id, ["upcoming", "pending", "recent_grades"])
+
+
+@receiver(post_save, sender=Course)
+def refresh_course_dashboards(sender, instance, created, **kwargs):
+    if not created:
+        dashboards.schedule_course_refresh(instance.pk, ["courses", "upcoming"])
+
+
+# SEARCH INDEX
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, **kwargs):
+    transaction.on_commit(lambda: search.index_course(instance.pk))
+
+
+@receiver(post_save, sender=Material)
+def index_material(sender, instance, **kwargs):
+    transaction.on_commit(lambda: search.index_material(instance.pk))
+    # Runs before queue_material_preview below, which moves _saved_file on
+    name = _changed_file(instance, "file", instance._saved_file)
+    if name:
+        search.schedule_material_text(instance.pk, name)
+
+
+# DERIVATIVES
+
+def _saved_file(instance, field):
+    """The file name as loaded; None for new rows and when the field is deferred"""
+    if not instance.pk or _deferred(instance, field):
+        return None
+    return getattr(instance, field).name
+
+
+def _changed_file(instance, field, saved):
+    """The new file name when ``field`` changed since it was loaded"""
+    if _deferred(instance, field):
+        # Still deferred, so this save did not write it
+        return None
+    name = getattr(instance, field).name
+    return name if name and name != saved else None
+
+
+@receiver(post_init, sender=User)
+def remember_profile_picture(sender, instance, **kwargs):
+    instance._saved_picture = _saved_file(instance, "profile_picture")
+
+
+@receiver(post_save, sender=User)
+def queue_profile_thumbnail(sender, instance, **kwargs):
+    name = _changed_file(instance, "profile_picture", instance._saved_picture)
+    if name:
+        schedule_profile_thumbnail(instance.pk, name)
+    if not _deferred(instance, "profile_picture"):
+        instance._saved_picture = instance.profile_picture.name
+
+
+@receiver(post_init, sender=Material)
+def remember_material_file(sender, instance, **kwargs):
+    instance._saved_file = _saved_file(instance, "file")
+
+
+@receiver(post_save, sender=Material)
+def queue_material_preview(sender, instance, **kwargs):
+    name = _changed_file(instance, "file", instance._saved_file)
+    if name:
+        schedule_material_preview(instance.pk, name)
+    if not _deferred(instance, "file"):
+        instance._saved_file = instance.file.name
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = "blobs"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every upload once under blobs/ keyed by its SHA-256, whatever its
+    upload_to prefix or original name. Saving identical bytes again only bumps
+    the StoredBlob reference count; unreferenced blobs are removed by the
+    gc_blobs management command. Files saved before this backend existed keep
+    their old names and are served as usual.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(*args, **kwargs)
+
+    def blob_name(self, digest, name):
+        extension = os.path.splitext(name)[1].lower()
+        return f"{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def save(self, name, content, max_length=None):
+        from .models import StoredBlob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        # Hash while copying to a temp file in the same filesystem, then rename,
+        # so the bytes are read once and a blob is never seen half-written
+        temp_dir = self.path(os.path.join(BLOB_PREFIX, "tmp"))
+        os.makedirs(temp_dir, exist_ok=True)
+        hasher, size = hashlib.sha256(), 0
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+
+            digest = hasher.hexdigest()
+            blob_name = self.blob_name(digest, name)
+            # Take the reference with the row locked, before touching the file: gc_blobs
+            # locks the row too, so it either finishes removing the blob first or sees the reference
+            with transaction.atomic():
+                blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                    name=blob_name, defaults={"sha256": digest, "size": size, "ref_count": 1},
+                )
+                if not created:
+                    StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+
+                final_path = self.path(blob_name)
+                if os.path.exists(final_path):
+                    os.remove(temp_path)
+                else:
+                    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                    os.replace(temp_path, final_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(final_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return blob_name
+
+    def delete(self, name):
+        """Drop one reference; the bytes stay until gc_blobs finds no row using them"""
+        from .models import StoredBlob
+
+        if name and name.startswith(f"{BLOB_PREFIX}/"):
+            StoredBlob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F("ref_count") - 1)
+            return
+        super().delete(name)
+
+    def delete_blob(self, name):
+        super().delete(name)
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def get_blob_storage():
+    return blob_storage
+
+
+def referenced_blob_counts():
+    """Reference counts per blob name, recomputed from every file field that uses this storage"""
+    from .models import User, Material, Submission
+
+    counts = {}
+    sources = [
+        (User, "profile_picture"),
+        (Material, "file"),
+        (Submission, "submission_file"),
+    ]
+    for model, field in sources:
+        names = (
+            model.objects.filter(**{f"{field}__startswith": f"{BLOB_PREFIX}/"})
+            .values_list(field, flat=True)
+            .iterator(chunk_size=5000)
+        )
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+    return counts
@@ -0,0 +1,123 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name, max_attempts=3):
+    """Register ``function(**payload)`` as a background task called ``name``"""
+    def register(function):
+        _registry[name] = (function, max_attempts)
+        function.task_name = name
+        return function
+    return register
+
+
+def enqueue(name, payload=None, priority=0, idempotency_key=None, delay=None):
+    """
+    Queue task ``name``. Higher priority runs first. With an idempotency key,
+    a task that was already queued under that key is returned instead.
+    """
+    if name not in _registry:
+        raise ValueError(f"Unknown task: {name}")
+    _, max_attempts = _registry[name]
+    fields = {
+        "name": name,
+        "payload": payload or {},
+        "priority": priority,
+        "max_attempts": max_attempts,
+        "run_after": timezone.now() + (delay or timedelta(0)),
+    }
+    if idempotency_key is None:
+        return Task.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(idempotency_key=idempotency_key, **fields)
+    except IntegrityError:
+        return Task.objects.get(idempotency_key=idempotency_key)
+
+
+def enqueue_on_commit(name, payload=None, **options):
+    """Queue the task only once the surrounding transaction commits"""
+    transaction.on_commit(lambda: enqueue(name, payload, **options))
+
+
+def claim(worker_id, limit):
+    """Atomically mark up to ``limit`` due tasks as running for ``worker_id``"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status="queued", run_after__lte=now)
+            .order_by("-priority", "run_after", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        Task.objects.filter(id__in=ids, status="queued").update(
+            status="running", locked_by=worker_id, locked_at=now
+        )
+    return ids
+
+
+def execute(task_id):
+    """Run one claimed task; failures are retried with exponential backoff"""
+    task = Task.objects.get(pk=task_id)
+    function, _ = _registry.get(task.name, (None, 0))
+    task.attempts += 1
+    try:
+        if function is None:
+            raise LookupError(f"No task registered as {task.name}")
+        function(**task.payload)
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if task.attempts >= task.max_attempts:
+            task.status, task.finished_at = "failed", timezone.now()
+            logger.error("Task %s (%s) failed for good", task.pk, task.name)
+        else:
+            task.status = "queued"
+            task.run_after = timezone.now() + timedelta(seconds=2 ** task.attempts)
+        task.save(update_fields=["attempts", "last_error", "status", "run_after", "finished_at"])
+        return False
+
+    task.status, task.finished_at = "done", timezone.now()
+    task.save(update_fields=["attempts", "status", "finished_at"])
+    return True
+
+
+def requeue_stale(older_than):
+    """
+    Put back tasks whose worker died while running them. The lost run counts
+    as an attempt, so a task that keeps killing its worker fails for good
+    at max_attempts instead of being retried forever. Returns tasks requeued.
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(status="running", locked_at__lt=now - older_than)
+    with transaction.atomic():
+        failed = stale.filter(attempts__gte=F("max_attempts") - 1).update(
+            status="failed", attempts=F("attempts") + 1, locked_by="", finished_at=now,
+            last_error="The worker stopped while running this task",
+        )
+        requeued = stale.update(status="queued", attempts=F("attempts") + 1, locked_by="")
+    if failed:
+        logger.error("%s stale task(s) failed for good", failed)
+    return requeued
+
+
+def run_pending(worker_id="inline", limit=100):
+    """Claim and run due tasks in this thread; returns how many ran (used by tests and --once)"""
+    ran = 0
+    while True:
+        ids = claim(worker_id, limit)
+        if not ids:
+            return ran
+        for task_id in ids:
+            execute(task_id)
+            ran += 1
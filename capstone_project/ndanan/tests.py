@@ -1,3 +1,1653 @@
-from django.test import TestCase
+import hashlib
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import nullcontext
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.handlers.base import BaseHandler
+from django.core.files.storage import default_storage
+from django.core import mail
+from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import IntegrityError, connection, router, transaction
+from django.http import HttpResponse
+from django.db.models import Count, F
+from unittest import addModuleCleanup, mock, skipUnless
+
+from django.conf import settings
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from . import analytics, benchmarks, dashboards, deadlines, enrollments, provisioning, search
+from .derivatives import PREVIEW, derivative_name
+from .detail_cache import detail_cache_stats
+from .pagination import paginate_keyset
+from .enrollments import bulk_enroll, read_enrollment_rows
+from .grading import grade_batch
+from .db.pool import ConnectionPool, PoolTimeout, get_pool
+from .instrumentation import record_queries
+from .middleware import PRIMARY_COOKIE, PrimaryStickinessMiddleware
+from .replicas import primary_reads
+from . import urls as ndanan_urls
+from . import signals, tasks, uploads
+from .access import ENROLLMENT_CACHE_KEY, check_course_access, enrolled_course_ids
+from .models import (
+    User, Course, Material, Assignment, CourseEnrollment, Submission, Grade, StoredBlob, Task, UploadSession,
+    AssignmentStats, StudentCourseStats, StudentDashboard, DeadlineReminder, SearchDocument,
+)
+from .serializers import (
+    UserSerializer, CourseListSerializer, CourseDetailSerializer, SubmissionSerializer, SubmissionListSerializer, GradeSerializer,
+)
+
+
+def setUpModule():
+    # Nothing replicates between the test databases, so only the replica tests read from one
+    primary_only = override_settings(READ_REPLICA_DATABASE="")
+    primary_only.enable()
+    addModuleCleanup(primary_only.disable)
+
+
+def make_user(email, role="student", **extra):
+    return User.objects.create_user(
+        email=email, password="pass12345", first_name="Test", last_name=role.title(), role=role, **extra
+    )
+
+
+def make_course(teacher, code, students=0, materials=0, assignments=0):
+    course = Course.objects.create(name=f"Course {code}", course_code=code, teacher=teacher)
+    for i in range(students):
+        student = make_user(f"{code.lower()}-student{i}@school.edu")
+        CourseEnrollment.objects.create(course=course, student=student)
+    for i in range(materials):
+        Material.objects.create(course=course, title=f"Material {i}", description="notes", uploaded_by=teacher)
+    for i in range(assignments):
+        Assignment.objects.create(
+            course=course, title=f"Assignment {i}", description="work",
+            due_date=timezone.now() + timezone.timedelta(days=7), created_by=teacher,
+        )
+    return course
+
+
+class CourseSerializerQueryCountTests(TestCase):
+    """The course serializers must cost a fixed number of queries per page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("teacher@staff.school.com", role="teacher")
+        for i in range(10):
+            make_course(cls.teacher, f"C{i}", students=3, materials=2, assignments=2)
+
+    def test_list_serializer_uses_one_query(self):
+        courses = Course.objects.with_teacher()
+        with self.assertNumQueries(1):
+            data = CourseListSerializer(courses, many=True).data
+        self.assertEqual(len(data), 10)
+        self.assertTrue(all(row["student_count"] == 3 for row in data))
+
+    def test_detail_serializer_uses_two_queries(self):
+        courses = Course.objects.with_teacher().with_enrolled_students()
+        with self.assertNumQueries(2):
+            data = CourseDetailSerializer(courses, many=True).data
+        self.assertTrue(all(row["material_count"] == 2 for row in data))
+        self.assertTrue(all(row["assignment_count"] == 2 for row in data))
+        self.assertTrue(all(len(row["enrolled_students"]) == 3 for row in data))
+
+    def test_counts_ignore_inactive_enrollments(self):
+        course = Course.objects.get(course_code="C0")
+        course.enrollments.update(is_active=False)
+        annotated = Course.objects.with_counts().get(pk=course.pk)
+        self.assertEqual(annotated.num_students, 0)
+        self.assertEqual(annotated.num_materials, 2)
+
+    def test_serializers_fall_back_without_prefetch(self):
+        course = Course.objects.get(course_code="C1")
+        self.assertEqual(CourseListSerializer(course).data["student_count"], 3)
+        self.assertEqual(len(CourseDetailSerializer(course).data["enrolled_students"]), 3)
+
+
+class SubmissionSerializerQueryCountTests(TestCase):
+    """Listing an assignment's submissions must not scale queries with class size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = make_user("grader@staff.school.com", role="teacher")
+        cls.course = make_course(teacher, "SUB1", students=6, assignments=1)
+        cls.assignment = cls.course.assignments.get()
+        for i, enrollment in enumerate(cls.course.enrollments.select_related("student")):
+            submission = Submission.objects.create(
+                assignment=cls.assignment, student=enrollment.student, submission_file="submissions/work.pdf",
+            )
+            if i % 2 == 0:
+                Grade.objects.create(submission=submission, score=80, graded_by=teacher)
+
+    def test_submission_serializer_uses_one_query(self):
+        submissions = Submission.objects.for_assignment(self.assignment)
+        with self.assertNumQueries(1):
+            data = SubmissionSerializer(submissions, many=True).data
+        self.assertEqual(len(data), 6)
+        self.assertEqual(sum(1 for row in data if row["grade_info"]), 3)
+
+    def test_submission_list_serializer_uses_one_query(self):
+        submissions = Submission.objects.for_assignment(self.assignment)
+        with self.assertNumQueries(1):
+            data = SubmissionListSerializer(submissions, many=True).data
+        self.assertEqual(sum(1 for row in data if row["has_grade"]), 3)
+
+    def test_grade_serializer_uses_one_query(self):
+        grades = Grade.objects.with_related().filter(submission__assignment=self.assignment)
+        with self.assertNumQueries(1):
+            data = GradeSerializer(grades, many=True).data
+        self.assertEqual(len(data), 3)
+        self.assertTrue(all(row["assignment_title"] == self.assignment.title for row in data))
+
+
+class CounterMaintenanceTests(TestCase):
+    """Stored counters follow writes and can be rebuilt after drift"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("counter@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "CNT1", students=2, materials=2, assignments=1)
+
+    def refresh(self):
+        self.course.refresh_from_db()
+        return self.course
+
+    def test_enrollment_changes_move_student_count(self):
+        self.assertEqual(self.refresh().student_count, 2)
+        enrollment = self.course.enrollments.first()
+        enrollment.is_active = False
+        enrollment.save()
+        self.assertEqual(self.refresh().student_count, 1)
+        enrollment.is_active = True
+        enrollment.save()
+        self.assertEqual(self.refresh().student_count, 2)
+        enrollment.delete()
+        self.assertEqual(self.refresh().student_count, 1)
+
+    def test_moving_an_enrollment_moves_the_count(self):
+        other = make_course(self.teacher, "CNT2")
+        enrollment = self.course.enrollments.first()
+        enrollment.course = other
+        enrollment.save()
+        other.refresh_from_db()
+        self.assertEqual((self.refresh().student_count, other.student_count), (1, 1))
+
+    def test_deferred_rows_load_without_extra_queries(self):
+        with self.assertNumQueries(1):
+            enrollments = list(CourseEnrollment.objects.only("id", "student_id").filter(course=self.course))
+        self.assertEqual(len(enrollments), 2)
+        with self.assertNumQueries(1):
+            list(Material.objects.only("id", "title").filter(course=self.course))
+        with self.assertNumQueries(1):
+            list(User.objects.only("id", "email").filter(pk=self.teacher.pk))
+
+    def test_saving_a_deferred_enrollment_still_counts(self):
+        enrollment = CourseEnrollment.objects.only("id").filter(course=self.course).first()
+        enrollment.is_active = False
+        enrollment.save()
+        self.assertEqual(self.refresh().student_count, 1)
+
+    def test_material_and_assignment_deletes_move_counts(self):
+        self.course.materials.first().delete()
+        self.course.assignments.get().delete()
+        course = self.refresh()
+        self.assertEqual((course.material_count, course.assignment_count), (1, 0))
+
+    def test_submission_and_grade_counts(self):
+        assignment = self.course.assignments.get()
+        student = self.course.enrollments.first().student
+        submission = Submission.objects.create(assignment=assignment, student=student, submission_file="submissions/a.pdf")
+        Grade.objects.create(submission=submission, score=50)
+        assignment.refresh_from_db()
+        self.assertEqual((assignment.submission_count, assignment.graded_count), (1, 1))
+        submission.delete()
+        assignment.refresh_from_db()
+        self.assertEqual((assignment.submission_count, assignment.graded_count), (0, 0))
+
+    def test_rebuild_counters_repairs_drift(self):
+        Course.objects.filter(pk=self.course.pk).update(student_count=99, material_count=0)
+        call_command("rebuild_counters", stdout=StringIO())
+        course = self.refresh()
+        self.assertEqual((course.student_count, course.material_count), (2, 2))
+
+
+class HotQueryIndexTests(TestCase):
+    """EXPLAIN the role-scoped hot queries and fail when their index goes unused"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("indexed@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "IDX1", students=3, assignments=1)
+        cls.student = cls.course.enrollments.first().student
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"{index_name} unused by:\n{plan}")
+
+    def test_enrolled_course_ids_use_enrollment_index(self):
+        queryset = CourseEnrollment.objects.filter(student=self.student, is_active=True).values_list("course", flat=True)
+        self.assertUsesIndex(queryset, "enroll_student_active_idx")
+
+    def test_enrollment_access_check_uses_enrollment_index(self):
+        queryset = CourseEnrollment.objects.filter(student=self.student, course=self.course, is_active=True)
+        self.assertUsesIndex(queryset, "enroll_student_active_idx")
+
+    def test_submission_status_grouping_uses_submission_index(self):
+        queryset = (
+            Submission.objects.filter(assignment=self.course.assignments.get())
+            .values("status").annotate(total=Count("pk")).order_by()
+        )
+        self.assertUsesIndex(queryset, "submission_assign_status_idx")
+
+    def test_only_one_active_enrollment_per_student(self):
+        CourseEnrollment.objects.filter(course=self.course, student=self.student).update(is_active=False)
+        CourseEnrollment.objects.create(course=self.course, student=self.student)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CourseEnrollment.objects.create(course=self.course, student=self.student)
+
+
+class EnrollmentAccessCacheTests(TestCase):
+    """Access checks read enrolled course ids from the request memo and the cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("access@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "ACC1", students=1)
+        cls.other = make_course(cls.teacher, "ACC2")
+        cls.student_id = cls.course.enrollments.get().student_id
+
+    def setUp(self):
+        cache.clear()
+
+    def check(self, user, course):
+        check_course_access(user, course.pk, course.teacher_id, "not owner", "denied")
+
+    def test_enrollment_lookup_is_cached_across_requests(self):
+        student = User.objects.get(pk=self.student_id)
+        with self.assertNumQueries(1):
+            self.check(student, self.course)
+        student = User.objects.get(pk=self.student_id)
+        with self.assertNumQueries(0):
+            self.check(student, self.course)
+            with self.assertRaises(PermissionDenied):
+                self.check(student, self.other)
+
+    def test_enrollment_change_invalidates_cache(self):
+        student = User.objects.get(pk=self.student_id)
+        self.assertNotIn(self.other.pk, enrolled_course_ids(student))
+        with self.captureOnCommitCallbacks(execute=True):
+            CourseEnrollment.objects.create(course=self.other, student=student)
+        self.assertIn(self.other.pk, enrolled_course_ids(User.objects.get(pk=self.student_id)))
+
+
+class DetailCacheTests(TestCase):
+    """Detail pages are served from the cache until a related write invalidates them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("cached@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "DC1", students=2, materials=1)
+        cls.student = cls.course.enrollments.first().student
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def test_course_detail_hits_cache_and_invalidates_on_material_save(self):
+        url = reverse("course_details", args=[self.course.pk])
+        self.assertContains(self.client.get(url), "Material 0")
+        self.assertContains(self.client.get(url), "Material 0")
+        self.assertEqual(detail_cache_stats()["hits"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Material.objects.create(course=self.course, title="Week 2 slides", description="new", uploaded_by=self.teacher)
+        self.assertContains(self.client.get(url), "Week 2 slides")
+        self.assertEqual(detail_cache_stats()["misses"], 2)
+
+    def test_material_detail_version_follows_updated_at(self):
+        material = self.course.materials.get()
+        url = reverse("material_details", args=[material.pk])
+        self.assertContains(self.client.get(url), "Material 0")
+        Material.objects.filter(pk=material.pk).update(title="Renamed", updated_at=timezone.now())
+        self.assertContains(self.client.get(url), "Renamed")
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages walk (created_at, id) in both directions without COUNT(*)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("pager@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "PG1", materials=25)
+        # Ties on created_at must be broken by id
+        Material.objects.filter(pk__in=cls.course.materials.values("pk")[:10]).update(created_at=timezone.now())
+
+    def test_pages_cover_every_row_once_in_both_directions(self):
+        queryset = Material.objects.all()
+        expected = list(queryset.order_by("-created_at", "-id").values_list("pk", flat=True))
+        seen, pages, cursor = [], [], None
+        while True:
+            page = paginate_keyset(queryset, cursor, 10)
+            pages.append(page)
+            seen += [m.pk for m in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+
+        previous = paginate_keyset(queryset, pages[-1].previous_cursor, 10)
+        self.assertEqual([m.pk for m in previous], [m.pk for m in pages[-2]])
+
+    def test_cursor_mode_list_view_skips_count(self):
+        self.client.force_login(self.teacher)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("material_list"), {"pagination": "cursor"})
+        self.assertEqual(len(response.context["material_list"]), 10)
+        self.assertTrue(response.context["page_obj"].has_next())
+        self.assertFalse(any("COUNT(" in q["sql"] for q in queries.captured_queries))
+
+        response = self.client.get(reverse("material_list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkEnrollmentTests(TestCase):
+    """Cohort imports validate rows as a set and write with bulk_create"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("bulk@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "BLK1", students=1)
+        cls.enrolled = cls.course.enrollments.get().student
+        cls.students = [make_user(f"cohort{i}@school.edu") for i in range(5)]
+
+    def test_bulk_enroll_reports_errors_and_skips_existing(self):
+        rows = read_enrollment_rows(
+            "course_code,student\n"
+            + "".join(f"BLK1,{s.email}\n" for s in self.students[:4])
+            + f"BLK1,{self.students[4].pk}\n"
+            f"BLK1,{self.enrolled.email}\n"
+            f"BLK1,{self.students[0].email}\n"
+            f"BLK1,{self.teacher.email}\n"
+            "NOPE,someone@school.edu\n",
+            "csv",
+        )
+        # One more for the case-insensitive retry of the unknown address
+        with self.assertNumQueries(9):
+            result = bulk_enroll(rows, chunk_size=100)
+        self.assertEqual((result.created, result.skipped), (5, 2))
+        self.assertEqual([e["row"] for e in result.errors], [8, 9])
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.student_count, 6)
+
+    def test_emails_match_regardless_of_case(self):
+        student = make_user("Mixed.Case@school.edu")
+        result = bulk_enroll([{"course_code": "BLK1", "student": "MIXED.case@school.edu"}])
+        self.assertEqual((result.created, result.errors), (1, []))
+        self.assertTrue(self.course.enrollments.filter(student=student, is_active=True).exists())
+
+    def test_rows_must_be_a_list_of_objects(self):
+        for payload in ('{"course_code": "BLK1"}', "[1, 2]"):
+            with self.subTest(payload), self.assertRaises(ValueError):
+                read_enrollment_rows(payload, "json")
+
+    def test_concurrent_enrollment_of_the_same_pair_is_skipped(self):
+        # The first pair is enrolled by another request between the check and the insert
+        checks = [set(), enrollments._active_pairs]
+        with mock.patch.object(enrollments, "_active_pairs", side_effect=lambda *args: (
+            checks.pop(0) if len(checks) == 2 else checks[0](*args)
+        )):
+            result = bulk_enroll([
+                {"course_code": "BLK1", "student": self.enrolled.email},
+                {"course_code": "BLK1", "student": self.students[0].email},
+            ])
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.student_count, 2)
+
+    def test_api_rejects_other_teachers_courses(self):
+        other = make_user("other@staff.school.com", role="teacher")
+        self.client.force_login(other)
+        response = self.client.post(
+            reverse("bulk_enroll"),
+            {"enrollments": [{"course_code": "BLK1", "student": self.students[0].email}]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 0)
+        self.assertEqual(len(response.json()["errors"]), 1)
+
+
+class BatchGradingTests(TestCase):
+    """Batch grading validates every row up front and writes in one transaction"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("batch@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "BG1", students=20, assignments=1)
+        cls.assignment = cls.course.assignments.get()
+        cls.submissions = [
+            Submission.objects.create(assignment=cls.assignment, student=e.student, submission_file="submissions/s.pdf")
+            for e in cls.course.enrollments.select_related("student")
+        ]
+        Grade.objects.create(submission=cls.submissions[0], score=10, graded_by=cls.teacher)
+
+    def rows(self, score=90):
+        return [{"submission_id": s.pk, "score": score, "feedback": "ok"} for s in self.submissions]
+
+    def test_batch_is_constant_in_queries(self):
+        with self.assertNumQueries(7):
+            result = grade_batch(self.rows(), graded_by=self.teacher)
+        self.assertEqual((result.created, result.updated, result.errors), (19, 1, []))
+        self.assertEqual(Submission.objects.filter(assignment=self.assignment, status="graded").count(), 20)
+        self.assertEqual(Grade.objects.get(submission=self.submissions[0]).score, 90)
+        self.assertEqual(Assignment.objects.get(pk=self.assignment.pk).graded_count, 20)
+
+    def test_invalid_row_rolls_back_everything(self):
+        rows = self.rows()
+        rows[3]["score"] = self.assignment.max_score + 1
+        rows.append({"submission_id": 0, "score": 5})
+        result = grade_batch(rows, graded_by=self.teacher)
+        self.assertEqual([e["row"] for e in result.errors], [4, 21])
+        self.assertEqual(Grade.objects.filter(submission__assignment=self.assignment).count(), 1)
+
+    def test_non_finite_scores_are_rejected(self):
+        rows = self.rows()[:3]
+        rows[0]["score"], rows[1]["score"], rows[2]["score"] = float("nan"), "NaN", "-inf"
+        result = grade_batch(rows, graded_by=self.teacher)
+        self.assertEqual([e["error"] for e in result.errors], ["score must be a finite number"] * 3)
+        self.assertEqual(Grade.objects.filter(submission__assignment=self.assignment).count(), 1)
+
+    def test_api_returns_row_errors(self):
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse("batch_grade"), {"grades": [{"submission_id": self.submissions[1].pk, "score": -1}]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], [{"row": 1, "error": "Score cannot be negative"}])
+
+
+class GradebookExportTests(TestCase):
+    """The gradebook streams one row per student and assignment"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("export@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "EXP1", students=3, assignments=2)
+        assignment = cls.course.assignments.order_by("id").first()
+        student = cls.course.enrollments.order_by("student_id").first().student
+        submission = Submission.objects.create(assignment=assignment, student=student, submission_file="submissions/e.pdf")
+        Grade.objects.create(submission=submission, score=77)
+
+    def test_csv_export_streams_full_matrix(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse("gradebook_export", args=[self.course.pk]))
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1 + 3 * 2)
+        self.assertIn("77.0", lines[1])
+        self.assertEqual(sum("missing" in line for line in lines), 5)
+
+    def test_export_command_writes_jsonl(self):
+        out = StringIO()
+        call_command("export_gradebook", "EXP1", format="jsonl", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 6)
+
+    def test_students_cannot_export(self):
+        self.client.force_login(self.course.enrollments.first().student)
+        response = self.client.get(reverse("gradebook_export", args=[self.course.pk]))
+        self.assertEqual(response.status_code, 403)
+
+
+class ChunkedUploadTests(TestCase):
+    """Chunked uploads stream to disk, resume, and attach the file on completion"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("uploader@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "UP1", students=1, assignments=1)
+        cls.student = cls.course.enrollments.get().student
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media, CHUNKED_UPLOAD_TEMP_DIR=f"{self.media}/parts",
+            CHUNKED_UPLOAD_CHUNK_SIZE=8, SUBMISSION_MAX_UPLOAD_SIZE=20,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def start(self, user, **data):
+        self.client.force_login(user)
+        return self.client.post(reverse("upload_start"), data, content_type="application/json")
+
+    def put_chunk(self, session_id, index, body):
+        url = reverse("upload_chunk", args=[session_id, index])
+        return self.client.put(url, body, content_type="application/octet-stream")
+
+    def test_material_upload_resumes_and_attaches_file(self):
+        payload = b"lecture video bytes!"
+        response = self.start(self.teacher, target="material", filename="week1.mp4", total_size=len(payload),
+                              course=self.course.pk, title="Week 1")
+        session_id = response.json()["id"]
+
+        self.assertEqual(self.put_chunk(session_id, 0, payload[:8]).json()["next_chunk"], 1)
+        uploads._hashers.clear()  # the next chunk lands on a different worker
+        self.assertEqual(self.put_chunk(session_id, 1, payload[8:16]).json()["next_chunk"], 2)
+        self.assertEqual(self.put_chunk(session_id, 1, payload[8:16]).json()["next_chunk"], 2)
+        self.assertEqual(self.client.get(reverse("upload_detail", args=[session_id])).json()["next_chunk"], 2)
+        self.put_chunk(session_id, 2, payload[16:])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("upload_complete", args=[session_id]),
+                                        {"sha256": hashlib.sha256(payload).hexdigest()}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        material = Material.objects.get(pk=response.json()["material"])
+        with material.file.open("rb") as stored:
+            self.assertEqual(stored.read(), payload)
+
+    def test_limits_are_enforced_as_bytes_arrive(self):
+        response = self.start(self.student, target="submission", filename="big.pdf", total_size=21,
+                              assignment=self.course.assignments.get().pk)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.start(self.student, target="submission", filename="work.pdf", total_size=10,
+                              assignment=self.course.assignments.get().pk)
+        session_id = response.json()["id"]
+        self.assertEqual(self.put_chunk(session_id, 0, b"x" * 9).status_code, 400)
+        response = self.put_chunk(session_id, 0, b"")
+        self.assertEqual((response.status_code, response.json()), (400, {"detail": "Empty chunk"}))
+        self.assertEqual(self.put_chunk(session_id, 0, b"x" * 8).status_code, 200)
+        self.assertEqual(self.put_chunk(session_id, 1, b"x" * 3).status_code, 400)
+        response = self.client.post(reverse("upload_complete", args=[session_id]))
+        self.assertEqual(response.status_code, 400)
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Identical uploads share one blob, which gc_blobs removes once unreferenced"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("blobs@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "CAS1")
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def upload(self, title, name, body):
+        material = Material(course=self.course, title=title, description="", uploaded_by=self.teacher)
+        material.file.save(name, ContentFile(body), save=True)
+        return material
+
+    def test_identical_files_are_stored_once(self):
+        first = self.upload("Syllabus", "syllabus.pdf", b"%PDF same bytes")
+        second = self.upload("Syllabus copy", "syllabus-v2.pdf", b"%PDF same bytes")
+        other = self.upload("Notes", "notes.pdf", b"%PDF other bytes")
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertNotEqual(first.file.name, other.file.name)
+        self.assertEqual(StoredBlob.objects.get(name=first.file.name).ref_count, 2)
+
+    def test_gc_removes_only_unreferenced_blobs(self):
+        kept = self.upload("Kept", "kept.pdf", b"kept")
+        dropped = self.upload("Dropped", "dropped.pdf", b"dropped")
+        dropped_name = dropped.file.name
+        preview = derivative_name(dropped_name, *PREVIEW)
+        default_storage.save(preview, ContentFile(b"png"))
+        dropped.delete()
+        # Drifted to zero but still referenced: a dry run must not count it
+        StoredBlob.objects.filter(name=kept.file.name).update(ref_count=0)
+        out = StringIO()
+        call_command("gc_blobs", min_age_hours=0, dry_run=True, stdout=out)
+        self.assertIn("Would remove 1 blob(s)", out.getvalue())
+
+        call_command("gc_blobs", min_age_hours=0, stdout=StringIO())
+        self.assertFalse(StoredBlob.objects.filter(name=dropped_name).exists())
+        self.assertFalse(kept.file.storage.exists(dropped_name))
+        self.assertFalse(default_storage.exists(preview))
+        self.assertTrue(kept.file.storage.exists(kept.file.name))
+        self.assertEqual(StoredBlob.objects.get(name=kept.file.name).ref_count, 1)
+
+    def test_gc_keeps_a_blob_referenced_again_during_the_mark(self):
+        material = self.upload("Reused", "reused.pdf", b"reused")
+        name = material.file.name
+        Material.objects.filter(pk=material.pk).delete()
+        StoredBlob.objects.filter(name=name).update(ref_count=1)
+
+        class RacingCounts(dict):
+            # A save of the same bytes lands between the mark's read and its write
+            def get(self, blob_name, default=None):
+                StoredBlob.objects.filter(name=blob_name).update(ref_count=F("ref_count") + 1)
+                return super().get(blob_name, default)
+
+        with mock.patch("ndanan.management.commands.gc_blobs.referenced_blob_counts", RacingCounts):
+            call_command("gc_blobs", min_age_hours=0, stdout=StringIO())
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 2)
+        self.assertTrue(material.file.storage.exists(name))
+
+
+class FileDownloadTests(TestCase):
+    """Downloads are permission-checked and honour Range, ETag and X-Accel-Redirect"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("files@staff.school.com", role="teacher")
+        cls.course = make_course(cls.teacher, "DL1", students=1)
+        cls.student = cls.course.enrollments.get().student
+        cls.outsider = make_user("outsider@school.edu")
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache.clear()
+        self.material = Material(course=self.course, title="Slides", description="", uploaded_by=self.teacher)
+        self.material.file.save("slides.pdf", ContentFile(b"0123456789"), save=True)
+        self.url = reverse("material_download", args=[self.material.pk])
+
+    def test_full_download_and_conditional_request(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertIn('filename="Slides.pdf"', response["Content-Disposition"])
+
+        response = self.client.get(self.url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, headers={"Range": "bytes=2-5"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+
+        response = self.client.get(self.url, headers={"Range": "bytes=-3"})
+        self.assertEqual(b"".join(response.streaming_content), b"789")
+        self.assertEqual(self.client.get(self.url, headers={"Range": "bytes=20-"}).status_code, 416)
+
+    @override_settings(SENDFILE_BACKEND="xaccel", SENDFILE_URL_PREFIX="/protected/")
+    def test_x_accel_redirect_hands_off_the_transfer(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected/{self.material.file.name}")
+        self.assertEqual(response.content, b"")
+
+    def test_students_outside_the_course_are_denied(self):
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_missing_file_is_not_found(self):
+        self.material.file.storage.delete_blob(self.material.file.name)
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_submission_downloads_use_the_uploaded_name(self):
+        assignment = Assignment.objects.create(
+            course=self.course, title="Essay", description="", due_date=timezone.now(), created_by=self.teacher,
+        )
+        submission = Submission(assignment=assignment, student=self.student, original_name="my essay.pdf")
+        submission.submission_file.save("my essay.pdf", ContentFile(b"essay"), save=True)
+        self.client.force_login(self.student)
+        response = self.client.get(reverse("submission_download", args=[submission.pk]))
+        self.assertIn('filename="my essay.pdf"', response["Content-Disposition"])
+        response.close()
+
+
+class DerivativePipelineTests(TestCase):
+    """Profile pictures get a fixed-size thumbnail stored next to the original"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media, PROFILE_THUMBNAIL_SIZE=32)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_profile_picture_upload_creates_thumbnail(self):
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (300, 200), "teal").save(buffer, "PNG")
+        user = make_user("pictured@school.edu")
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile_picture.save("me.png", ContentFile(buffer.getvalue()), save=True)
+        self.assertTrue(Task.objects.filter(name="derivatives.profile_thumbnail").exists())
+        tasks.run_pending()
+
+        user.refresh_from_db()
+        self.assertTrue(user.profile_thumbnail.name.startswith(user.profile_picture.name.rsplit(".", 1)[0]))
+        with Image.open(user.profile_thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (32, 32))
+        self.assertEqual(UserSerializer(user).data["thumbnail_url"], user.profile_thumbnail.url)
+
+
+calls = []
+
+
+@tasks.task("tests.record")
+def record_call(label):
+    calls.append(label)
+
+
+@tasks.task("tests.flaky", max_attempts=2)
+def flaky_call():
+    raise RuntimeError("boom")
+
+
+class TaskQueueTests(TestCase):
+    """Database-backed background tasks: priorities, retries, idempotency and the worker"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_higher_priority_runs_first(self):
+        tasks.enqueue("tests.record", {"label": "low"}, priority=-5)
+        tasks.enqueue("tests.record", {"label": "high"}, priority=5)
+        tasks.enqueue("tests.record", {"label": "normal"})
+        self.assertEqual(tasks.run_pending(), 3)
+        self.assertEqual(calls, ["high", "normal", "low"])
+
+    def test_idempotency_key_returns_existing_task(self):
+        first = tasks.enqueue("tests.record", {"label": "once"}, idempotency_key="k1")
+        second = tasks.enqueue("tests.record", {"label": "once"}, idempotency_key="k1")
+        self.assertEqual(first.pk, second.pk)
+        tasks.run_pending()
+        self.assertEqual(calls, ["once"])
+
+    def test_failures_back_off_then_give_up(self):
+        task = tasks.enqueue("tests.flaky")
+        tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), ("queued", 1))
+        self.assertGreater(task.run_after, timezone.now())
+        self.assertIn("RuntimeError: boom", task.last_error)
+
+        Task.objects.filter(pk=task.pk).update(run_after=timezone.now())
+        with self.assertLogs("ndanan.tasks", "ERROR"):
+            tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), ("failed", 2))
+
+    def test_stale_tasks_count_an_attempt_and_eventually_fail(self):
+        task = tasks.enqueue("tests.flaky")
+        for expected in (("queued", 1), ("failed", 2)):
+            tasks.claim("dead-worker", 10)
+            Task.objects.filter(pk=task.pk).update(locked_at=timezone.now() - timezone.timedelta(hours=1))
+            with self.assertLogs("ndanan.tasks", "ERROR") if expected[0] == "failed" else nullcontext():
+                tasks.requeue_stale(timezone.timedelta(minutes=5))
+            task.refresh_from_db()
+            self.assertEqual((task.status, task.attempts), expected)
+
+    def test_grading_queues_one_notification_per_submission(self):
+        teacher = make_user("notify-teacher@school.edu", role="teacher")
+        course = make_course(teacher, "NTF101", students=1, assignments=1)
+        submission = Submission.objects.create(
+            assignment=course.assignments.get(), student=course.enrollments.get().student, submission_file="submissions/n.pdf"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            grade_batch([{"submission_id": submission.pk, "score": 7}], graded_by=teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            grade_batch([{"submission_id": submission.pk, "score": 8}], graded_by=teacher)
+        self.assertEqual(Task.objects.filter(name="notifications.grade_posted").count(), 1)
+
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [submission.student.email])
+        self.assertEqual(Task.objects.get(name="notifications.grade_posted").status, "done")
+
+
+class TaskWorkerCommandTests(TransactionTestCase):
+    """The worker's pool threads use their own connections, so the rows must be committed"""
+
+    def test_worker_drains_the_queue_and_exits(self):
+        calls.clear()
+        for label in ("a", "b", "c"):
+            tasks.enqueue("tests.record", {"label": label})
+        out = StringIO()
+        call_command("run_task_worker", "--once", "--concurrency", "2", stdout=out)
+        self.assertEqual(sorted(calls), ["a", "b", "c"])
+        self.assertEqual(Task.objects.filter(status="done").count(), 3)
+        self.assertIn("3 task(s) done", out.getvalue())
+
+    def test_process_mode_runs_tasks_in_spawned_workers(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("worker processes cannot open an in-memory test database")
+        task = tasks.enqueue("deadlines.schedule_reminders")
+        out = StringIO()
+        call_command("run_task_worker", "--once", "--mode", "process", "--concurrency", "1", stdout=out)
+        task.refresh_from_db()
+        self.assertEqual(task.status, "done")
+        self.assertIn("1 task(s) done", out.getvalue())
+
+
+def ndanan_urlconf(async_views):
+    """A root URLconf serving ndanan as it would with ASYNC_VIEWS set to ``async_views``"""
+    read = ndanan_urls.read_patterns(async_views)
+    names = {pattern.name for pattern in read}
+    rest = [pattern for pattern in ndanan_urls.urlpatterns if pattern.name not in names]
+
+    class URLConf:
+        urlpatterns = [path("ndanan/", include(read + rest))]
+    return URLConf
+
+
+AsyncViewsURLConf = ndanan_urlconf(async_views=True)
+
+
+@override_settings(ROOT_URLCONF=AsyncViewsURLConf)
+class AsyncReadViewTests(TestCase):
+    """The ASGI course/material views enforce the same access rules as the sync ones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("async-teacher@school.edu", role="teacher")
+        cls.course = make_course(cls.teacher, "ASY101", students=1, materials=1)
+        make_course(cls.teacher, "ASY102")
+        cls.student = cls.course.enrollments.get().student
+        cls.outsider = make_user("async-outsider@school.edu")
+        cls.material = cls.course.materials.get()
+
+    async def test_enrolled_student_sees_only_their_courses(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse("course_list"))
+        self.assertEqual([c.course_code for c in response.context["course_list"]], ["ASY101"])
+        self.assertFalse(response.context["is_paginated"])
+
+    async def test_course_and_material_detail_for_enrolled_student(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse("course_details", args=[self.course.pk]))
+        self.assertContains(response, "Course ASY101")
+        response = await self.async_client.get(reverse("material_details", args=[self.material.pk]))
+        self.assertContains(response, self.material.title)
+
+    async def test_access_is_denied_or_not_found(self):
+        await self.async_client.aforce_login(self.outsider)
+        response = await self.async_client.get(reverse("material_details", args=[self.material.pk]))
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(reverse("course_details", args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_anonymous_users_are_sent_to_login(self):
+        response = await self.async_client.get(reverse("course_list"))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_middleware_stays_async_and_records_queries(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse("course_list"))
+        queries = int(re.search(r'desc="(\d+) queries"', response["Server-Timing"]).group(1))
+        self.assertGreater(queries, 0)
+
+    async def test_offset_pages_match_the_sync_views(self):
+        await sync_to_async(make_course)(self.teacher, "ASY103", materials=12)
+        await self.async_client.aforce_login(self.teacher)
+        await sync_to_async(self.client.force_login)(self.teacher)
+        for page in (1, 2):
+            async_page = await self.async_client.get(reverse("material_list"), {"page": page})
+            with override_settings(ROOT_URLCONF=ndanan_urlconf(async_views=False)):
+                sync_page = await sync_to_async(self.client.get)(reverse("material_list"), {"page": page})
+            self.assertEqual(
+                [m.pk for m in async_page.context["material_list"]],
+                [m.pk for m in sync_page.context["material_list"]],
+            )
+
+
+def read_view(request):
+    return HttpResponse(router.db_for_read(Course) or "default")
+
+
+def write_then_read_view(request):
+    router.db_for_write(Course)
+    return read_view(request)
+
+
+def primary_read_view(request):
+    with primary_reads():
+        return read_view(request)
+
+
+read_view.read_replica = write_then_read_view.read_replica = True
+
+
+@override_settings(READ_REPLICA_DATABASE="replica")
+class ReplicaRoutingTests(TestCase):
+    """Replica views read from the replica unless this request or a recent one from the browser wrote"""
+
+    def serve(self, view, cookies=None):
+        request = RequestFactory().get("/")
+        request.COOKIES.update(cookies or {})
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = PrimaryStickinessMiddleware(get_response)
+        try:
+            return middleware(request)
+        finally:
+            request_finished.send(sender=self.__class__)
+
+    def test_marked_views_read_from_the_replica(self):
+        self.assertEqual(self.serve(read_view).content, b"replica")
+        unmarked = lambda request: read_view(request)  # noqa: E731
+        self.assertEqual(self.serve(unmarked).content, b"default")
+
+    def test_a_write_pins_the_request_and_the_next_few_seconds(self):
+        response = self.serve(write_then_read_view)
+        self.assertEqual(response.content, b"default")
+        cookie = response.cookies[PRIMARY_COOKIE]
+        self.assertEqual(cookie["max-age"], settings.PRIMARY_STICKY_SECONDS)
+
+        self.assertEqual(self.serve(read_view, {PRIMARY_COOKIE: cookie.value}).content, b"default")
+        self.assertEqual(self.serve(read_view, {PRIMARY_COOKIE: "1"}).content, b"replica")
+
+    def test_primary_reads_override_the_replica(self):
+        self.assertEqual(self.serve(primary_read_view).content, b"default")
+
+    def test_code_outside_requests_uses_the_primary(self):
+        self.serve(read_view)
+        self.assertEqual(router.db_for_read(Course), "default")
+
+    async def test_async_requests_route_and_pin_without_a_worker_thread(self):
+        async def get_response(request):
+            await middleware.process_view(request, write_then_read_view, (), {})
+            return write_then_read_view(request)
+
+        middleware = PrimaryStickinessMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertTrue(iscoroutinefunction(middleware.process_view))
+        response = await middleware(RequestFactory().get("/"))
+        self.assertEqual(response.content, b"default")
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+
+    @override_settings(DEBUG=True)
+    def test_the_async_middleware_chain_is_not_adapted_to_sync(self):
+        with self.assertNoLogs("django.request", "DEBUG"):
+            BaseHandler().load_middleware(is_async=True)
+
+
+HAS_REPLICA = "replica" in settings.DATABASES
+
+
+@skipUnless(HAS_REPLICA, "set DB_REPLICA_NAME (or DB_REPLICA_HOST) to test against a second database")
+@override_settings(READ_REPLICA_DATABASE="replica")
+class ReplicaDatabaseTests(TestCase):
+    """Two databases standing in for primary and replica, with replication simulated by hand"""
+    databases = {"default", "replica"} if HAS_REPLICA else {"default"}
+
+    def test_course_list_reads_replica_until_the_browser_writes(self):
+        teacher = make_user("replica-teacher@school.edu", role="teacher")
+        course = make_course(teacher, "REP101")
+        User.objects.using("replica").bulk_create([teacher])
+        Course.objects.using("replica").bulk_create([
+            Course(id=course.pk, name="Replica copy", course_code="REP101", teacher_id=teacher.pk)
+        ])
+        self.client.force_login(teacher)
+
+        self.assertContains(self.client.get(reverse("course_list")), "Replica copy")
+
+        response = self.client.post(reverse("course_create"), {"name": "Fresh", "course_code": "REP102"})
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+        response = self.client.get(reverse("course_list"))
+        self.assertContains(response, "Course REP101")
+        self.assertContains(response, "Fresh")
+
+    def test_access_checks_and_cached_pages_read_the_primary(self):
+        teacher = make_user("lag-teacher@school.edu", role="teacher")
+        student = make_user("lag-student@school.edu")
+        course = make_course(teacher, "LAG101")
+        # The replica has the course but not yet the new enrollment or material
+        User.objects.using("replica").bulk_create([teacher])
+        Course.objects.using("replica").bulk_create([
+            Course(id=course.pk, name=course.name, course_code="LAG101", teacher_id=teacher.pk)
+        ])
+        CourseEnrollment.objects.create(course=course, student=student)
+        Material.objects.create(course=course, title="Fresh notes", description="", uploaded_by=teacher)
+        cache.clear()
+        self.client.force_login(student)
+
+        response = self.client.get(reverse("course_details", args=[course.pk]))
+        self.assertContains(response, "Fresh notes")
+        self.assertEqual(cache.get(ENROLLMENT_CACHE_KEY.format(student.pk)), {course.pk})
+
+    def test_search_filters_by_enrollments_read_from_the_primary(self):
+        teacher = make_user("lag-search-teacher@school.edu", role="teacher")
+        student = make_user("lag-searcher@school.edu")
+        course = make_course(teacher, "LAG201")
+        CourseEnrollment.objects.create(course=course, student=student)
+        cache.clear()
+        self.client.force_login(student)
+
+        self.assertEqual(self.client.get(reverse("search_api"), {"q": "notes"}).status_code, 200)
+        self.assertEqual(cache.get(ENROLLMENT_CACHE_KEY.format(student.pk)), {course.pk})
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(TestCase):
+    """The bounded per-process pool behind the pooled MySQL backend"""
+
+    def make_pool(self, **options):
+        self.opened = []
+
+        def connect():
+            self.opened.append(FakeConnection())
+            return self.opened[-1]
+        return ConnectionPool(connect, check=lambda conn: conn.alive, **options)
+
+    def test_released_connections_are_reused(self):
+        pool = self.make_pool(max_size=2)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        stats = pool.stats()
+        self.assertEqual((stats["checkouts"], stats["created"], stats["in_use"]), (2, 1, 1))
+
+    def test_a_full_pool_waits_then_times_out(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        held = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+        # A release from another thread hands the connection to the waiter
+        timer = threading.Timer(0.01, pool.release, [held])
+        pool.timeout = 2
+        timer.start()
+        self.assertIs(pool.acquire(), held)
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual((stats["timeouts"], stats["waits"], stats["open"]), (1, 1, 1))
+
+    def test_dead_and_old_connections_are_replaced(self):
+        pool = self.make_pool(max_size=1, recycle=60)
+        conn = pool.acquire()
+        conn.alive = False
+        pool.release(conn)
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()["reconnects"], 1)
+
+        pool.recycle = 0
+        pool.release(replacement)
+        self.assertIsNot(pool.acquire(), replacement)
+        self.assertEqual(pool.stats()["recycled"], 1)
+
+    def test_broken_connections_free_their_slot(self):
+        pool = self.make_pool(max_size=1, timeout=0.01)
+        conn = pool.acquire()
+        pool.release(conn, reusable=False)
+        self.assertTrue(conn.closed)
+        self.assertIsNot(pool.acquire(), conn)
+
+    def test_admins_can_read_pool_metrics(self):
+        get_pool("tests", lambda: self.make_pool(max_size=3))
+        admin = make_user("pool-admin@school.edu", role="admin")
+        self.client.force_login(admin)
+        response = self.client.get(reverse("db_pool_stats"))
+        self.assertEqual(response.json()["tests"]["max_size"], 3)
+
+        self.client.force_login(make_user("pool-student@school.edu"))
+        self.assertEqual(self.client.get(reverse("db_pool_stats")).status_code, 403)
+
+
+# Query budget per GET route in ndanan/urls.py: (user, URL args, max queries).
+# Logged-in requests start with 2 (session, user). Measured on a course with
+# several students, materials and submissions, so a per-row query (N+1) blows
+# the budget. POST-only routes are listed separately.
+QUERY_BUDGETS = {
+    "home": ("student", [], 3),
+    "Login": (None, [], 0),
+    "Register": (None, [], 0),
+    "course_list": ("student", [], 5),
+    "course_details": ("student", ["course"], 6),
+    "course_create": ("teacher", [], 2),
+    "material_list": ("student", [], 4),
+    "material_details": ("student", ["material"], 4),
+    "material_create": ("teacher", [], 2),
+    "material_download": ("student", ["material"], 3),
+    "submission_download": ("teacher", ["submission"], 3),
+    "gradebook_export": ("teacher", ["course"], 6),
+    "upload_detail": ("teacher", ["upload"], 3),
+    "db_pool_stats": ("admin", [], 2),
+    "course_analytics": ("teacher", ["course"], 5),
+    "search": ("student", [], 6),
+    "search_api": ("student", [], 6),
+}
+POST_ONLY_ROUTES = {
+    "Logout", "bulk_enroll", "bulk_provision", "batch_grade", "upload_start", "upload_chunk", "upload_complete",
+}
+
+
+class QueryBudgetTests(TestCase):
+    """Every GET route stays within its query budget; new routes must declare one"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.media = tempfile.mkdtemp()
+        cls.users = {
+            "teacher": make_user("budget-teacher@school.edu", role="teacher"),
+            "admin": make_user("budget-admin@school.edu", role="admin"),
+        }
+        course = make_course(cls.users["teacher"], "BUD101", students=5, materials=5, assignments=2)
+        cls.users["student"] = course.enrollments.first().student
+        with override_settings(MEDIA_ROOT=cls.media):
+            material = course.materials.first()
+            material.file.save("notes.pdf", ContentFile(b"%PDF-1.4 budget"), save=True)
+            assignment = course.assignments.first()
+            for enrollment in course.enrollments.select_related("student"):
+                submission = Submission(assignment=assignment, student=enrollment.student)
+                submission.submission_file.save("answer.pdf", ContentFile(b"answer"), save=True)
+        # Budgeted with the summaries already computed, as the task worker keeps them
+        analytics.refresh_course(course.pk)
+        dashboards.refresh_dashboards([cls.users["student"].pk])
+        cls.objects = {
+            "course": course.pk,
+            "material": material.pk,
+            "submission": submission.pk,
+            "upload": UploadSession.objects.create(
+                owner=cls.users["teacher"], target="material", filename="big.pdf", total_size=10, chunk_size=10,
+            ).pk,
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media, ignore_errors=True)
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in ndanan_urls.urlpatterns}
+        self.assertEqual(names - POST_ONLY_ROUTES, set(QUERY_BUDGETS))
+
+    def test_get_routes_stay_within_budget(self):
+        for name, (user, args, budget) in QUERY_BUDGETS.items():
+            with self.subTest(name), override_settings(MEDIA_ROOT=self.media):
+                self.client.logout()
+                if user:
+                    self.client.force_login(self.users[user])
+                url = reverse(name, args=[self.objects[arg] for arg in args])
+                with record_queries() as recorder:
+                    response = self.client.get(url)
+                    if response.streaming:
+                        # Streamed exports and downloads query while they are consumed
+                        b"".join(response.streaming_content)
+                self.assertLess(response.status_code, 400)
+                self.assertLessEqual(recorder.count, budget, f"{name}: {recorder.count} queries")
+                self.assertFalse(recorder.duplicates(), f"{name} repeats a query per row")
+
+    def test_server_timing_header_reports_queries(self):
+        self.client.force_login(self.users["student"])
+        timing = self.client.get(reverse("course_list"))["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", view;dur=[\d.]+, total;dur=[\d.]+$')
+
+    def test_repeated_query_shapes_are_logged_as_duplicates(self):
+        with record_queries(duplicate_threshold=3) as recorder:
+            for pk in range(4):
+                Course.objects.filter(pk=pk).exists()
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(len(recorder.duplicates()), 1)
+        self.assertEqual(recorder.duplicates()[0][1], 4)
+
+
+class BenchmarkSuiteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.counts = benchmarks.generate_dataset(**benchmarks.SCALES["tiny"])
+
+    def test_generated_dataset_is_consistent(self):
+        self.assertEqual(self.counts["users"], 44)
+        self.assertEqual(self.counts["submissions"], Submission.objects.count())
+        self.assertEqual(Submission.objects.filter(status="graded").count(), Grade.objects.count())
+        course = Course.objects.order_by("-student_count").first()
+        self.assertEqual(course.student_count, course.enrollments.count())
+
+    def test_run_records_queries_latency_and_memory(self):
+        results = benchmarks.run_benchmarks(iterations=2, only=["course"])
+        self.assertEqual(
+            set(results["benchmarks"]),
+            {"serializer.course_list", "serializer.course_detail", "view.course_list", "view.course_detail"},
+        )
+        row = results["benchmarks"]["serializer.course_detail"]
+        self.assertEqual(row["queries"], 2)
+        self.assertGreater(row["peak_kb"], 0)
+        self.assertLessEqual(row["p50_ms"], row["p95_ms"])
+
+    def test_compare_flags_extra_queries_and_slowdowns(self):
+        base = {"queries": 2, "p50_ms": 5.0, "p95_ms": 10.0, "mean_ms": 6.0, "peak_kb": 100.0}
+        baseline = {"benchmarks": {"a": base, "b": base}}
+        results = {"benchmarks": {
+            "a": {**base, "queries": 3, "p95_ms": 10.5},
+            "b": {**base, "p95_ms": 20.0},
+            "new": base,
+        }}
+        regressions = benchmarks.compare(results, baseline, tolerance=0.25)
+        self.assertEqual(regressions, ["a: queries 2 -> 3", "b: p95_ms 10.0ms -> 20.0ms"])
+
+
+class GradeAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("analytics-teacher@school.edu", role="teacher")
+        cls.course = make_course(cls.teacher, "ANA101", students=4)
+        cls.students = [e.student for e in cls.course.enrollments.order_by("student_id").select_related("student")]
+        now = timezone.now()
+        cls.essay = Assignment.objects.create(
+            course=cls.course, title="Essay", description="work", max_score=100,
+            due_date=now + timezone.timedelta(days=7), created_by=cls.teacher,
+        )
+        cls.quiz = Assignment.objects.create(
+            course=cls.course, title="Quiz", description="work", max_score=50,
+            due_date=now - timezone.timedelta(days=1), created_by=cls.teacher,
+        )
+        scores = [(cls.essay, 0, 90), (cls.essay, 1, 70), (cls.essay, 2, 70),
+                  (cls.quiz, 0, 50), (cls.quiz, 1, 25), (cls.quiz, 2, None)]
+        for assignment, student, score in scores:
+            submission = Submission.objects.create(
+                assignment=assignment, student=cls.students[student], submission_file="submissions/a.pdf"
+            )
+            if score is not None:
+                Grade.objects.create(submission=submission, score=score, graded_by=cls.teacher)
+
+    def test_refresh_computes_assignment_distributions(self):
+        analytics.refresh_course(self.course.pk)
+        essay = AssignmentStats.objects.get(assignment=self.essay)
+        self.assertEqual((essay.enrolled, essay.submitted, essay.graded, essay.late), (4, 3, 3, 0))
+        self.assertAlmostEqual(essay.mean, 76.667, places=2)
+        self.assertEqual(essay.median, 70)
+        self.assertAlmostEqual(essay.stddev, 9.428, places=2)
+        self.assertEqual(essay.histogram, [0, 0, 0, 0, 0, 0, 0, 2, 0, 1])
+        self.assertEqual(essay.completion_rate, 0.75)
+
+        quiz = AssignmentStats.objects.get(assignment=self.quiz)
+        self.assertEqual((quiz.graded, quiz.mean, quiz.median, quiz.late_rate), (2, 75, 75, 1.0))
+        self.assertEqual(quiz.histogram, [0, 0, 0, 0, 0, 1, 0, 0, 0, 1])
+
+    def test_refresh_ranks_students_by_mean_percent(self):
+        analytics.refresh_course(self.course.pk)
+        stats = {s.student_id: s for s in StudentCourseStats.objects.filter(course=self.course)}
+        first, second, third, absent = (stats[student.pk] for student in self.students)
+        self.assertEqual((first.mean, first.rank, first.percentile), (95, 1, 66.7))
+        self.assertEqual((third.mean, third.rank), (70, 2))
+        self.assertEqual((second.mean, second.rank, second.percentile), (60, 3, 0))
+        self.assertEqual((first.completion_rate, first.late_rate), (1.0, 0.5))
+        self.assertIsNone(absent.rank)
+        self.assertEqual(absent.completion_rate, 0)
+
+    def test_resubmissions_are_counted_once(self):
+        late = Submission.objects.create(assignment=self.quiz, student=self.students[0],
+                                         submission_file="submissions/b.pdf")
+        Grade.objects.create(submission=late, score=40, graded_by=self.teacher)
+        analytics.refresh_course(self.course.pk)
+        first = StudentCourseStats.objects.get(student=self.students[0])
+        self.assertEqual((first.submitted, first.graded, first.late, first.completion_rate), (2, 2, 1, 1.0))
+        quiz = AssignmentStats.objects.get(assignment=self.quiz)
+        self.assertEqual((quiz.submitted, quiz.graded, quiz.late), (3, 2, 3))
+
+    def test_grade_signals_look_up_the_course_with_one_query(self):
+        submission = Submission.objects.get(assignment=self.quiz, student=self.students[2])
+        grade = Grade.objects.create(submission=submission, score=10, graded_by=self.teacher)
+        grade = Grade.objects.get(pk=grade.pk)
+        with CaptureQueriesContext(connection) as queries:
+            signals.refresh_grade_analytics(Grade, grade)
+        self.assertEqual(len(queries), 1)
+        self.assertIn("ndanan_assignment", queries[0]["sql"])
+
+    def test_unenrolled_students_leave_the_leaderboard(self):
+        analytics.refresh_course(self.course.pk)
+        CourseEnrollment.objects.filter(student=self.students[0]).update(is_active=False)
+        analytics.refresh_course(self.course.pk)
+        self.assertEqual(StudentCourseStats.objects.filter(course=self.course).count(), 3)
+        leader = StudentCourseStats.objects.filter(course=self.course, rank=1).get()
+        self.assertEqual(leader.student, self.students[2])
+
+    def test_grade_changes_share_one_refresh_per_window(self):
+        submission = Submission.objects.get(assignment=self.quiz, student=self.students[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(submission=submission, score=10, graded_by=self.teacher)
+            Grade.objects.filter(submission=submission).get().save()
+        self.assertEqual(Task.objects.filter(name="analytics.refresh_course").count(), 1)
+
+    @override_settings(ANALYTICS_REFRESH_WINDOW=0)
+    def test_task_worker_refreshes_after_a_grade(self):
+        analytics.refresh_course(self.course.pk)
+        submission = Submission.objects.get(assignment=self.quiz, student=self.students[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(submission=submission, score=50, graded_by=self.teacher)
+        tasks.run_pending()
+        self.assertEqual(StudentCourseStats.objects.get(student=self.students[2]).mean, 85)
+
+    def test_api_shows_teacher_the_leaderboard_and_students_their_own_row(self):
+        url = reverse("course_analytics", args=[self.course.pk])
+        self.client.force_login(self.teacher)
+        body = self.client.get(url + "?limit=2").json()
+        self.assertEqual([a["title"] for a in body["assignments"]], ["Quiz", "Essay"])
+        self.assertEqual([row["student"] for row in body["leaderboard"]], [self.students[0].pk, self.students[2].pk])
+
+        self.client.force_login(self.students[1])
+        body = self.client.get(url).json()
+        self.assertEqual(body["student"]["rank"], 3)
+        self.assertNotIn("leaderboard", body)
+
+        self.client.force_login(make_user("outsider@school.edu"))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_api_without_a_summary_row_returns_an_empty_result(self):
+        self.client.force_login(self.students[3])
+        with mock.patch("ndanan.views.analytics_views.refresh_course"):
+            response = self.client.get(reverse("course_analytics", args=[self.course.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"course": self.course.pk, "student": None})
+
+
+class StudentDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("dash-teacher@school.edu", role="teacher")
+        cls.course = make_course(cls.teacher, "DSH101", students=1)
+        cls.student = cls.course.enrollments.get().student
+        now = timezone.now()
+        cls.soon, cls.later, cls.past = (
+            Assignment.objects.create(course=cls.course, title=title, description="work",
+                                      due_date=now + timezone.timedelta(days=days), created_by=cls.teacher)
+            for title, days in (("Soon", 1), ("Later", 5), ("Past", -1))
+        )
+
+    def dashboard(self):
+        return dashboards.get_dashboard(self.student)
+
+    def test_dashboard_lists_courses_and_upcoming_by_due_date(self):
+        dashboard = self.dashboard()
+        self.assertEqual([c["course_code"] for c in dashboard["courses"]], ["DSH101"])
+        self.assertEqual(dashboard["courses"][0]["teacher_name"], "Test Teacher")
+        self.assertEqual([a["title"] for a in dashboard["upcoming"]], ["Soon", "Later"])
+        self.assertEqual(StudentDashboard.objects.get(student=self.student).expires_at, self.soon.due_date)
+
+    def test_submission_and_grade_update_the_snapshot(self):
+        self.dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            submission = Submission.objects.create(
+                assignment=self.soon, student=self.student, status="submitted", submission_file="submissions/a.pdf"
+            )
+        dashboard = self.dashboard()
+        self.assertEqual([a["title"] for a in dashboard["upcoming"]], ["Later"])
+        self.assertEqual([p["assignment_title"] for p in dashboard["pending"]], ["Soon"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(submission=submission, score=88, graded_by=self.teacher)
+            Submission.objects.filter(pk=submission.pk).update(status="graded")
+            submission.refresh_from_db()
+            submission.save()
+        dashboard = self.dashboard()
+        self.assertEqual(dashboard["pending"], [])
+        self.assertEqual([(g["assignment_title"], g["score"]) for g in dashboard["recent_grades"]], [("Soon", 88)])
+
+    def test_new_assignment_reaches_students_through_the_task_worker(self):
+        self.dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.create(course=self.course, title="First", description="work",
+                                      due_date=timezone.now() + timezone.timedelta(hours=1), created_by=self.teacher)
+        tasks.run_pending()
+        self.assertEqual([a["title"] for a in self.dashboard()["upcoming"]], ["First", "Soon", "Later"])
+
+    def test_snapshot_is_rebuilt_once_an_assignment_falls_due(self):
+        self.dashboard()
+        Assignment.objects.filter(pk=self.soon.pk).update(due_date=timezone.now() - timezone.timedelta(minutes=1))
+        StudentDashboard.objects.filter(student=self.student).update(expires_at=timezone.now())
+        self.assertEqual([a["title"] for a in self.dashboard()["upcoming"]], ["Later"])
+
+    def test_home_page_shows_the_dashboard(self):
+        self.dashboard()
+        self.client.force_login(self.student)
+        with record_queries() as recorder:
+            response = self.client.get(reverse("home"))
+        self.assertContains(response, "DSH101 - Soon")
+        self.assertEqual(recorder.count, 3)
+
+
+class DeadlineReminderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("deadline-teacher@school.edu", role="teacher")
+        cls.course = make_course(cls.teacher, "DUE101", students=3)
+        cls.students = [e.student for e in cls.course.enrollments.order_by("student_id").select_related("student")]
+        now = timezone.now()
+        cls.assignments = {
+            title: Assignment.objects.create(course=cls.course, title=title, description="work",
+                                             due_date=now + timezone.timedelta(hours=hours), created_by=cls.teacher)
+            for title, hours in (("Hour", 1), ("Evening", 10), ("Friday", 48), ("Closed", -1))
+        }
+        Submission.objects.create(assignment=cls.assignments["Hour"], student=cls.students[0],
+                                  submission_file="submissions/a.pdf")
+
+    def reminded(self):
+        return set(DeadlineReminder.objects.values_list("assignment__title", "student_id", "window_hours"))
+
+    def test_buckets_do_not_overlap(self):
+        now = timezone.now()
+        hour = timezone.timedelta(hours=1)
+        self.assertEqual(
+            deadlines.reminder_buckets(now, [24, 2]), [(2, now, now + 2 * hour), (24, now + 2 * hour, now + 24 * hour)]
+        )
+
+    def test_unsubmitted_students_are_reminded_once_per_window(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(deadlines.schedule_reminders(), 5)
+        s0, s1, s2 = (s.pk for s in self.students)
+        self.assertEqual(self.reminded(), {
+            ("Hour", s1, 2), ("Hour", s2, 2), ("Evening", s0, 24), ("Evening", s1, 24), ("Evening", s2, 24),
+        })
+        self.assertEqual(Task.objects.filter(name="notifications.deadline_reminder").count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(deadlines.schedule_reminders(), 0)
+
+    def test_tighter_window_still_fires_as_the_deadline_nears(self):
+        deadlines.schedule_reminders()
+        Assignment.objects.filter(pk=self.assignments["Evening"].pk).update(
+            due_date=timezone.now() + timezone.timedelta(minutes=30)
+        )
+        CourseEnrollment.objects.filter(student=self.students[2]).update(is_active=False)
+        self.assertEqual(deadlines.schedule_reminders(), 2)
+
+    def test_reminders_are_mailed_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            deadlines.schedule_reminders(batch_size=2)
+        self.assertEqual(Task.objects.filter(name="notifications.deadline_reminder").count(), 3)
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertIn("Due within 24 hours: Evening", {m.subject for m in mail.outbox})
+
+    def test_overlapping_runs_mail_each_student_once(self):
+        # Both runs scan before either writes; the first only got as far as Evening
+        scanned = {window: list(deadlines.students_to_remind(window, start, end))
+                   for window, start, end in deadlines.reminder_buckets()}
+        evening = self.assignments["Evening"].pk
+        first = {window: [pair for pair in pairs if pair[0] == evening] for window, pairs in scanned.items()}
+        with self.captureOnCommitCallbacks(execute=True):
+            with mock.patch.object(deadlines, "students_to_remind", lambda window, *_: first[window]):
+                self.assertEqual(deadlines.schedule_reminders(batch_size=2), 3)
+            with mock.patch.object(deadlines, "students_to_remind", lambda window, *_: scanned[window]):
+                self.assertEqual(deadlines.schedule_reminders(batch_size=3), 2)
+        tasks.run_pending()
+        sent = [(message.subject, tuple(message.to)) for message in mail.outbox]
+        self.assertEqual(len(sent), 5)
+        self.assertEqual(len(set(sent)), 5)
+
+    def test_scan_is_one_query_per_bucket(self):
+        with CaptureQueriesContext(connection) as queries:
+            deadlines.schedule_reminders(now=timezone.now() + timezone.timedelta(days=30))
+        self.assertEqual(len(queries), len(settings.DEADLINE_REMINDER_HOURS))
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user("search-teacher@school.edu", role="teacher")
+        cls.other_teacher = make_user("search-chem@school.edu", role="teacher")
+        cls.algebra = Course.objects.create(name="Linear Algebra", course_code="MAT201",
+                                            description="Vectors and matrices", teacher=cls.teacher)
+        cls.chemistry = Course.objects.create(name="Organic Chemistry", course_code="CHE101",
+                                              description="Carbon compounds and matrices of reactions",
+                                              teacher=cls.other_teacher)
+        cls.cheat_sheet = Material.objects.create(course=cls.algebra, title="Matrices cheat sheet",
+                                                  description="One page", uploaded_by=cls.teacher)
+        cls.lecture = Material.objects.create(course=cls.algebra, title="Eigenvalues lecture",
+                                              description="Notes on eigenvalues and eigenvectors",
+                                              uploaded_by=cls.teacher)
+        cls.student = make_user("search-student@school.edu")
+        CourseEnrollment.objects.create(course=cls.algebra, student=cls.student)
+        search.rebuild_index()
+
+    def titles(self, user, query, **options):
+        return [result["title"] for result in search.search(user, query, **options)]
+
+    def test_results_are_ranked_and_limited_to_enrolled_courses(self):
+        # A title match outranks a description match; the chemistry course is not visible
+        self.assertEqual(self.titles(self.student, "matrices"), ["Matrices cheat sheet", "Linear Algebra"])
+        self.assertEqual(self.titles(self.student, "eigenvalues notes"), ["Eigenvalues lecture"])
+        self.assertEqual(self.titles(self.student, "mat201"), ["Linear Algebra"])
+
+    def test_teachers_see_their_own_courses_and_admins_everything(self):
+        self.assertEqual(self.titles(self.other_teacher, "matrices"), ["Organic Chemistry"])
+        admin = make_user("search-admin@school.edu", role="admin")
+        self.assertEqual(len(self.titles(admin, "matrices")), 3)
+        self.assertEqual(self.titles(admin, "matrices", kind="course"), ["Linear Algebra", "Organic Chemistry"])
+
+    def test_index_follows_saves_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lecture.title = "Determinants lecture"
+            self.lecture.save()
+        self.assertEqual(self.titles(self.student, "determinants"), ["Determinants lecture"])
+        self.assertEqual(self.titles(self.student, "eigenvalues")[0], "Determinants lecture")
+        self.lecture.delete()
+        self.assertEqual(self.titles(self.student, "determinants"), [])
+        self.assertFalse(SearchDocument.objects.filter(key=f"material:{self.lecture.pk}").exists())
+
+    def test_extracted_pdf_text_is_searchable(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheat_sheet.file.name = "materials/sheet.pdf"
+            self.cheat_sheet.save()
+        self.assertTrue(Task.objects.filter(name="search.extract_material_text").exists())
+        search.index_material(self.cheat_sheet.pk, attachment="Gaussian elimination reduces a matrix to row echelon form")
+        [result] = search.search(self.student, "gaussian elimination")
+        self.assertEqual(result["title"], "Matrices cheat sheet")
+        self.assertIn("Gaussian elimination", result["snippet"])
+        # Re-indexing the title keeps the extracted text
+        search.index_material(self.cheat_sheet.pk)
+        self.assertEqual(self.titles(self.student, "echelon"), ["Matrices cheat sheet"])
+
+    def test_search_page_and_api(self):
+        self.client.force_login(self.student)
+        self.assertContains(self.client.get(reverse("search"), {"q": "eigenvalues"}), "Eigenvalues lecture")
+        body = self.client.get(reverse("search_api"), {"q": "matrices", "kind": "material"}).json()
+        self.assertEqual([(r["kind"], r["id"]) for r in body["results"]], [("material", self.cheat_sheet.pk)])
+        self.assertEqual(body["results"][0]["url"], reverse("material_details", args=[self.cheat_sheet.pk]))
+
+
+class UserProvisioningTests(TestCase):
+    """Roster imports write each chunk's emails in one UPDATE, hashing in a process pool"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user("provision-admin@school.edu", role="admin")
+
+    def test_provision_users_reports_errors_and_inserts_once(self):
+        rows = provisioning.read_roster_rows(
+            "first_name,last_name,role,password\n"
+            "Ama,Mensah,student,secret-pass\n"
+            "Kofi,Van Dyk,teacher,\n"
+            "Esi,Owusu,janitor,secret-pass\n"
+            ",Boateng,student,secret-pass\n"
+            "Yaw,Asante,Student,short\n",
+            "csv",
+        )
+        with CaptureQueriesContext(connection) as queries:
+            result = provisioning.provision_users(rows, workers=1)
+        self.assertEqual(result.created, 2)
+        self.assertEqual([e["row"] for e in result.errors], [3, 4, 5])
+        inserts = [q["sql"] for q in queries if q["sql"].startswith('INSERT INTO "ndanan_user"')]
+        updates = [q["sql"] for q in queries if q["sql"].startswith('UPDATE "ndanan_user"')]
+        self.assertEqual((len(inserts), len(updates)), (1, 1))
+
+        student = User.objects.get(pk=result.users[0]["id"])
+        teacher = User.objects.get(pk=result.users[1]["id"])
+        self.assertEqual(student.email, f"amamensah{student.pk}@school.edu")
+        self.assertEqual(teacher.email, f"kofivandyk{teacher.pk}@staff.school.com")
+        self.assertTrue(student.check_password("secret-pass"))
+        self.assertFalse(teacher.has_usable_password())
+
+    def test_emails_written_by_hand_are_not_reused(self):
+        # Typed in for the id the import is about to take
+        next_id = User.objects.latest("pk").pk + 2
+        make_user(f"amamensah{next_id}@school.edu")
+        rows = [{"first_name": "Ama", "last_name": "Mensah", "role": "student"},
+                {"first_name": "Kofi", "last_name": "Boateng", "role": "student"}]
+        result = provisioning.provision_users(rows, workers=1, chunk_size=1)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [{"row": 1, "error": f"amamensah{next_id}@school.edu is already in use"}])
+        self.assertFalse(User.objects.filter(email__endswith=f"@{provisioning.PLACEHOLDER_DOMAIN}").exists())
+        self.assertFalse(User.objects.filter(first_name="Ama").exists())
+
+    def test_roster_rows_must_be_objects_and_passwords_may_be_numbers(self):
+        with self.assertRaisesMessage(ValueError, "JSON must be a list of rows"):
+            provisioning.read_roster_rows('{"first_name": "Ama"}', "json")
+        with self.assertRaisesMessage(ValueError, "Every row must be an object"):
+            provisioning.read_roster_rows('["Ama"]', "json")
+
+        rows = provisioning.read_roster_rows(
+            '[{"first_name": "Ama", "last_name": "Mensah", "role": "student", "password": 12345678},'
+            ' {"first_name": "Kofi", "last_name": "Boateng", "role": "student", "password": 1234}]',
+            "json",
+        )
+        result = provisioning.provision_users(rows, workers=1)
+        self.assertEqual(result.created, 1)
+        self.assertEqual([e["row"] for e in result.errors], [2])
+        self.assertTrue(User.objects.get(pk=result.users[0]["id"]).check_password("12345678"))
+
+    def test_hash_passwords_uses_a_process_pool_for_large_batches(self):
+        passwords = [f"password-{i}" for i in range(provisioning.PARALLEL_HASH_THRESHOLD)]
+        hashes = provisioning.hash_passwords(passwords, workers=2)
+        self.assertEqual(len(set(hashes)), len(passwords))
+        user = User(password=hashes[-1])
+        self.assertTrue(user.check_password(passwords[-1]))
+
+    def test_register_generates_the_same_email(self):
+        self.client.post(reverse("Register"), {
+            "first_name": "Abena", "last_name": "Osei", "role": "student", "email": "abena@example.com",
+            "password": "pass12345", "confirm_password": "pass12345",
+        })
+        user = User.objects.get(first_name="Abena")
+        self.assertEqual(user.email, provisioning.institution_email("Abena", "Osei", "student", user.pk))
+
+    def test_api_is_admin_only(self):
+        payload = {"users": [{"first_name": "Kwame", "last_name": "Nkrumah", "role": "teacher"}]}
+        self.client.force_login(make_user("provision-teacher@staff.school.com", role="teacher"))
+        response = self.client.post(reverse("bulk_provision"), payload, content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse("bulk_provision"), payload, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 1)
+        self.assertTrue(response.json()["users"][0]["email"].endswith("@staff.school.com"))
@@ -0,0 +1,162 @@
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from .models import Material, Submission, UploadSession
+
+READ_SIZE = 64 * 1024
+MAX_CACHED_HASHERS = 256
+
+# Running SHA-256 per session, so consecutive chunks handled by this process
+# never re-read the partial file. Other processes rebuild it on demand.
+_hashers = OrderedDict()
+
+
+class UploadError(Exception):
+    """A chunk or completion request that cannot be accepted"""
+
+
+def max_upload_size(target):
+    if target == "submission":
+        return settings.SUBMISSION_MAX_UPLOAD_SIZE
+    return settings.MATERIAL_MAX_UPLOAD_SIZE
+
+
+def part_path(session):
+    return Path(settings.CHUNKED_UPLOAD_TEMP_DIR) / f"{session.pk}.part"
+
+
+def start_upload(owner, target, filename, total_size, metadata):
+    if total_size > max_upload_size(target):
+        raise UploadError(f"File cannot exceed {max_upload_size(target) // (1024 * 1024)}MB")
+    session = UploadSession.objects.create(
+        owner=owner,
+        target=target,
+        filename=os.path.basename(filename),
+        total_size=total_size,
+        chunk_size=settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+        metadata=metadata,
+    )
+    path = part_path(session)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return session
+
+
+def _hasher_for(session):
+    """Running hash positioned at session.received_bytes"""
+    cached = _hashers.pop(session.pk, None)
+    if cached is not None and cached[0] == session.received_bytes:
+        _hashers[session.pk] = cached
+        return cached[1]
+
+    # Resumed elsewhere or evicted: hash what is already on disk
+    hasher = hashlib.sha256()
+    remaining = session.received_bytes
+    with part_path(session).open("rb") as part:
+        while remaining:
+            block = part.read(min(READ_SIZE, remaining))
+            if not block:
+                raise UploadError("Partial upload is missing data; restart the upload")
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def _remember_hasher(session, hasher):
+    _hashers[session.pk] = (session.received_bytes, hasher)
+    while len(_hashers) > MAX_CACHED_HASHERS:
+        _hashers.popitem(last=False)
+
+
+def receive_chunk(session_id, owner, index, stream):
+    """
+    Append chunk ``index`` read from ``stream`` to the partial file.
+    Bytes are hashed and counted as they arrive, so an oversized chunk is
+    rejected without ever being buffered. Chunks already received are
+    acknowledged without being written again.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session_id, owner=owner)
+        if session.status != "uploading":
+            raise UploadError("Upload is already complete")
+        if index < session.next_chunk:
+            return session
+        if index > session.next_chunk:
+            raise UploadError(f"Expected chunk {session.next_chunk}")
+
+        expected = min(session.chunk_size, session.total_size - session.received_bytes)
+        hasher = _hasher_for(session).copy()
+        written = 0
+        with part_path(session).open("r+b") as part:
+            part.seek(session.received_bytes)
+            while True:
+                block = stream.read(READ_SIZE)
+                if not block:
+                    break
+                written += len(block)
+                if written > expected:
+                    part.truncate(session.received_bytes)
+                    raise UploadError(f"Chunk {index} is larger than {expected} bytes")
+                part.write(block)
+                hasher.update(block)
+            if written != expected:
+                part.truncate(session.received_bytes)
+                raise UploadError(f"Chunk {index} must be {expected} bytes, got {written}")
+
+        session.received_bytes += written
+        session.save(update_fields=["received_bytes", "updated_at"])
+        _remember_hasher(session, hasher)
+        return session
+
+
+def finish_upload(session_id, owner, sha256=""):
+    """Verify the assembled file and attach it to a new Material or Submission atomically"""
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session_id, owner=owner)
+        if session.status != "uploading":
+            raise UploadError("Upload is already complete")
+        if session.received_bytes != session.total_size:
+            raise UploadError(f"Upload is incomplete; next chunk is {session.next_chunk}")
+
+        digest = _hasher_for(session).hexdigest()
+        if sha256 and sha256.lower() != digest:
+            raise UploadError("SHA-256 does not match the uploaded bytes")
+
+        metadata = session.metadata
+        if session.target == "material":
+            obj = Material(
+                course_id=metadata["course"],
+                title=metadata["title"],
+                description=metadata.get("description", ""),
+                uploaded_by=owner,
+            )
+            field = obj.file
+        else:
+            obj = Submission(
+                assignment_id=metadata["assignment"], student=owner, status="submitted",
+                original_name=session.filename,
+            )
+            field = obj.submission_file
+
+        path = part_path(session)
+        with path.open("rb") as part:
+            field.save(session.filename, File(part), save=False)
+        obj.save()
+
+        session.sha256 = digest
+        session.status = "complete"
+        session.save(update_fields=["sha256", "status", "updated_at"])
+
+        transaction.on_commit(lambda: _discard(session, path))
+    return session, obj
+
+
+def _discard(session, path):
+    _hashers.pop(session.pk, None)
+    path.unlink(missing_ok=True)
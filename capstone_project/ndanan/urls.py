@@ -1,19 +1,61 @@
 
+from django.conf import settings
 from django.urls import path
 from .views.course_views import CourseDetailView, CourseListView,CourseCreateView
 from .views.material_views import MaterialDetailView, MaterialListView,MaterialCreateView
+from .views.async_views import (
+    AsyncCourseDetailView, AsyncCourseListView, AsyncMaterialDetailView, AsyncMaterialListView,
+)
 from .views.auth_views import login_view, logout_view,register_view, home_view
+from .views.enrollment_views import BulkEnrollmentAPIView
+from .views.provisioning_views import BulkUserProvisionAPIView
+from .views.grade_views import BatchGradeAPIView
+from .views.export_views import GradebookExportView
+from .views.download_views import MaterialDownloadView, SubmissionDownloadView
+from .views.ops_views import DatabasePoolStatsAPIView
+from .views.analytics_views import CourseAnalyticsAPIView
+from .views.search_views import SearchAPIView, SearchView
+from .views.upload_views import (
+    UploadSessionCreateAPIView, UploadSessionDetailAPIView, UploadChunkAPIView, UploadCompleteAPIView,
+)
 
-urlpatterns = [
+
+def read_patterns(async_views):
+    """The course and material read pages; under ASGI these use the async views"""
+    if async_views:
+        course_list, course_detail = AsyncCourseListView, AsyncCourseDetailView
+        material_list, material_detail = AsyncMaterialListView, AsyncMaterialDetailView
+    else:
+        course_list, course_detail = CourseListView, CourseDetailView
+        material_list, material_detail = MaterialListView, MaterialDetailView
+    return [
+        path("course_list/", course_list.as_view() , name= "course_list"),
+        path("course_detail/<int:pk>/", course_detail.as_view(), name="course_details"),
+        path("material_list/", material_list.as_view(),name="material_list"),
+        path("material_detail/<int:pk>", material_detail.as_view(), name="material_details"),
+    ]
+
+
+urlpatterns = read_patterns(settings.ASYNC_VIEWS) + [
     path("", home_view, name="home"),  
-    path("course_list/", CourseListView.as_view() , name= "course_list"),
-    path("course_detail/<int:pk>/", CourseDetailView.as_view(), name="course_details"),
-    path("material_list/", MaterialListView.as_view(),name="material_list"),
-    path("material_detail/<int:pk>", MaterialDetailView.as_view(), name="material_details"),
     path("login/",login_view, name="Login"),
     path("logout/", logout_view,name="Logout"),
     path("register/", register_view, name="Register"),
     path("course_create/", CourseCreateView.as_view(), name="course_create" ),
     path("material_create/", MaterialCreateView.as_view(), name="material_create"),
+    path("api/enrollments/bulk/", BulkEnrollmentAPIView.as_view(), name="bulk_enroll"),
+    path("api/users/bulk/", BulkUserProvisionAPIView.as_view(), name="bulk_provision"),
+    path("api/grades/batch/", BatchGradeAPIView.as_view(), name="batch_grade"),
+    path("course_detail/<int:pk>/gradebook/", GradebookExportView.as_view(), name="gradebook_export"),
+    path("material_detail/<int:pk>/download/", MaterialDownloadView.as_view(), name="material_download"),
+    path("submissions/<int:pk>/download/", SubmissionDownloadView.as_view(), name="submission_download"),
+    path("api/uploads/", UploadSessionCreateAPIView.as_view(), name="upload_start"),
+    path("api/uploads/<uuid:pk>/", UploadSessionDetailAPIView.as_view(), name="upload_detail"),
+    path("api/uploads/<uuid:pk>/chunks/<int:index>/", UploadChunkAPIView.as_view(), name="upload_chunk"),
+    path("api/uploads/<uuid:pk>/complete/", UploadCompleteAPIView.as_view(), name="upload_complete"),
+    path("api/db/pool/", DatabasePoolStatsAPIView.as_view(), name="db_pool_stats"),
+    path("api/courses/<int:pk>/analytics/", CourseAnalyticsAPIView.as_view(), name="course_analytics"),
+    path("search/", SearchView.as_view(), name="search"),
+    path("api/search/", SearchAPIView.as_view(), name="search_api"),
     
 ]
\ No newline at end of file
@@ -0,0 +1,66 @@
+from django.shortcuts import get_object_or_404
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ndanan.access import check_course_access
+from ndanan.analytics import refresh_course
+from ndanan.models import AssignmentStats, Course, StudentCourseStats
+from ndanan.serializers import AssignmentStatsSerializer, StudentCourseStatsSerializer
+
+LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
+
+
+# The Course Analytics API view
+class CourseAnalyticsAPIView(APIView):
+    """
+    Precomputed grade analytics of a course. The teacher and admins get every
+    assignment's distribution and the leaderboard (?limit=, default 10);
+    an enrolled student gets only their own results.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def assignment_stats(self, course):
+        return list(
+            AssignmentStats.objects.select_related("assignment")
+            .filter(assignment__course=course)
+            .order_by("assignment__due_date", "assignment_id")
+        )
+
+    def get(self, request, pk):
+        course = get_object_or_404(Course, pk=pk)
+        user = request.user
+        check_course_access(
+            user, course.pk, course.teacher_id,
+            "You are not the teacher of this course.", "You do not have permission to view this course.",
+        )
+
+        if user.role == "student":
+            own = StudentCourseStats.objects.select_related("student").filter(course=course, student=user).first()
+            if own is None:
+                refresh_course(course.pk)
+                own = StudentCourseStats.objects.select_related("student").filter(course=course, student=user).first()
+            # Still none when the enrollment went inactive after the access check
+            student = StudentCourseStatsSerializer(own).data if own is not None else None
+            return Response({"course": course.pk, "student": student})
+
+        assignments = self.assignment_stats(course)
+        if len(assignments) < course.assignment_count:
+            # Never refreshed (or new assignments not yet picked up by the task worker)
+            refresh_course(course.pk)
+            assignments = self.assignment_stats(course)
+
+        try:
+            limit = min(max(int(request.GET.get("limit", LEADERBOARD_SIZE)), 1), MAX_LEADERBOARD_SIZE)
+        except ValueError:
+            limit = LEADERBOARD_SIZE
+        leaderboard = StudentCourseStats.objects.select_related("student").filter(
+            course=course, rank__isnull=False
+        ).order_by("rank", "student_id")[:limit]
+
+        return Response({
+            "course": course.pk,
+            "assignments": AssignmentStatsSerializer(assignments, many=True).data,
+            "leaderboard": StudentCourseStatsSerializer(leaderboard, many=True).data,
+        })
@@ -0,0 +1,201 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.http import Http404
+from django.shortcuts import render
+from django.views import View
+from ndanan.models import Course, Material
+from ndanan.detail_cache import get_course_detail, get_material_detail
+from ndanan.pagination import CURSOR_PARAM, KEYSET_ORDERING, paginate_keyset
+from ndanan.access import aenrolled_course_ids, check_course_access
+
+# Async versions of the course and material read views, routed instead of
+# the sync ones when ASYNC_VIEWS is set (deployments served through asgi.py).
+
+
+class AsyncLoginRequiredView(View):
+    """Resolves the user without blocking the event loop, then dispatches to async handlers"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        # Templates and context processors read request.user; give them the loaded user
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncListView(AsyncLoginRequiredView):
+    """Offset or keyset pagination, matching the sync ListView + CursorPaginationMixin context"""
+    read_replica = True
+    model = None
+    template_name = None
+    context_object_name = None
+    paginate_by = 10
+
+    async def get_queryset(self):
+        return self.model._default_manager.all()
+
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.get_queryset()
+        params = request.GET
+
+        if params.get("pagination") == "cursor" or CURSOR_PARAM in params:
+            try:
+                page = await sync_to_async(paginate_keyset)(queryset, params.get(CURSOR_PARAM), self.paginate_by)
+            except ValueError:
+                raise Http404("Invalid cursor")
+            context = {"page_obj": page, "is_paginated": page.has_other_pages(), "cursor_mode": True}
+            object_list = page.object_list
+        else:
+            page, object_list = await self.paginate(queryset, params.get("page") or 1)
+            context = {
+                "paginator": page.paginator,
+                "page_obj": page,
+                "is_paginated": page.has_other_pages(),
+                "cursor_mode": False,
+            }
+
+        context.update({"object_list": object_list, self.context_object_name: object_list})
+        return render(request, self.template_name, context)
+
+    async def paginate(self, queryset, page_number):
+        """COUNT and the page's rows are independent, so both queries are issued together"""
+        try:
+            number = int(page_number)
+        except ValueError:
+            raise Http404("Invalid page")
+        offset = (number - 1) * self.paginate_by
+        if not queryset.ordered:
+            queryset = queryset.order_by(*KEYSET_ORDERING)
+
+        async def rows():
+            return [obj async for obj in queryset[offset:offset + self.paginate_by]]
+
+        count, object_list = await asyncio.gather(queryset.acount(), rows())
+        paginator = Paginator(queryset, self.paginate_by)
+        paginator.count = count
+        try:
+            paginator.validate_number(number)
+        except InvalidPage as exc:
+            raise Http404(str(exc))
+        return Page(object_list, number, paginator), object_list
+
+
+class AsyncCourseAccessView(AsyncLoginRequiredView):
+    """
+    Async counterpart of CourseAccessMixin + DetailView. The object lookup and
+    the student's enrolled course ids (cached, read from the primary) are awaited together.
+    """
+    read_replica = True
+    model = None
+    template_name = None
+    context_object_name = None
+    course_field = "id"
+    owner_field = "teacher_id"
+    not_owner_message = "You are not the teacher of this course."
+    denied_message = "You do not have permission to view this course."
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    async def get_object(self, pk):
+        user = self.request.user
+        lookup = self.get_queryset().aget(pk=pk)
+        if user.role == "student":
+            obj, course_ids = await asyncio.gather(lookup, aenrolled_course_ids(user))
+            enrolled = getattr(obj, self.course_field) in course_ids
+        else:
+            obj, enrolled = await lookup, None
+
+        check_course_access(
+            user,
+            getattr(obj, self.course_field),
+            getattr(obj, self.owner_field),
+            self.not_owner_message,
+            self.denied_message,
+            enrolled=enrolled,
+        )
+        return obj
+
+    async def get(self, request, pk):
+        try:
+            self.object = await self.get_object(pk)
+        except self.model.DoesNotExist:
+            raise Http404(f"No {self.model._meta.verbose_name} found matching the query")
+        context = {"object": self.object, self.context_object_name: self.object}
+        context.update(await self.get_extra_context())
+        return render(request, self.template_name, context)
+
+    async def get_extra_context(self):
+        return {}
+
+
+# The Async Course List View
+class AsyncCourseListView(AsyncListView):
+    model = Course
+    context_object_name = "course_list"
+    template_name = "ndanan/course_list.html"
+
+    async def get_queryset(self):
+        user = self.request.user
+
+        if user.role == "teacher":
+            return Course.objects.with_teacher().filter(teacher=user)
+
+        elif user.role == "student":
+            return Course.objects.with_teacher().filter(id__in=await aenrolled_course_ids(user))
+
+        elif user.role == "admin":
+            return Course.objects.with_teacher()
+
+        return Course.objects.none()
+
+
+# The Async Course Detail View
+class AsyncCourseDetailView(AsyncCourseAccessView):
+    model = Course
+    context_object_name = "course_details"
+    template_name = "ndanan/course_detail.html"
+    course_field = "id"
+    owner_field = "teacher_id"
+
+    async def get_extra_context(self):
+        return {"course_detail": await sync_to_async(get_course_detail)(self.object)}
+
+
+# The Async Material List View
+class AsyncMaterialListView(AsyncListView):
+    model = Material
+    context_object_name = "material_list"
+    template_name = "ndanan/material_list.html"
+
+    async def get_queryset(self):
+        user = self.request.user
+
+        if user.role == "admin":
+            return Material.objects.select_related("course", "uploaded_by")
+
+        elif user.role == "teacher":
+            return Material.objects.select_related("course", "uploaded_by").filter(uploaded_by=user)
+
+        elif user.role == "student":
+            return Material.objects.select_related("course", "uploaded_by").filter(course__in=await aenrolled_course_ids(user))
+
+        return Material.objects.none()
+
+
+# The Async Material Detail View
+class AsyncMaterialDetailView(AsyncCourseAccessView):
+    model = Material
+    context_object_name = "material_details"
+    template_name = "ndanan/material_detail.html"
+    course_field = "course_id"
+    owner_field = "uploaded_by_id"
+    not_owner_message = "You are not the uploader of this material."
+    denied_message = "You do not have permission to view this material."
+
+    async def get_extra_context(self):
+        return {"material_detail": await sync_to_async(get_material_detail)(self.object)}
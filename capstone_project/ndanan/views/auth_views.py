@@ -2,28 +2,26 @@ from django.contrib.auth import login, logout, authenticate
 from django.shortcuts import redirect, render
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from ndanan.dashboards import get_dashboard
 from ndanan.forms import RegistrationForm
 from ndanan.models import User
+from ndanan.notifications import notify_welcome
+from ndanan.provisioning import institution_email
 
 
 
 def home_view(request):
-    return render(request, "ndanan/home.html")
+    # Students get their precomputed dashboard: one query on top of the session and user
+    dashboard = None
+    if request.user.is_authenticated and request.user.role == "student":
+        dashboard = get_dashboard(request.user)
+    return render(request, "ndanan/home.html", {"dashboard": dashboard})
 
 def generate_email(user):
     """
     Generating email from user's data
     """
-    first = user.first_name.replace(" ", "").lower()
-    last = user.last_name.replace(" ", "").lower()
-
-    if user.role == "teacher":
-        domain = "staff.school.com"
-    else:  
-        domain = "school.edu"
-    
-    email = f"{first}{last}{user.id}@{domain}"
-    return email
+    return institution_email(user.first_name, user.last_name, user.role, user.id)
 
 
 def login_view(request):
@@ -76,7 +74,8 @@ def register_view(request):
             # Generate and set email
             user.email = generate_email(user)
             user.save(update_fields=['email'])
-            
+            notify_welcome(user)
+
             login(request, user)
             messages.success(request, f"Welcome {user.first_name}! Registration successful.")
 
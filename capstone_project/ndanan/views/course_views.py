@@ -1,20 +1,15 @@
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView
-from ndanan.models import Course, User, CourseEnrollment
-from django.contrib.auth.mixins import LoginRequiredMixin, AccessMixin
-from django.core.exceptions import PermissionDenied
-
-class TeacherOrAdminRequiredMixin(AccessMixin):
-    def dispatch(self, request, *args, **kwargs):
-        user_role = getattr(request.user, 'role', None)
-        if user_role not in ["teacher", "admin"]:
-            raise PermissionDenied("Only Teachers or Admins can create courses.")
-        
-        return super().dispatch(request, *args, **kwargs)
+from ndanan.models import Course
+from ndanan.detail_cache import get_course_detail
+from ndanan.pagination import CursorPaginationMixin
+from ndanan.access import CourseAccessMixin, TeacherOrAdminRequiredMixin, enrolled_course_ids
+from django.contrib.auth.mixins import LoginRequiredMixin
 
 
 # The Course List View
-class CourseListView(LoginRequiredMixin, ListView):
+class CourseListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
+    read_replica = True
     model = Course
     context_object_name = "course_list"
     template_name = "ndanan/course_list.html"
@@ -24,55 +19,34 @@ class CourseListView(LoginRequiredMixin, ListView):
         user = self.request.user
 
         if user.role == "teacher":
-            return Course.objects.filter(teacher=user)
+            return Course.objects.with_teacher().filter(teacher=user)
         
         elif user.role == "student":
             # Get courses where student is enrolled
-            enrolled_courses = CourseEnrollment.objects.filter(
-                student=user,
-                is_active=True
-            ).values_list('course', flat=True)
-            return Course.objects.filter(id__in=enrolled_courses)
+            return Course.objects.with_teacher().filter(id__in=enrolled_course_ids(user))
         
         elif user.role == "admin":
-            return Course.objects.all()
+            return Course.objects.with_teacher()
         
         return Course.objects.none()
 
 
 # The Course Detail view class 
-class CourseDetailView(LoginRequiredMixin, DetailView):
+class CourseDetailView(LoginRequiredMixin, CourseAccessMixin, DetailView):
+    read_replica = True
     model = Course
     context_object_name = "course_details"
     template_name = "ndanan/course_detail.html"
-     
-    def get_object(self, queryset=None):
-        obj = super().get_object(queryset)
-        user = self.request.user
+    course_field = "id"
+    owner_field = "teacher_id"
+    not_owner_message = "You are not the teacher of this course."
+    denied_message = "You do not have permission to view this course."
 
-        if user.role == "admin":
-            return obj 
-        
-        if user.role == "teacher":
-            if obj.teacher == user:
-                return obj 
-            else:
-                raise PermissionDenied("You are not the teacher of this course.")
-        
-        if user.role == "student":
-            # Check if student is enrolled
-            is_enrolled = CourseEnrollment.objects.filter(
-                student=user,
-                course=obj,
-                is_active=True
-            ).exists()
-            
-            if is_enrolled:
-                return obj 
-            else:
-                raise PermissionDenied("You are not enrolled in this course.")
-        
-        raise PermissionDenied("You do not have permission to view this course.")
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Teacher, students and materials come from the versioned detail cache
+        context["course_detail"] = get_course_detail(self.object)
+        return context
 
 # The Course Creation View class
 
@@ -81,7 +55,8 @@ class CourseCreateView(LoginRequiredMixin, TeacherOrAdminRequiredMixin, CreateVi
     template_name = "ndanan/course_form.html" 
     fields = ["name", "description", "course_code"] 
     success_url = reverse_lazy("course_list")
+    permission_denied_message = "Only Teachers or Admins can create courses."
     
     def form_valid(self, form):
         form.instance.teacher = self.request.user
-        return super().form_valid(form)
\ No newline at end of file
+        return super().form_valid(form)
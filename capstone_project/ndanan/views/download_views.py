@@ -0,0 +1,49 @@
+import os
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.views import View
+from django.views.generic.detail import SingleObjectMixin
+
+from ndanan.access import CourseAccessMixin
+from ndanan.downloads import serve_file
+from ndanan.models import Material, Submission
+
+
+# The Material Download view - same access rules as MaterialDetailView
+class MaterialDownloadView(LoginRequiredMixin, CourseAccessMixin, SingleObjectMixin, View):
+    model = Material
+    course_field = "course_id"
+    owner_field = "uploaded_by_id"
+    not_owner_message = "You are not the uploader of this material."
+    denied_message = "You do not have permission to view this material."
+
+    def get(self, request, *args, **kwargs):
+        material = self.get_object()
+        if not material.file:
+            raise Http404("This material has no file")
+        extension = os.path.splitext(material.file.name)[1]
+        return serve_file(request, material.file, download_name=f"{material.title}{extension}")
+
+
+# The Submission Download view - the student who submitted, the course teacher or an admin
+class SubmissionDownloadView(LoginRequiredMixin, SingleObjectMixin, View):
+    model = Submission
+
+    def get_queryset(self):
+        return Submission.objects.select_related("assignment__course")
+
+    def get(self, request, *args, **kwargs):
+        submission = self.get_object()
+        user = request.user
+        allowed = (
+            user.role == "admin"
+            or (user.role == "teacher" and submission.assignment.course.teacher_id == user.pk)
+            or (user.role == "student" and submission.student_id == user.pk)
+        )
+        if not allowed:
+            raise PermissionDenied("You do not have permission to view this submission.")
+        extension = os.path.splitext(submission.submission_file.name)[1]
+        download_name = submission.original_name or f"submission-{submission.pk}{extension}"
+        return serve_file(request, submission.submission_file, download_name=download_name)
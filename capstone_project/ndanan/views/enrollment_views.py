@@ -0,0 +1,34 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ndanan.access import IsTeacherOrAdmin
+from ndanan.enrollments import bulk_enroll, read_enrollment_rows
+from ndanan.serializers import BulkEnrollmentSerializer
+
+
+# The Bulk Enrollment API view
+class BulkEnrollmentAPIView(APIView):
+    """
+    POST {"enrollments": [{"course_code": ..., "student": email-or-id}, ...]}
+    or a multipart CSV/JSON ``file``. Returns per-row errors and throughput.
+    """
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    def post(self, request):
+        serializer = BulkEnrollmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload = serializer.validated_data.get("file")
+        if upload is not None:
+            fmt = "json" if upload.name.lower().endswith(".json") else "csv"
+            try:
+                rows = read_enrollment_rows(upload.read(), fmt)
+            except ValueError as exc:
+                return Response({"file": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = serializer.validated_data["enrollments"]
+
+        result = bulk_enroll(rows, requested_by=request.user)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
@@ -0,0 +1,29 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views import View
+
+from ndanan.exports import EXPORT_FORMATS, gradebook_rows
+from ndanan.models import Course
+
+
+# The Gradebook Export view
+class GradebookExportView(LoginRequiredMixin, View):
+    """Stream a course's full gradebook as CSV (default) or JSONL (?format=jsonl)"""
+    read_replica = True
+
+    def get(self, request, pk):
+        course = get_object_or_404(Course, pk=pk)
+        user = request.user
+        if user.role != "admin" and not (user.role == "teacher" and course.teacher_id == user.pk):
+            raise PermissionDenied("Only the course teacher or an admin can export grades.")
+
+        fmt = request.GET.get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            raise Http404("Unknown export format")
+        writer, content_type = EXPORT_FORMATS[fmt]
+
+        response = StreamingHttpResponse(writer(gradebook_rows(course)), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{course.course_code}-gradebook.{fmt}"'
+        return response
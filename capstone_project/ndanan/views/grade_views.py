@@ -0,0 +1,26 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ndanan.access import IsTeacherOrAdmin
+from ndanan.grading import grade_batch
+from ndanan.serializers import BatchGradeSerializer
+
+
+# The Batch Grading API view
+class BatchGradeAPIView(APIView):
+    """
+    POST {"grades": [{"submission_id": ..., "score": ..., "feedback": ...}, ...]}.
+    All rows are applied in one transaction, or none are when any row is invalid.
+    """
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    def post(self, request):
+        serializer = BatchGradeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        result = grade_batch(serializer.validated_data["grades"], graded_by=request.user)
+        if result.errors:
+            return Response(result.as_dict(), status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
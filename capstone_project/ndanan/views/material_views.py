@@ -1,19 +1,14 @@
 from django.views.generic import ListView, DetailView, CreateView
-from django.contrib.auth.mixins import LoginRequiredMixin, AccessMixin
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
-from ndanan.models import Material, CourseEnrollment
-from django.core.exceptions import PermissionDenied
-
-class TeacherOrAdminRequiredMixin(AccessMixin):
-    def dispatch(self, request, *args, **kwargs):
-        user_role = getattr(request.user, 'role', None)
-        if user_role not in ["teacher", "admin"]:
-            raise PermissionDenied("Only Teachers or Admins can create materials.")
-        
-        return super().dispatch(request, *args, **kwargs)
+from ndanan.models import Material
+from ndanan.detail_cache import get_material_detail
+from ndanan.pagination import CursorPaginationMixin
+from ndanan.access import CourseAccessMixin, TeacherOrAdminRequiredMixin, enrolled_course_ids
 
 # The material list view class
-class MaterialListView(LoginRequiredMixin, ListView):
+class MaterialListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
+    read_replica = True
     model = Material
     context_object_name = "material_list"
     template_name = "ndanan/material_list.html"
@@ -23,55 +18,33 @@ class MaterialListView(LoginRequiredMixin, ListView):
         user = self.request.user
         
         if user.role == "admin":
-            return Material.objects.all()
+            return Material.objects.select_related("course", "uploaded_by")
         
         elif user.role == "teacher":
             # Materials uploaded by this teacher
-            return Material.objects.filter(uploaded_by=user)
+            return Material.objects.select_related("course", "uploaded_by").filter(uploaded_by=user)
         
         elif user.role == "student":
             # Materials from courses the student is enrolled in
-            enrolled_courses = CourseEnrollment.objects.filter(
-                student=user, 
-                is_active=True
-            ).values_list('course', flat=True)
-            return Material.objects.filter(course__in=enrolled_courses)
+            return Material.objects.select_related("course", "uploaded_by").filter(course__in=enrolled_course_ids(user))
         
         return Material.objects.none()
 
 # The Material Detail View
-class MaterialDetailView(LoginRequiredMixin, DetailView):
+class MaterialDetailView(LoginRequiredMixin, CourseAccessMixin, DetailView):
+    read_replica = True
     model = Material
     context_object_name = "material_details"
     template_name = "ndanan/material_detail.html"
+    course_field = "course_id"
+    owner_field = "uploaded_by_id"
+    not_owner_message = "You are not the uploader of this material."
+    denied_message = "You do not have permission to view this material."
 
-    def get_object(self, queryset=None):
-        obj = super().get_object(queryset)
-        user = self.request.user
-
-        if user.role == "admin":
-            return obj
-        
-        if user.role == "teacher":
-            if obj.uploaded_by == user:
-                return obj
-            else:
-                raise PermissionDenied("You are not the uploader of this material.")
-        
-        if user.role == "student":
-            # Check if student is enrolled in the course
-            is_enrolled = CourseEnrollment.objects.filter(
-                student=user,
-                course=obj.course,
-                is_active=True
-            ).exists()
-            
-            if is_enrolled:
-                return obj
-            else:
-                raise PermissionDenied("You are not enrolled in this course.")
-        
-        raise PermissionDenied("You do not have permission to view this material.")
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["material_detail"] = get_material_detail(self.object)
+        return context
 
 # The Material Creation class
 class MaterialCreateView(LoginRequiredMixin, TeacherOrAdminRequiredMixin, CreateView):
@@ -80,7 +53,8 @@ class MaterialCreateView(LoginRequiredMixin, TeacherOrAdminRequiredMixin, Create
     template_name = "ndanan/material_form.html"
     fields = ["title", "description", "course", "file"]
     success_url = reverse_lazy("material_list")
+    permission_denied_message = "Only Teachers or Admins can create materials."
 
     def form_valid(self, form):
         form.instance.uploaded_by = self.request.user
-        return super().form_valid(form)
\ No newline at end of file
+        return super().form_valid(form)
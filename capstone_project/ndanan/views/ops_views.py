@@ -0,0 +1,15 @@
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ndanan.access import IsAdmin
+from ndanan.db.pool import pool_stats
+
+
+# The Database Pool Stats API view
+class DatabasePoolStatsAPIView(APIView):
+    """Checkouts, waits, timeouts and reconnects of this process's connection pools"""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response(pool_stats())
@@ -0,0 +1,34 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ndanan.access import IsAdmin
+from ndanan.provisioning import provision_users, read_roster_rows
+from ndanan.serializers import BulkUserProvisionSerializer
+
+
+# The Bulk User Provisioning API view
+class BulkUserProvisionAPIView(APIView):
+    """
+    POST {"users": [{"first_name": ..., "last_name": ..., "role": ..., "password": ...}, ...]}
+    or a multipart CSV/JSON ``file``. Returns the generated emails, per-row errors and throughput.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def post(self, request):
+        serializer = BulkUserProvisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload = serializer.validated_data.get("file")
+        if upload is not None:
+            fmt = "json" if upload.name.lower().endswith(".json") else "csv"
+            try:
+                rows = read_roster_rows(upload.read(), fmt)
+            except ValueError as exc:
+                return Response({"file": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = serializer.validated_data["users"]
+
+        result = provision_users(rows)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
@@ -0,0 +1,44 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views.generic import TemplateView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ndanan.search import search
+
+SEARCH_KINDS = ("course", "material")
+MAX_RESULTS = 50
+
+
+def _search_params(params):
+    query = params.get("q", "").strip()
+    kind = params.get("kind") if params.get("kind") in SEARCH_KINDS else None
+    try:
+        limit = min(max(int(params.get("limit", 20)), 1), MAX_RESULTS)
+    except ValueError:
+        limit = 20
+    return query, kind, limit
+
+
+# The Search view
+class SearchView(LoginRequiredMixin, TemplateView):
+    # Ranking reads the replica; the enrolled course ids it filters by come from the primary
+    read_replica = True
+    template_name = "ndanan/search.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query, kind, limit = _search_params(self.request.GET)
+        context.update(query=query, kind=kind, results=search(self.request.user, query, kind, limit))
+        return context
+
+
+# The Search API view
+class SearchAPIView(APIView):
+    """GET ?q=...&kind=course|material&limit=20: ranked courses and materials the user can see"""
+    read_replica = True
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query, kind, limit = _search_params(request.query_params)
+        return Response({"query": query, "results": search(request.user, query, kind, limit)})
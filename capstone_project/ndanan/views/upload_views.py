@@ -0,0 +1,66 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ndanan.models import UploadSession
+from ndanan.serializers import UploadSessionSerializer, UploadStartSerializer
+from ndanan.uploads import UploadError, finish_upload, receive_chunk, start_upload
+
+
+# Start a chunked upload
+class UploadSessionCreateAPIView(APIView):
+    """POST target, filename, total_size and the material/submission fields"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadStartSerializer(data=request.data, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            session = start_upload(request.user, data["target"], data["filename"], data["total_size"],
+                                   serializer.metadata())
+        except UploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+
+# Upload progress, used to resume after an interruption
+class UploadSessionDetailAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        session = get_object_or_404(UploadSession, pk=pk, owner=request.user)
+        return Response(UploadSessionSerializer(session).data)
+
+
+# Receive one chunk as the raw request body
+class UploadChunkAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, pk, index):
+        get_object_or_404(UploadSession, pk=pk, owner=request.user)
+        # DRF gives no stream at all for an empty body
+        if request.stream is None:
+            return Response({"detail": "Empty chunk"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = receive_chunk(pk, request.user, index, request.stream)
+        except UploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(UploadSessionSerializer(session).data)
+
+
+# Attach the finished file to a new material or submission
+class UploadCompleteAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        get_object_or_404(UploadSession, pk=pk, owner=request.user)
+        try:
+            session, obj = finish_upload(pk, request.user, sha256=request.data.get("sha256", ""))
+        except UploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        data = UploadSessionSerializer(session).data
+        data[session.target] = obj.pk
+        return Response(data, status=status.HTTP_201_CREATED)